@@ -0,0 +1,113 @@
+'''
+Bounded alert model for the live alert panel.
+
+The alert panel used to append every alert to a tk.Text widget and remember
+every alert string for de-duplication, so both grew for the whole session.
+AlertLog keeps the newest `capacity` alerts in a fixed-size ring buffer and
+de-duplicates in O(1) on (student, behavior, time bucket). The complete
+history is in the database (Backstage > Recent incidents).
+
+Tk rendering lives in display.AlertLogView; this module has no UI dependency
+so BehaviorMonitor can build alerts in headless runs too.
+'''
+
+from collections import namedtuple
+from datetime import datetime
+
+
+class Alert(namedtuple("Alert", ["timestamp", "student_id", "behavior", "duration", "color"])):
+    """
+    One UI alert produced by BehaviorMonitor.
+
+    timestamp is in epoch seconds, duration in seconds (sleeping only) and
+    color the hex colour used to draw the alert.
+    """
+    __slots__ = ()
+
+    @property
+    def text(self):
+        time_text = datetime.fromtimestamp(self.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+        if self.behavior == "Sleeping":
+            return f"{time_text} - {self.student_id}: {self.behavior} ({self.duration}s)"
+        return f"{time_text} - {self.student_id}: {self.behavior}"
+
+
+class AlertLog:
+    """
+    Fixed-capacity ring buffer of Alert objects, oldest first.
+
+    Parameters:
+    -----------
+    capacity : int
+        Alerts kept; the oldest is overwritten when full
+    bucket_seconds : float
+        An alert is a duplicate if the same student and behavior already
+        have one in the same time bucket of this length
+
+    `version` changes whenever the contents change, so views can skip
+    redraws. Not thread-safe: it is only used from the Tk thread.
+    """
+    def __init__(self, capacity=500, bucket_seconds=5):
+        self.capacity = capacity
+        self.bucket_seconds = bucket_seconds
+        self._buffer = [None] * capacity
+        self._keys = [None] * capacity
+        self._start = 0
+        self._size = 0
+        self._seen = set()
+        self.version = 0
+        self.duplicates = 0
+        self.overwritten = 0
+
+    def _key(self, alert):
+        return (alert.student_id, alert.behavior, int(alert.timestamp // self.bucket_seconds))
+
+    def append(self, alert):
+        """
+        Add an alert unless it duplicates one still in the buffer.
+
+        Returns:
+        --------
+        bool
+            False for duplicates
+        """
+        key = self._key(alert)
+        if key in self._seen:
+            self.duplicates += 1
+            return False
+
+        if self._size == self.capacity:
+            # Overwrite the oldest slot
+            index = self._start
+            self._seen.discard(self._keys[index])
+            self._start = (self._start + 1) % self.capacity
+            self.overwritten += 1
+        else:
+            index = (self._start + self._size) % self.capacity
+            self._size += 1
+        self._buffer[index] = alert
+        self._keys[index] = key
+        self._seen.add(key)
+        self.version += 1
+        return True
+
+    def extend(self, alerts):
+        """Append several alerts; returns how many were added."""
+        return sum(self.append(alert) for alert in alerts)
+
+    def window(self, first, count):
+        """Alerts first .. first + count - 1 (0 is the oldest kept), for rendering."""
+        first = max(0, first)
+        last = min(self._size, first + count)
+        return [self._buffer[(self._start + i) % self.capacity] for i in range(first, last)]
+
+    def clear(self):
+        self._buffer = [None] * self.capacity
+        self._keys = [None] * self.capacity
+        self._start = 0
+        self._size = 0
+        self._seen = set()
+        self.version += 1
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,221 @@
+'''
+Headless analysis of recorded lesson videos.
+
+Runs the same detection and alert rules as the live monitor (BehaviorMonitor)
+on video files, without a display. Frames are decoded in a reader thread,
+inferred in batches, timed by video time instead of the wall clock, and
+incidents are bulk-written by the IncidentWriter. Each file gets a throughput
+report.
+
+Usage:
+    python analyze_video.py --class 6a --video lesson1.mp4 lesson2.mp4
+    python analyze_video.py --class 6b --video lesson.mp4 --batch 8 --frame-step 2 --report report.json
+'''
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+from behavior_monitor import BehaviorMonitor
+from incident_stats import IncidentStats
+from incident_writer import IncidentWriter
+from inference_backends import create_engine
+from storage import create_repository
+
+
+class VideoReader(threading.Thread):
+    """
+    Decodes a video file into a bounded queue of (frame_index, video_seconds, frame).
+
+    Frames skipped by `frame_step` are only grabbed, not decoded. A None item
+    marks the end of the video.
+    """
+    def __init__(self, path, frame_step=1, max_queue=64):
+        super().__init__(name="VideoReader", daemon=True)
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open video: {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.frame_step = max(1, frame_step)
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.frames_read = 0
+
+    def run(self):
+        index = 0
+        try:
+            while True:
+                if index % self.frame_step == 0:
+                    ret, frame = self.cap.read()
+                    if not ret:
+                        break
+                    self.queue.put((index, index / self.fps, frame))
+                elif not self.cap.grab():
+                    break
+                index += 1
+        finally:
+            self.frames_read = index
+            self.cap.release()
+            self.queue.put(None)
+
+
+def analyze_video(path, monitor, engine, batch_size=8, frame_step=1, start_time=None):
+    """
+    Analyze one video file.
+
+    Parameters:
+    -----------
+    path : str
+        Video file
+    monitor : BehaviorMonitor
+        Applies the behavior/alert rules and queues incidents
+    engine : InferenceEngine
+        Backend used for (batched) inference
+    batch_size : int
+        Frames per forward pass; 1 uses engine.infer (with tracking if the backend tracks)
+    frame_step : int
+        Analyze every n-th frame
+    start_time : datetime, optional
+        Wall-clock time of the first frame; defaults to the file's modification
+        time minus the video length (recordings are written until the lesson ends)
+
+    Returns:
+    --------
+    dict
+        Throughput report for the file
+    """
+    reader = VideoReader(path, frame_step)
+    video_seconds = reader.total_frames / reader.fps if reader.total_frames > 0 else 0.0
+    if start_time is None:
+        start_epoch = os.path.getmtime(path) - video_seconds
+    else:
+        start_epoch = start_time.timestamp()
+
+    monitor.start_detection()
+    if monitor.stats is not None:
+        monitor.stats.reset(monitor.class_name)
+    frames_analyzed = 0
+    alert_count = 0
+    inference_seconds = 0.0
+    wall_start = time.perf_counter()
+    reader.start()
+
+    batch = []
+    done = False
+    while not done:
+        item = reader.queue.get()
+        if item is None:
+            done = True
+        else:
+            batch.append(item)
+        if not batch or (len(batch) < batch_size and not done):
+            continue
+
+        frames = [frame for _, _, frame in batch]
+        t0 = time.perf_counter()
+        detections = engine.infer_batch(frames) if batch_size > 1 else [engine.infer(frames[0])]
+        inference_seconds += time.perf_counter() - t0
+
+        for (_, video_pos, frame), det in zip(batch, detections):
+            _, alerts = monitor.process_detections(frame, det, start_epoch + video_pos, annotate=False)
+            alert_count += len(alerts)
+        frames_analyzed += len(batch)
+        batch = []
+
+    reader.join()
+    monitor.stop_detection()  # Log the episodes still open at the end of the video
+    wall_seconds = time.perf_counter() - wall_start
+    if video_seconds == 0.0:
+        video_seconds = reader.frames_read / reader.fps
+
+    return {
+        'video': path,
+        'class': monitor.class_name,
+        'video_fps': reader.fps,
+        'video_seconds': round(video_seconds, 2),
+        'frames_decoded': reader.frames_read,
+        'frames_analyzed': frames_analyzed,
+        'batch_size': batch_size,
+        'frame_step': frame_step,
+        'wall_seconds': round(wall_seconds, 2),
+        'inference_seconds': round(inference_seconds, 2),
+        'analyzed_fps': round(frames_analyzed / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        'realtime_factor': round(video_seconds / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        'alerts': alert_count,
+        'incidents': {behavior: count for behavior, count, _ in monitor.stats.snapshot(monitor.class_name)}
+                     if monitor.stats is not None else {}
+    }
+
+
+def print_report(report):
+    print(f"\nAnalysis complete: {report['video']}")
+    print(f"- Video length: {report['video_seconds']}s @ {report['video_fps']:.1f} fps")
+    print(f"- Frames analyzed: {report['frames_analyzed']} of {report['frames_decoded']} "
+          f"(batch {report['batch_size']}, step {report['frame_step']})")
+    print(f"- Wall time: {report['wall_seconds']}s (inference {report['inference_seconds']}s)")
+    print(f"- Throughput: {report['analyzed_fps']} fps, {report['realtime_factor']}x real time")
+    print(f"- Alerts: {report['alerts']}")
+    for behavior, count in report['incidents'].items():
+        print(f"  {behavior.ljust(20)}{count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded lesson videos without a display")
+    parser.add_argument("--class", dest="class_name", required=True, help="Class to log incidents for, e.g. 6a")
+    parser.add_argument("--video", nargs="+", required=True, help="Video file(s) to analyze")
+    parser.add_argument("--backend", default=None, help="Inference backend (default: config.INFERENCE_BACKEND)")
+    parser.add_argument("--batch", type=int, default=8, help="Frames per forward pass")
+    parser.add_argument("--frame-step", type=int, default=1, help="Analyze every n-th frame")
+    parser.add_argument("--start", default=None,
+                        help="Recording start 'YYYY-MM-DD HH:MM:SS' (single video only)")
+    parser.add_argument("--no-db", action="store_true", help="Do not write incidents to the database")
+    parser.add_argument("--storage", default=None, help="Storage backend (default: config.STORAGE_BACKEND)")
+    parser.add_argument("--report", default=None, help="Write the throughput reports to this JSON file")
+    args = parser.parse_args()
+
+    start_time = datetime.strptime(args.start, "%Y-%m-%d %H:%M:%S") if args.start else None
+    if start_time is not None and len(args.video) > 1:
+        parser.error("--start can only be used with a single video")
+
+    writer = None
+    repository = None
+    if not args.no_db:
+        repository = create_repository(args.storage)
+        if repository is None:
+            raise SystemExit("Failed to connect to database")
+        # No frame deadline here, so the writer may block the analysis instead of dropping rows
+        writer = IncidentWriter(repository, batch_size=1000, flush_interval_ms=1000, put_timeout=None)
+        writer.start()
+
+    engine = create_engine(args.backend)
+    if args.batch > 1 and engine.provides_track_ids:
+        print("Note: batched inference runs detection only; IDs come from the built-in IoU tracker "
+              "(use --batch 1 to keep the backend's tracker)")
+    monitor = BehaviorMonitor(args.class_name, writer, engine, repository, IncidentStats())
+
+    reports = []
+    try:
+        for path in args.video:
+            report = analyze_video(path, monitor, engine, args.batch, args.frame_step, start_time)
+            print_report(report)
+            reports.append(report)
+    finally:
+        if writer is not None:
+            writer.close(timeout=60)
+            repository.close()
+            print(f"\nIncidents written: {writer.written} (dropped: {writer.dropped})")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"Report saved to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
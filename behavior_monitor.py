@@ -0,0 +1,489 @@
+'''
+Core behavior monitoring logic, independent of the Tk user interface.
+
+BehaviorMonitor is used by the live monitor in main_UI.py and by the headless
+video analyser in analyze_video.py.
+'''
+
+import time
+from datetime import datetime
+
+import config
+from alert_log import Alert
+from episodes import EpisodeTracker
+from inference_backends import create_engine
+from iou_tracker import IouTracker
+from metrics import metrics
+from motion_gate import MotionGate
+from overlay import OverlayRenderer
+from storage import StorageError
+from track_propagation import TrackPropagator
+from track_state import TrackStateStore
+
+# Mock student IDs
+STUDENT_IDS = [f"STU-{i:03d}" for i in range(1, 31)]
+
+# ======================== CORE LOGIC ========================
+class BehaviorMonitor:
+    """
+    A real-time behavior monitoring system using YOLO object detection.
+    
+    Primary Objectives:
+    1. Detect and track student behaviors (eating, sleeping, phone use, etc.)
+    2. Generate alerts for specific behaviors with configurable thresholds
+    3. Maintain persistent tracking of students across video frames
+    4. Log incidents to a database for analysis
+    
+    Key Features:
+    - Behavior detection using YOLO model
+    - Persistent ID tracking across frames
+    - Configurable alert thresholds
+    - Visual annotation of detected behaviors
+    - Database logging of incidents
+    """
+    def __init__(self, class_name, incident_writer=None, engine=None, repository=None, stats=None,
+                 clip_recorder=None):
+        """
+        Initialize the behavior monitoring system.
+        
+        Parameters:
+        -----------
+        class_name : str
+            Identifier for the class/group being monitored (class_id in the incidents table)
+        incident_writer : IncidentWriter, optional
+            Background writer that receives incident rows; alerts are not
+            persisted when omitted
+        engine : InferenceEngine, optional
+            Inference backend; defaults to the one selected in config.py
+        repository : IncidentRepository, optional
+            Storage used to clear the class's incidents in reset_statistics
+        stats : IncidentStats, optional
+            Running per-behavior totals, updated as incidents are produced
+        clip_recorder : ClipRecorder, optional
+            Keeps recent annotated frames and writes a clip for the first
+            alert of each episode
+            
+        Initializes:
+        ------------
+        - Inference engine (PyTorch, ONNX Runtime or OpenVINO) with pretrained weights
+        - Behavior mapping between class IDs and names
+        - Tracking and timing dictionaries
+        - Database connection parameters
+        """
+        self.class_name = class_name.lower()
+        # Alert cooldowns per student, evicted once a track is gone
+        self.track_states = TrackStateStore(config.TRACK_STATE_TTL_SECONDS, config.TRACK_STATE_MAX_TRACKS)
+        # Continuous behavior episodes; each one is logged once, when it ends
+        self.episodes = EpisodeTracker(config.EPISODE_MIN_FRAMES, config.EPISODE_END_GAP_SECONDS)
+        self.current_behaviors = {}
+        self.detection_active = False
+        self.last_detection_time = 0
+        self.detection_interval = config.DETECTION_INTERVAL_FRAMES  # Frames between detector runs
+        self.detection_interval_seconds = config.DETECTION_INTERVAL_SECONDS
+        self.last_detection_frame = 0
+        self.propagator = TrackPropagator()  # Moves boxes between keyframes
+        # Skips the detector on keyframes where nothing moved
+        self.motion_gate = None
+        if config.MOTION_GATE_ENABLED:
+            self.motion_gate = MotionGate(config.MOTION_GATE_WIDTH, config.MOTION_GATE_GRID,
+                                          config.MOTION_PIXEL_THRESHOLD, config.MOTION_REGION_THRESHOLD,
+                                          config.MOTION_MAX_SKIP_SECONDS)
+            metrics.gauge("motion_skip_ratio", lambda: round(self.motion_gate.skip_ratio, 3))
+        self.frame_count = 0
+        # Persistent IDs when the engine does not track (or TRACKER = "iou")
+        self.fallback_tracker = IouTracker(config.IOU_TRACKER_THRESHOLD, config.IOU_TRACKER_MAX_DISTANCE,
+                                           config.IOU_TRACKER_MAX_AGE)
+        self.incident_writer = incident_writer
+        self.repository = repository
+        self.stats = stats
+        self.clip_recorder = clip_recorder
+        self.renderer = OverlayRenderer()
+        
+        self.model_path = config.MODEL_PATH
+        self.engine = engine if engine is not None else create_engine()
+        self._pending_engine = None   # Set by swap_engine, applied before the next frame
+        self._pending_reset = False   # Set by start_detection / reset_statistics, same mechanism
+        self._previous_engine = None  # Kept until the swapped-in engine succeeds once
+        print(f"Model loaded successfully ({type(self.engine).__name__}). Classes:", self.engine.names)
+        
+        self.behavior_map = {
+            0: "Eating",
+            1: "Looking_around",
+            2: "Sleeping",
+            3: "Watching_phone"
+        }
+        self.frame_count = 0
+        self.start_time = time.time()
+
+    def reset_statistics(self):
+        """
+        Reset all monitoring statistics and database records.
+        
+        Actions:
+        --------
+        1. Clears the class's rows from the incidents table
+        2. Resets all tracking state (on the inference thread, before its next frame)
+        3. Maintains model state and configuration
+        
+        Database errors (StorageError) are reported and leave the
+        in-memory state untouched.
+        """
+        try:
+            self.episodes.clear()
+            if self.incident_writer is not None:
+                # Rows queued (or kept for a retry) before the reset must not
+                # be inserted after the delete
+                self.incident_writer.discard(self.class_name)
+            if self.repository is not None:
+                self.repository.delete_class(self.class_name)
+            if self.stats is not None:
+                self.stats.reset(self.class_name)
+            self._pending_reset = True
+            print(f"Statistics reset for class {self.class_name}")
+        except StorageError as e:
+            print(f"Error resetting statistics: {e}")
+
+    def start_detection(self):
+        self.episodes.clear()
+        self._pending_reset = True
+        self.detection_active = True
+
+    def _apply_pending_reset(self):
+        """
+        Clear the per-track state on the inference thread.
+
+        start_detection and reset_statistics run on the Tk thread while a
+        frame may be in process_detections; the track store, trackers and
+        motion gate are not locked, so they only request the reset and it
+        happens here, between two frames.
+        """
+        self._pending_reset = False
+        self.episodes.clear()
+        self.track_states.clear()
+        self.current_behaviors = {}
+        self.last_detection_time = 0
+        self.propagator.reset()
+        self.fallback_tracker.reset()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+
+    def stop_detection(self):
+        self.detection_active = False
+        # Episodes still in progress end now
+        for episode in self.episodes.close_all():
+            self._record_episode(episode)
+
+
+    def _is_keyframe(self, current_time):
+        """
+        Decide whether the detector runs on this frame.
+        
+        Keyframes happen every `detection_interval` frames and/or every
+        `detection_interval_seconds` seconds (a value of 0 disables that
+        criterion). Other frames reuse the propagated tracks.
+        """
+        if self.last_detection_time == 0:
+            return True
+        if self.detection_interval > 0 and self.frame_count - self.last_detection_frame >= self.detection_interval:
+            return True
+        if self.detection_interval_seconds > 0 and current_time - self.last_detection_time >= self.detection_interval_seconds:
+            return True
+        return False
+
+    def class_name_mismatch(self, names):
+        """
+        Differences between a model's class names and behavior_map.
+
+        Names are compared case-insensitively.
+
+        Returns:
+        --------
+        list of str
+            One entry per mismatching class ID; empty if the model fits
+        """
+        mismatch = []
+        for class_id, behavior in self.behavior_map.items():
+            name = names.get(class_id)
+            if name is None or str(name).lower() != behavior.lower():
+                mismatch.append(f"{class_id}: {name!r} != {behavior!r}")
+        return mismatch
+
+    def swap_engine(self, engine):
+        """
+        Replace the inference engine between two frames (hot reload).
+
+        Thread-safe: the swap happens on the inference thread at the start of
+        the next process_frame, so no frame is dropped. Alert state, episodes
+        and IoU-tracker IDs are kept. A backend with its own tracker starts a
+        new one, so open episodes are closed and track states reset to avoid
+        mixing old and new track IDs.
+        """
+        self._pending_engine = engine
+
+    def _apply_pending_engine(self):
+        engine, self._pending_engine = self._pending_engine, None
+        self._previous_engine, self.engine = self.engine, engine
+        if engine.provides_track_ids:
+            for episode in self.episodes.close_all():
+                self._record_episode(episode)
+            self.track_states.clear()
+            self.propagator.reset()
+        print(f"Switched to new model ({type(engine).__name__}). Classes:", engine.names)
+
+    def _infer(self, frame):
+        """Run the engine; a freshly swapped engine that fails is rolled back."""
+        try:
+            det = self.engine.infer(frame)
+        except Exception as e:
+            if self._previous_engine is None:
+                raise
+            print(f"New model failed on its first frame ({e}); rolling back")
+            self.engine, self._previous_engine = self._previous_engine, None
+            return self.engine.infer(frame)
+        self._previous_engine = None
+        return det
+
+    def _has_motion(self, frame, current_time):
+        """
+        Ask the motion gate whether a keyframe needs the detector.
+        
+        A skipped keyframe does not move last_detection_time, so the gate is
+        consulted again on the next frame until something moves or its
+        minimum inference rate forces a detector run.
+        """
+        if self.motion_gate is None:
+            return True
+        with metrics.timer("motion_gate"):
+            motion = self.motion_gate.check(frame, current_time)
+        if not motion:
+            metrics.count("motion_skipped")
+        return motion
+
+    def process_frame(self, frame, timestamp=None):
+        """
+        Process a single video frame for behavior detection.
+        
+        Parameters:
+        -----------
+        frame : numpy.ndarray
+            Input video frame in BGR format
+        timestamp : float, optional
+            Frame time in epoch seconds; defaults to the wall clock. Recorded
+            videos pass their own video time so timers follow the footage.
+            
+        Returns:
+        --------
+        tuple
+            (annotated_frame, alerts)
+            - annotated_frame: Input frame with visual annotations
+            - alerts: List of Alert objects generated
+            
+        Processing Pipeline:
+        -------------------
+        1. Skip processing if detection inactive
+        2. Run detection/tracking on keyframes with motion (see MotionGate),
+           propagate tracks otherwise
+        3. Trigger alerts based on behavior rules
+        4. Annotate all detected behaviors in a single overlay pass
+        5. Return annotated frame and alerts
+        """
+        
+        if not self.detection_active:
+            return frame, []            
+
+        current_time = timestamp if timestamp is not None else time.time()
+        self.frame_count += 1
+        if self._pending_reset:
+            self._apply_pending_reset()
+        if self._pending_engine is not None:
+            self._apply_pending_engine()
+        if self._is_keyframe(current_time) and self._has_motion(frame, current_time):
+            with metrics.timer("inference"):
+                det = self._infer(frame)
+            self.last_detection_time = current_time
+            self.last_detection_frame = self.frame_count
+            return self.process_detections(frame, det, current_time)
+
+        # Between keyframes (and on static keyframes), boxes follow their
+        # estimated motion; behaviors and track IDs are carried over so sleep
+        # timers and cooldowns keep running
+        with metrics.timer("propagate"):
+            det = self.propagator.predict(current_time, frame.shape)
+        return self.process_detections(frame, det, current_time, keyframe=False)
+
+    def process_detections(self, frame, det, timestamp=None, annotate=True, keyframe=True):
+        """
+        Apply the behavior and alert rules to detections of one frame.
+        
+        Used by process_frame, and directly by callers that run inference
+        themselves (e.g. batched inference in analyze_video.py).
+        
+        Parameters:
+        -----------
+        frame : numpy.ndarray
+            Frame the detections belong to (annotated in place)
+        det : Detections
+            Output of an inference engine for this frame
+        timestamp : float, optional
+            Frame time in epoch seconds; defaults to the wall clock
+        annotate : bool
+            Draw boxes and labels on the frame
+        keyframe : bool
+            False for propagated detections, which must not re-seed the propagator
+            
+        Returns:
+        --------
+        tuple
+            (annotated_frame, alerts)
+        """
+        current_time = timestamp if timestamp is not None else time.time()
+        if self._pending_reset:
+            self._apply_pending_reset()  # Callers that run inference themselves
+        alerts = []
+        detections = []
+        rules_start = time.perf_counter()
+        self.track_states.evict_expired(current_time)
+
+        track_ids = det.track_ids
+        if track_ids is None:
+            track_ids = self.fallback_tracker.update(det.boxes, current_time)
+        elif not keyframe:
+            # Propagated boxes (between keyframes or on frames skipped by the
+            # motion gate) keep the IoU tracker's tracks on the students
+            self.fallback_tracker.refresh(track_ids, det.boxes)
+        if keyframe:
+            self.propagator.update(track_ids, det.boxes, det.confs, det.class_ids, current_time)
+
+        for box, conf, cls_id, track_id in zip(det.boxes, det.confs, det.class_ids, track_ids):
+            if conf > 0.5:
+                x1, y1, x2, y2 = map(int, box)
+                behavior = self.behavior_map.get(cls_id, "unknown")
+                student_id = f"STU-{track_id:03d}"
+                
+                detections.append((x1, y1, x2, y2, behavior, student_id))
+                
+                self.episodes.observe(student_id, behavior, current_time)
+                if behavior == "Sleeping":
+                    alert = self._handle_sleep_detection(student_id, current_time)
+                else:
+                    alert = self._trigger_alert(student_id, behavior, current_time=current_time)
+                if alert:
+                    alerts.append(alert)
+                    self._request_clip(alert)
+
+        for episode in self.episodes.sweep(current_time):
+            self._record_episode(episode)
+        metrics.observe("rules", time.perf_counter() - rules_start)
+
+        if annotate:
+            with metrics.timer("overlay"):
+                self.renderer.render(frame, detections)
+        if self.clip_recorder is not None:
+            self.clip_recorder.push(frame, current_time)
+        metrics.mark("frames")
+        return frame, alerts
+
+    def _handle_sleep_detection(self, student_id, current_time=None):
+        """
+        Special handling for sleeping behavior detection.
+        
+        Parameters:
+        -----------
+        student_id : str
+            Unique identifier for the student
+        current_time : float, optional
+            Frame time in epoch seconds (defaults to the wall clock)
+            
+        Returns:
+        --------
+        str or None
+            Alert message if sleep duration threshold exceeded
+            
+        Logic Flow:
+        ----------
+        1. Sleep duration is the age of the student's current sleeping episode
+           (a few missed frames do not restart it)
+        2. Trigger alert after 5+ seconds, then at most every 5 seconds
+           (alert cooldown) with the running duration
+        """
+        if current_time is None:
+            current_time = time.time()
+        episode = self.episodes.get(student_id, "Sleeping")
+        if episode is None:
+            return None
+        
+        sleep_duration = current_time - episode.start
+        if sleep_duration >= 5:
+            return self._trigger_alert(student_id, "Sleeping", int(sleep_duration), current_time)
+        return None
+
+    def _trigger_alert(self, student_id, behavior, duration=0, current_time=None):
+        """
+        Generate behavior alerts for the UI.
+        
+        Parameters:
+        -----------
+        student_id : str
+            Unique student identifier
+        behavior : str
+            Detected behavior class
+        duration : int, optional
+            Duration for timed behaviors (e.g., sleeping)
+        current_time : float, optional
+            Frame time in epoch seconds (defaults to the wall clock)
+            
+        Returns:
+        --------
+        Alert or None
+            Alert (time, student, behavior, duration, color) if alert should
+            be raised; its text is only formatted when displayed
+            None if alert was recently triggered
+            
+        Alerts are not logged; incidents are written per episode by
+        _record_episode.
+        """
+        if current_time is None:
+            current_time = time.time()
+        colors = {
+            "Sleeping": "#ff0000",    # Red
+            "Eating": "#00ff00",      # Green
+            "Looking_around": "#ffff00", # Yellow
+            "Watching_phone": "#ffa500"  # Orange
+        }
+        color = colors.get(behavior, "#ffffff")
+        state = self.track_states.touch(student_id, current_time)
+        last_alert = state.alert_times.get(behavior)
+        if last_alert is not None and current_time - last_alert < 5:
+            return None
+        
+        state.alert_times[behavior] = current_time
+        return Alert(current_time, student_id, behavior, duration, color)
+
+    def _request_clip(self, alert):
+        """Schedule an evidence clip for the alert's episode, once per episode."""
+        if self.clip_recorder is None:
+            return
+        episode = self.episodes.get(alert.student_id, alert.behavior)
+        if episode is not None and episode.clip_path is None:
+            episode.clip_path = self.clip_recorder.request(alert.student_id, alert.behavior, alert.timestamp)
+
+    def _record_episode(self, episode):
+        """
+        Log one finished behavior episode.
+        
+        Database Operations:
+        -------------------
+        - Queues one incident record on the IncidentWriter
+        - Updates the in-memory IncidentStats totals
+        - Tagged with the class_id of this monitor
+        - Includes start time, end time, true duration in seconds and the
+          evidence clip path (if one was recorded)
+        - Never blocks on the database; rows are written in batches
+        """
+        duration = int(round(episode.duration))
+        if self.incident_writer is not None:
+            self.incident_writer.enqueue(self.class_name, episode.student_id, episode.behavior,
+                                         datetime.fromtimestamp(episode.start), duration,
+                                         datetime.fromtimestamp(episode.last_seen), episode.clip_path)
+        if self.stats is not None:
+            self.stats.record(self.class_name, episode.behavior, duration)
@@ -0,0 +1,109 @@
+'''
+Micro-benchmark: overlay drawing cost per frame vs. number of detections.
+
+Compares the old per-box approach (frame.copy() + full-frame addWeighted for
+every box) with OverlayRenderer's single-pass rendering.
+
+Usage:
+    python bench_overlay.py [--width 1920] [--height 1080] [--repeats 50]
+'''
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from overlay import OverlayRenderer
+
+BEHAVIORS = ["Eating", "Looking_around", "Sleeping", "Watching_phone"]
+
+
+def legacy_draw_boxes(frame, x1, y1, x2, y2, behavior, student_id):
+    """The per-box implementation OverlayRenderer replaced, kept here for comparison."""
+    colors = {
+        "Sleeping": (50, 50, 255),
+        "Eating": (0, 255, 0),
+        "Looking_around": (0, 255, 255),
+        "Watching_phone": (0, 165, 255)
+    }
+    color = colors.get(behavior, (0, 255, 0))
+    overlay = frame.copy()
+    cv2.rectangle(overlay, (x1, y1), (x2, y2), color, 2)
+    label = f"{student_id}: {behavior.replace('_', ' ').title()}"
+    cv2.putText(overlay, label, (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
+
+
+def make_detections(count, width, height, rng):
+    """Random student-sized boxes spread over the frame."""
+    detections = []
+    for i in range(count):
+        w = int(rng.integers(width // 20, width // 8))
+        h = int(rng.integers(height // 10, height // 4))
+        x1 = int(rng.integers(0, width - w))
+        y1 = int(rng.integers(20, height - h))
+        detections.append((x1, y1, x1 + w, y1 + h, BEHAVIORS[i % len(BEHAVIORS)], f"STU-{i + 1:03d}"))
+    return detections
+
+
+def time_per_frame(draw, base_frame, repeats):
+    frame = base_frame.copy()
+    draw(frame)  # Warm-up (buffer allocation, label cache)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        np.copyto(frame, base_frame)
+        draw(frame)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def run_benchmark(width=1920, height=1080, counts=(0, 1, 5, 10, 20, 30, 50), repeats=50, seed=0):
+    """
+    Time both implementations for each detection count.
+
+    Returns:
+    --------
+    list of dict
+        One row per count: {'detections', 'legacy_ms', 'renderer_ms', 'speedup'}
+    """
+    rng = np.random.default_rng(seed)
+    base_frame = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    renderer = OverlayRenderer()
+    rows = []
+
+    for count in counts:
+        detections = make_detections(count, width, height, rng)
+
+        def legacy(frame):
+            for det in detections:
+                legacy_draw_boxes(frame, *det)
+
+        def single_pass(frame):
+            renderer.render(frame, detections)
+
+        # Subtract the per-iteration frame reset so only drawing is measured
+        reset_ms = time_per_frame(lambda frame: None, base_frame, repeats)
+        legacy_ms = max(0.0, time_per_frame(legacy, base_frame, repeats) - reset_ms)
+        renderer_ms = max(0.0, time_per_frame(single_pass, base_frame, repeats) - reset_ms)
+        rows.append({
+            'detections': count,
+            'legacy_ms': legacy_ms,
+            'renderer_ms': renderer_ms,
+            'speedup': legacy_ms / renderer_ms if renderer_ms > 0 else float('inf')
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark overlay rendering")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"Overlay rendering, {args.width}x{args.height}, {args.repeats} repeats")
+    print("Detections".ljust(12) + "Legacy ms".ljust(12) + "Single-pass ms".ljust(16) + "Speedup")
+    print("-" * 50)
+    for row in run_benchmark(args.width, args.height, repeats=args.repeats):
+        print(f"{str(row['detections']).ljust(12)}{row['legacy_ms']:<12.2f}"
+              f"{row['renderer_ms']:<16.2f}{row['speedup']:.1f}x")
@@ -0,0 +1,332 @@
+'''
+End-to-end benchmark of BehaviorMonitor.process_frame.
+
+Replays a recorded video (or synthetic frames) through the full frame path:
+inference, tracking, alert and episode rules, overlay and incident writes.
+Storage is an in-memory SQLite repository, so no database server is needed
+and disk speed does not skew the results. Frames are preloaded and stamped
+with video time, so runs are repeatable.
+
+For every configuration in the grid it reports frames/sec, per-frame latency
+percentiles, peak RSS, memory allocated per frame and (with --stages) the
+per-stage breakdown from metrics.py. Results are written as JSON and can be
+checked against a previous run.
+
+Engines:
+- synthetic   : no model; returns --detections jittered boxes per frame, to
+                measure everything around inference
+- ultralytics : config.MODEL_PATH, with --imgsz, --trackers and --threads (torch threads)
+- onnxruntime : config.ONNX_MODEL_PATH, with --imgsz and --threads (intra-op threads)
+
+Usage:
+    python benchmark.py --engine synthetic --detections 10 30 50 --output bench.json
+    python benchmark.py --engine ultralytics --video lesson.mp4 --imgsz 320 640 \\
+        --trackers botsort bytetrack none --threads 2 4 --output bench.json
+    python benchmark.py --engine synthetic --baseline bench.json --tolerance 10
+'''
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+import config
+from behavior_monitor import BehaviorMonitor
+from incident_stats import IncidentStats
+from incident_writer import IncidentWriter
+from inference_backends import Detections, InferenceEngine
+from metrics import metrics
+from storage import SQLiteIncidentRepository
+
+try:
+    import psutil
+except ImportError:  # Peak RSS falls back to the resource module (Unix only)
+    psutil = None
+
+
+# ======================== INPUTS ========================
+class SyntheticEngine(InferenceEngine):
+    """
+    Stand-in detector returning `count` student boxes on a seat grid.
+
+    Boxes jitter by a few pixels and behaviors change now and then, like a
+    real classroom, so tracking, episodes and alerts do real work.
+    """
+    names = {0: "Eating", 1: "Looking_around", 2: "Sleeping", 3: "Watching_phone"}
+
+    def __init__(self, count, width, height, seed=0):
+        self.rng = np.random.default_rng(seed)
+        cols = max(1, int(np.ceil(np.sqrt(count * width / height))))
+        rows = int(np.ceil(count / cols)) if count else 0
+        cell_w, cell_h = width / cols, height / max(rows, 1)
+        seats = [(c * cell_w, r * cell_h) for r in range(rows) for c in range(cols)][:count]
+        self.base = np.array([[x + cell_w * 0.2, y + cell_h * 0.2, x + cell_w * 0.8, y + cell_h * 0.9]
+                              for x, y in seats], dtype=np.float32).reshape(-1, 4)
+        self.class_ids = self.rng.integers(0, 4, len(self.base))
+
+    def infer(self, frame):
+        n = len(self.base)
+        change = self.rng.random(n) < 0.02
+        self.class_ids[change] = self.rng.integers(0, 4, int(change.sum()))
+        boxes = self.base + self.rng.normal(0, 2, self.base.shape).astype(np.float32)
+        confs = self.rng.uniform(0.6, 0.95, n).astype(np.float32)
+        return Detections(boxes, confs, self.class_ids.copy(), None)
+
+
+def synthetic_frames(count, width, height, seed=0):
+    """Noisy frames with moving blocks, so codecs and resizes are not trivially cheap."""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x = (i * 7) % max(1, width - 100)
+        cv2.rectangle(frame, (x, height // 3), (x + 100, height // 3 + 100), (40, 200, 40), -1)
+        frames.append(frame)
+    return frames
+
+
+def load_video(path, count):
+    """Decode up to `count` frames into memory (decoding is not part of the measurement)."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise IOError(f"No frames decoded from {path}")
+    return frames, fps
+
+
+def build_engine(engine, imgsz, tracker, threads, detections, frame_shape):
+    """Inference engine for one configuration."""
+    if engine == "synthetic":
+        return SyntheticEngine(detections, frame_shape[1], frame_shape[0])
+    if engine == "ultralytics":
+        import torch
+        from inference_backends import UltralyticsEngine
+        if threads:
+            torch.set_num_threads(threads)
+        return UltralyticsEngine(config.MODEL_PATH, config.DEVICE, imgsz, config.CONF_THRESHOLD,
+                                 config.IOU_THRESHOLD, None if tracker == "none" else f"{tracker}.yaml")
+    if engine == "onnxruntime":
+        from inference_backends import OnnxRuntimeEngine
+        return OnnxRuntimeEngine(config.ONNX_MODEL_PATH, imgsz, config.CONF_THRESHOLD,
+                                 config.IOU_THRESHOLD, threads or 0, config.ORT_INTER_OP_THREADS)
+    raise ValueError(f"Unknown engine: {engine}")
+
+
+# ======================== MEASUREMENT ========================
+def _rss_mb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2 ** 20
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_config(frames, fps, engine, warmup=20, alloc_frames=20, stages=False):
+    """
+    Replay `frames` through a fresh BehaviorMonitor using `engine`.
+
+    Returns:
+    --------
+    dict
+        fps, latency percentiles (ms), peak RSS (MB), allocations per frame
+    """
+    repository = SQLiteIncidentRepository(":memory:")
+    writer = IncidentWriter(repository)
+    writer.start()
+    monitor = BehaviorMonitor("bench", writer, engine, repository, IncidentStats())
+    monitor.start_detection()
+    work = frames[0].copy()
+
+    def step(i):
+        np.copyto(work, frames[i % len(frames)])  # process_frame draws on the frame
+        start = time.perf_counter()
+        monitor.process_frame(work, i / fps)
+        return time.perf_counter() - start
+
+    for i in range(warmup):
+        step(i)
+
+    metrics.reset()
+    metrics.enabled = stages
+    latencies = []
+    peak_rss = _rss_mb()
+    for i in range(warmup, warmup + len(frames)):
+        latencies.append(step(i))
+        if i % 10 == 0:
+            peak_rss = max(peak_rss, _rss_mb())
+    peak_rss = max(peak_rss, _rss_mb())
+    metrics.enabled = False
+    stage_summary = {stage: h.summary() for stage, h in metrics.stages.items()} if stages else None
+
+    # Allocation pass, separate because tracemalloc slows everything down
+    tracemalloc.start()
+    peaks = []
+    blocks_before = sys.getallocatedblocks()
+    for i in range(alloc_frames):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        step(warmup + len(frames) + i)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - current)
+    blocks_per_frame = (sys.getallocatedblocks() - blocks_before) / max(1, alloc_frames)
+    tracemalloc.stop()
+
+    monitor.stop_detection()
+    writer.close()
+    repository.close()
+
+    total = sum(latencies)
+    ordered = sorted(latencies)
+    result = {
+        'frames': len(latencies),
+        'fps': round(len(latencies) / total, 2) if total else 0.0,
+        'mean_ms': round(total / len(latencies) * 1000, 3),
+        'p50_ms': round(_percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(_percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(_percentile(ordered, 99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'peak_rss_mb': round(peak_rss, 1),
+        'alloc_kb_per_frame': round(sum(peaks) / max(1, len(peaks)) / 1024, 1),
+        'net_blocks_per_frame': round(blocks_per_frame, 1),
+        'incidents_written': writer.written
+    }
+    if stage_summary is not None:
+        result['stages'] = stage_summary
+    return result
+
+
+# ======================== REGRESSION CHECK ========================
+CONFIG_KEYS = ("engine", "imgsz", "tracker", "threads", "detections", "resolution")
+
+
+def _config_key(result):
+    return tuple(result.get(k) for k in CONFIG_KEYS)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline run of the same configurations.
+
+    A configuration regresses if its fps drops, or its p95 latency rises, by
+    more than `tolerance` percent.
+
+    Returns:
+    --------
+    list of str
+        One message per regression
+    """
+    previous = {_config_key(r): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get(_config_key(result))
+        if old is None:
+            continue
+        name = ", ".join(f"{k}={result[k]}" for k in CONFIG_KEYS if result.get(k) is not None)
+        if old['fps'] and result['fps'] < old['fps'] * (1 - tolerance / 100):
+            regressions.append(f"{name}: fps {old['fps']} -> {result['fps']}")
+        if old['p95_ms'] and result['p95_ms'] > old['p95_ms'] * (1 + tolerance / 100):
+            regressions.append(f"{name}: p95 {old['p95_ms']}ms -> {result['p95_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of BehaviorMonitor.process_frame")
+    parser.add_argument("--engine", default="synthetic", choices=["synthetic", "ultralytics", "onnxruntime"])
+    parser.add_argument("--video", default=None, help="Recorded video to replay (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=300, help="Measured frames per configuration")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured frames before each run")
+    parser.add_argument("--alloc-frames", type=int, default=20, help="Frames measured with tracemalloc")
+    parser.add_argument("--resolution", default="1280x720", help="Synthetic frame size WxH")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[config.IMGSZ])
+    parser.add_argument("--trackers", nargs="+", default=["none"], choices=["botsort", "bytetrack", "none"],
+                        help="'none' runs detection only with the built-in IoU tracker")
+    parser.add_argument("--threads", type=int, nargs="+", default=[0], help="0 keeps the library default")
+    parser.add_argument("--detections", type=int, nargs="+", default=[30], help="Synthetic engine only")
+    parser.add_argument("--stages", action="store_true", help="Include the per-stage breakdown")
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Previous results JSON to check against")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    if args.video:
+        frames, fps = load_video(args.video, args.frames)
+        resolution = f"{frames[0].shape[1]}x{frames[0].shape[0]}"
+    else:
+        width, height = (int(v) for v in args.resolution.lower().split("x"))
+        frames, fps, resolution = synthetic_frames(args.frames, width, height), 25.0, args.resolution
+
+    # Parameters an engine ignores collapse to a single value
+    synthetic = args.engine == "synthetic"
+    grid = itertools.product(
+        [None] if synthetic else args.imgsz,
+        args.trackers if args.engine == "ultralytics" else ["none"],
+        [None] if synthetic else args.threads,
+        args.detections if synthetic else [None],
+    )
+
+    results = []
+    for imgsz, tracker, threads, detections in grid:
+        engine = build_engine(args.engine, imgsz, tracker, threads, detections, frames[0].shape)
+        result = {'engine': args.engine, 'imgsz': imgsz, 'tracker': tracker, 'threads': threads,
+                  'detections': detections, 'resolution': resolution}
+        result.update(run_config(frames, fps, engine, args.warmup, args.alloc_frames, args.stages))
+        results.append(result)
+        print(f"imgsz={imgsz} tracker={tracker} threads={threads} detections={detections}: "
+              f"{result['fps']} fps, p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, "
+              f"p99 {result['p99_ms']}ms, RSS {result['peak_rss_mb']}MB, "
+              f"{result['alloc_kb_per_frame']}KB/frame")
+
+    report = {
+        'meta': {
+            'time': datetime.now().isoformat(timespec="seconds"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'video': args.video or "synthetic"
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+'''
+Box statistics for every class in one pass.
+
+check_box_height.analyze_boxes handles one class per call and shows its
+plots interactively. This script reads the label index (label_index.py)
+once and computes, for all classes together:
+
+- width, height, area and aspect (w / h, in normalized units) quantiles
+- 2D histograms of width x height and of box centres
+- objects per image, overall and per class
+
+Rows are grouped by class with one argsort, counts use np.bincount and the
+histograms np.histogram2d. Results are written to stats.json and the
+figures are saved as PNG files with matplotlib's non-interactive Agg
+backend, so it runs headless on the training server.
+
+Usage:
+    python box_stats.py path/to/train/labels --output box_stats
+    python box_stats.py path/to/train/labels --data data.yaml --bins 40
+'''
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from label_index import build_index
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+# Objects-per-image histograms are capped here; the last bin holds larger counts
+MAX_COUNT_BIN = 50
+
+
+def _summary(values):
+    quantiles = np.quantile(values, QUANTILES)
+    summary = {
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'min': float(values.min()),
+        'max': float(values.max()),
+    }
+    summary.update({f"p{int(q * 100)}": float(v) for q, v in zip(QUANTILES, quantiles)})
+    return {k: round(v, 5) for k, v in summary.items()}
+
+
+def _count_histogram(counts):
+    """{objects in an image: number of images}, counts above MAX_COUNT_BIN in the last bin."""
+    histogram = np.bincount(np.minimum(counts, MAX_COUNT_BIN), minlength=1)
+    return {int(n): int(histogram[n]) for n in np.flatnonzero(histogram)}
+
+
+def compute_box_stats(index, bins=50):
+    """
+    Per-class box statistics over a LabelIndex.
+
+    Parameters:
+    -----------
+    index : LabelIndex
+    bins : int
+        Bins per axis of the 2D histograms (over the normalized range 0-1)
+
+    Returns:
+    --------
+    tuple
+        (stats, histograms): a JSON-serialisable dict, and
+        {class_id: {'size': (bins, bins) array, 'centre': (bins, bins) array}}
+    """
+    area = index.w * index.h
+    aspect = index.w / np.maximum(index.h, 1e-9)
+    per_file = index.boxes_per_file()
+    stats = {
+        'files': index.num_files,
+        'boxes': len(index),
+        'objects_per_image': {
+            'mean': round(float(per_file.mean()), 3) if len(per_file) else 0.0,
+            'max': int(per_file.max()) if len(per_file) else 0,
+            'histogram': _count_histogram(per_file),
+        },
+        'classes': {}
+    }
+    histograms = {}
+    if not len(index):
+        return stats, histograms
+
+    # Group the rows by class with one stable sort; each group is then a slice
+    order = np.argsort(index.class_ids, kind="stable")
+    class_counts = np.bincount(index.class_ids)
+    bounds = np.concatenate([[0], np.cumsum(class_counts)])
+
+    # Boxes of each class in each image: one bincount over (file, class) pairs
+    num_classes = len(class_counts)
+    per_file_class = np.bincount(index.file_ids.astype(np.int64) * num_classes + index.class_ids,
+                                 minlength=index.num_files * num_classes).reshape(index.num_files, num_classes)
+
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    for class_id in np.flatnonzero(class_counts):
+        rows = order[bounds[class_id]:bounds[class_id + 1]]
+        w, h = index.w[rows], index.h[rows]
+        counts = per_file_class[:, class_id]
+        stats['classes'][int(class_id)] = {
+            'boxes': int(len(rows)),
+            'images': int(np.count_nonzero(counts)),
+            'width': _summary(w),
+            'height': _summary(h),
+            'area': _summary(area[rows]),
+            'aspect': _summary(aspect[rows]),
+            'objects_per_image': _count_histogram(counts[counts > 0]),
+        }
+        histograms[int(class_id)] = {
+            'size': np.histogram2d(w, h, bins=(edges, edges))[0],
+            'centre': np.histogram2d(index.xc[rows], index.yc[rows], bins=(edges, edges))[0],
+        }
+    return stats, histograms
+
+
+# ======================== FIGURES ========================
+def save_figures(stats, histograms, index, output_dir, names=None):
+    """Write one size/centre heat-map figure per class and an overview figure."""
+    import matplotlib
+    matplotlib.use("Agg")  # No display needed
+    import matplotlib.pyplot as plt
+
+    names = names or {}
+    paths = []
+    for class_id, maps in histograms.items():
+        label = names.get(class_id, f"class {class_id}")
+        fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+        for ax, key, title, xlabel, ylabel in ((axes[0], 'size', 'Width x height', 'width', 'height'),
+                                               (axes[1], 'centre', 'Box centres', 'x centre', 'y centre')):
+            image = ax.imshow(maps[key].T, origin='lower', extent=(0, 1, 0, 1), aspect='auto', cmap='viridis')
+            ax.set_title(f"{label}: {title}")
+            ax.set_xlabel(xlabel)
+            ax.set_ylabel(ylabel)
+            fig.colorbar(image, ax=ax)
+        fig.tight_layout()
+        path = os.path.join(output_dir, f"class_{class_id}.png")
+        fig.savefig(path, dpi=100)
+        plt.close(fig)
+        paths.append(path)
+
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    class_ids = sorted(stats['classes'])
+    axes[0].bar([names.get(c, str(c)) for c in class_ids], [stats['classes'][c]['boxes'] for c in class_ids])
+    axes[0].set_title('Boxes per class')
+    counts = np.bincount(np.minimum(index.boxes_per_file(), MAX_COUNT_BIN), minlength=1)
+    axes[1].bar(np.arange(len(counts)), counts)
+    axes[1].set_title(f'Objects per image (last bar: {MAX_COUNT_BIN}+)')
+    fig.tight_layout()
+    path = os.path.join(output_dir, "overview.png")
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+    paths.append(path)
+    return paths
+
+
+def read_names(data_yaml):
+    """{class_id: name} from a YOLO data.yaml (list or dict form)."""
+    import yaml
+    with open(data_yaml) as f:
+        names = yaml.safe_load(f).get('names', {})
+    if isinstance(names, list):
+        return dict(enumerate(names))
+    return {int(k): v for k, v in names.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-class box statistics of a YOLO labels directory")
+    parser.add_argument("labels_dir")
+    parser.add_argument("--output", default="box_stats", help="Directory for stats.json and the figures")
+    parser.add_argument("--data", default=None, help="data.yaml to label classes by name")
+    parser.add_argument("--bins", type=int, default=50, help="Bins per axis of the 2D histograms")
+    parser.add_argument("--no-figures", action="store_true")
+    parser.add_argument("--workers", type=int, default=None, help="Label parsing processes")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_index(args.labels_dir, workers=args.workers)
+    stats, histograms = compute_box_stats(index, args.bins)
+    names = read_names(args.data) if args.data else {}
+    for class_id, class_stats in stats['classes'].items():
+        class_stats['name'] = names.get(class_id)
+
+    os.makedirs(args.output, exist_ok=True)
+    stats_path = os.path.join(args.output, "stats.json")
+    with open(stats_path, 'w') as f:
+        json.dump(stats, f, indent=2)
+    figures = [] if args.no_figures else save_figures(stats, histograms, index, args.output, names)
+
+    print(f"{stats['files']} images, {stats['boxes']} boxes in {time.perf_counter() - start:.2f}s")
+    for class_id, class_stats in stats['classes'].items():
+        label = names.get(class_id, f"class {class_id}")
+        print(f"  {label.ljust(18)} boxes {class_stats['boxes']:>7}  "
+              f"median w {class_stats['width']['p50']:.3f}  median h {class_stats['height']['p50']:.3f}")
+    print(f"Statistics saved to {stats_path}" + (f" ({len(figures)} figures)" if figures else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,15 @@
-import os
 import numpy as np
 import matplotlib.pyplot as plt
 
+from label_index import build_index
+
 def analyze_boxes(label_dir, class_id):
     """
     Analyzes the distribution of bounding box dimensions for a specific class in YOLO format dataset.
     
     This function processes label files to calculate and visualize width/height statistics of bounding boxes
     for a specified class, helping identify potential annotation issues or dataset biases.
+    Label files are read through the cached label index (label_index.py).
 
     Parameters:
     -----------
@@ -38,23 +40,10 @@ def analyze_boxes(label_dir, class_id):
     - Left: Histogram of normalized widths (0-1)
     - Right: Histogram of normalized heights (0-1)
     """
-    widths = []
-    heights = []
-    
-    for label_file in os.listdir(label_dir):
-        if not label_file.endswith('.txt'):
-            continue
-            
-        with open(os.path.join(label_dir, label_file), 'r') as f:
-            for line in f:
-                parts = line.strip().split()
-                if len(parts) != 5:
-                    continue
-                    
-                cls, xc, yc, w, h = map(float, parts)
-                if int(cls) == class_id:
-                    widths.append(w)
-                    heights.append(h)
+    index = build_index(label_dir)
+    mask = index.class_mask(class_id)
+    widths = index.w[mask]
+    heights = index.h[mask]
     
     # Calculate statistics
     stats = {
@@ -82,6 +71,7 @@ def analyze_boxes(label_dir, class_id):
     return stats
 
 # Usage: Analyze class 2 boxes in training set
-label_dir = r"C:\Users\user\Desktop\Machine Learning\INT4097\Project\New_img\train\labels"
-stats = analyze_boxes(label_dir, class_id=2)
-print(f"Box size statistics:\n{stats}")
\ No newline at end of file
+if __name__ == "__main__":
+    label_dir = r"C:\Users\user\Desktop\Machine Learning\INT4097\Project\New_img\train\labels"
+    stats = analyze_boxes(label_dir, class_id=2)
+    print(f"Box size statistics:\n{stats}")
\ No newline at end of file
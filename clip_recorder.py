@@ -0,0 +1,216 @@
+'''
+Evidence clips for incidents.
+
+An incident row alone does not show what the model saw. ClipRecorder keeps
+the last few seconds of annotated frames in a preallocated ring buffer
+(ClipBuffer) and, when an alert opens a new episode, a background thread
+writes the seconds around it to disk as a short MP4 clip or a JPEG strip.
+The file path is recorded on the episode's incident row (`clip_path`); if
+the clip cannot be written, the partial file is removed and `on_failed`
+(IncidentWriter.drop_clip in the app) clears the path again.
+
+The frame path only resizes the frame into the next ring slot (at most
+`fps` times per second) and puts a job on a small queue. Memory is fixed at
+capacity x width x height x 3 bytes. When the encoder falls behind and the
+queue is full, new clips are skipped (counted in `skipped`) and the incident
+is logged without one.
+'''
+
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from metrics import metrics
+
+
+class ClipBuffer:
+    """
+    Fixed-size ring of downscaled frames and their timestamps.
+
+    Parameters:
+    -----------
+    seconds : float
+        Time span the ring holds at `fps`
+    fps : float
+        Maximum rate at which frames are stored; faster input is thinned
+    width : int
+        Width of the stored frames (height keeps the aspect of the first frame)
+
+    The frame array is allocated on the first push and never grows; frames
+    are resized straight into their slot.
+    """
+    def __init__(self, seconds=6.0, fps=10, width=480):
+        self.fps = fps
+        self.width = width
+        self.capacity = max(1, int(np.ceil(seconds * fps)))
+        self.frames = None
+        self.source_shape = None
+        self.timestamps = np.full(self.capacity, -np.inf)
+        self.index = 0
+        self.last_timestamp = -np.inf
+        self._lock = threading.Lock()
+
+    def _allocate(self, frame):
+        h, w = frame.shape[:2]
+        height = max(2, int(round(h * self.width / w)) // 2 * 2)  # Even sizes for video codecs
+        self.frames = np.zeros((self.capacity, height, self.width, 3), dtype=np.uint8)
+        self.source_shape = frame.shape
+        self.timestamps.fill(-np.inf)
+
+    def push(self, frame, timestamp):
+        """Store a frame unless the previous one is less than 1/fps seconds old."""
+        if timestamp - self.last_timestamp < 1.0 / self.fps:
+            return False
+        with self._lock:
+            if frame.shape != self.source_shape:
+                self._allocate(frame)  # Only when the camera resolution changes
+            slot = self.frames[self.index]
+            cv2.resize(frame, (slot.shape[1], slot.shape[0]), dst=slot, interpolation=cv2.INTER_AREA)
+            self.timestamps[self.index] = timestamp
+            self.index = (self.index + 1) % self.capacity
+            self.last_timestamp = timestamp
+        return True
+
+    def snapshot(self, start, end):
+        """Copies of the frames with start <= timestamp <= end, oldest first."""
+        with self._lock:
+            if self.frames is None:
+                return []
+            selected = np.flatnonzero((self.timestamps >= start) & (self.timestamps <= end))
+            selected = selected[np.argsort(self.timestamps[selected])]
+            return [self.frames[i].copy() for i in selected]
+
+    def clear(self):
+        with self._lock:
+            self.timestamps.fill(-np.inf)
+            self.last_timestamp = -np.inf
+
+    @property
+    def memory_bytes(self):
+        return 0 if self.frames is None else self.frames.nbytes
+
+
+class ClipRecorder(threading.Thread):
+    """
+    Writes pre/post-event clips from a ClipBuffer on a background thread.
+
+    Parameters:
+    -----------
+    directory : str
+        Where clips are written (created if missing)
+    pre_seconds, post_seconds : float
+        Time kept before and after the alert
+    fps, width : see ClipBuffer
+    clip_format : str
+        "mp4" for a video clip or "jpg" for a strip of thumbnails
+    max_pending : int
+        Clips waiting to be written; further requests are skipped
+    on_failed : callable, optional
+        Called on the encoder thread with the path of a clip that could not
+        be written
+    """
+    _STOP = object()
+
+    def __init__(self, directory="clips", pre_seconds=3.0, post_seconds=2.0, fps=10, width=480,
+                 clip_format="mp4", max_pending=4, on_failed=None):
+        super().__init__(name="ClipRecorder", daemon=True)
+        self.directory = directory
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.clip_format = clip_format
+        self.on_failed = on_failed
+        # One extra second so the start of a clip is still there when its end arrives
+        self.buffer = ClipBuffer(pre_seconds + post_seconds + 1.0, fps, width)
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.stopping = threading.Event()
+        self.written = 0
+        self.skipped = 0
+        self.failed = 0
+        os.makedirs(directory, exist_ok=True)
+        metrics.gauge("clips_written", lambda: self.written)
+        metrics.gauge("clips_skipped", lambda: self.skipped)
+
+    # ------------------------------------------------------------------ frame path
+    def push(self, frame, timestamp):
+        self.buffer.push(frame, timestamp)
+
+    def request(self, student_id, behavior, timestamp):
+        """
+        Schedule a clip around `timestamp`. Never blocks.
+
+        Returns:
+        --------
+        str or None
+            Path the clip will be written to, or None if it was skipped
+        """
+        stamp = datetime.fromtimestamp(timestamp).strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.directory, f"{stamp}_{student_id}_{behavior}.{self.clip_format}")
+        try:
+            self.queue.put_nowait((path, timestamp))
+        except queue.Full:
+            self.skipped += 1
+            return None
+        return path
+
+    def close(self, timeout=5.0):
+        """Write the pending clips (with the frames available) and stop."""
+        self.stopping.set()
+        try:
+            self.queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self.join(timeout)
+
+    # ------------------------------------------------------------------ encoder thread
+    def run(self):
+        while True:
+            job = self.queue.get()
+            if job is self._STOP:
+                break
+            path, timestamp = job
+            # Wait for the post-event frames (bounded, so a stopped feed cannot stall the queue)
+            deadline = time.monotonic() + self.post_seconds + 2.0
+            while (self.buffer.last_timestamp < timestamp + self.post_seconds
+                   and time.monotonic() < deadline and not self.stopping.is_set()):
+                time.sleep(0.1)
+            frames = self.buffer.snapshot(timestamp - self.pre_seconds, timestamp + self.post_seconds)
+            try:
+                with metrics.timer("clip_encode"):
+                    self._write(path, frames)
+                self.written += 1
+            except (OSError, cv2.error, ValueError) as e:
+                self.failed += 1
+                print(f"Error writing clip {path}: {e}")
+                self._discard(path)
+
+    def _discard(self, path):
+        try:
+            if os.path.exists(path):
+                os.remove(path)  # Partial video
+        except OSError as e:
+            print(f"Cannot remove partial clip {path}: {e}")
+        if self.on_failed is not None:
+            self.on_failed(path)
+
+    def _write(self, path, frames):
+        if not frames:
+            raise ValueError("no frames buffered")
+        if self.clip_format == "jpg":
+            # At most 8 evenly spaced thumbnails side by side
+            step = max(1, len(frames) // 8)
+            strip = np.hstack(frames[::step][:8])
+            if not cv2.imwrite(path, strip):
+                raise OSError("cannot write image")
+            return
+        height, width = frames[0].shape[:2]
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), self.buffer.fps, (width, height))
+        if not writer.isOpened():
+            raise OSError("cannot open video writer")
+        for frame in frames:
+            writer.write(frame)
+        writer.release()
@@ -0,0 +1,125 @@
+'''
+Runtime configuration for the classroom monitor.
+
+Edit the values below to match your machine before running main_UI.py.
+'''
+
+# Classes being monitored (class_id values in the incidents table)
+CLASS_NAMES = ['6a', '6b']
+
+# ======================== DATABASE ========================
+# "mysql" for the school database server, or "sqlite" for a local file (no server needed)
+STORAGE_BACKEND = "mysql"
+
+DB_HOST = "localhost"
+DB_USER = "root"          # Please change it to your user's name
+DB_PASSWORD = "34870901"  # Please change it to your password
+DB_NAME = "classroom_db"
+DB_POOL_SIZE = 5
+
+# Range-partition the incidents table by month (only applies when the table is created)
+DB_PARTITION_BY_MONTH = False
+
+SQLITE_PATH = "classroom.db"
+
+# ======================== MODEL ========================
+# Trained weights from train_model.py (best.pt)
+MODEL_PATH = r"C:\Users\user\Desktop\Machine Learning\INT4097\Project\Code\model.pt"
+
+# Inference backend: "ultralytics" (PyTorch), "onnxruntime" or "openvino"
+# The ONNX model is the one exported by train_model.py next to best.pt.
+# onnxruntime and openvino are optional: pip install onnxruntime openvino
+INFERENCE_BACKEND = "ultralytics"
+ONNX_MODEL_PATH = r"C:\Users\user\Desktop\Machine Learning\INT4097\Project\Code\model.onnx"
+# OpenVINO IR (.xml) or the ONNX file above; OpenVINO can read both
+OPENVINO_MODEL_PATH = ONNX_MODEL_PATH
+
+DEVICE = "cpu"          # or '0' for GPU (ultralytics backend only)
+IMGSZ = 640             # Match input size used for training
+CONF_THRESHOLD = 0.5
+IOU_THRESHOLD = 0.45
+# "botsort.yaml" or "bytetrack.yaml" (ultralytics backend only), or "iou" to run
+# detection only and assign IDs with the built-in IoU tracker (much cheaper).
+# The IoU tracker is also used whenever the backend returns no track IDs.
+TRACKER = "botsort.yaml"
+IOU_TRACKER_THRESHOLD = 0.3      # Minimum overlap to keep a track's ID
+IOU_TRACKER_MAX_DISTANCE = 0.5   # ...or centre distance, in box diagonals
+IOU_TRACKER_MAX_AGE = 1.0        # Seconds a lost track keeps its ID, from the detector run that missed it
+
+# Seat-region / tiled inference for wide shots where the back rows are tiny:
+# None runs the whole frame, "auto" an overlapping grid of TILE_SIZE tiles, or
+# a seat map: list of (x1, y1, x2, y2) regions in pixels or as fractions of the
+# frame, e.g. [(0, 0, 1, 0.4), (0, 0.3, 1, 1)]. All regions share one batched
+# forward pass; CPU cost grows with the number of regions.
+INFERENCE_REGIONS = None
+TILE_SIZE = 640
+TILE_OVERLAP = 0.2
+TILE_INCLUDE_FULL_FRAME = True  # Also run the whole frame, for students near the camera
+
+# Keyframe mode: run the detector every N frames and/or every T seconds and
+# propagate the last boxes in between. 1 and 0 run the detector on every frame.
+DETECTION_INTERVAL_FRAMES = 1
+DETECTION_INTERVAL_SECONDS = 0
+
+# Motion gate: a keyframe whose downscaled grayscale difference from the last
+# inferred frame stays below MOTION_REGION_THRESHOLD (fraction of changed
+# pixels) in every grid region reuses the previous detections instead of
+# running the detector. The detector still runs every MOTION_MAX_SKIP_SECONDS.
+MOTION_GATE_ENABLED = False
+MOTION_GATE_WIDTH = 160
+MOTION_GATE_GRID = (4, 4)  # (rows, cols)
+MOTION_PIXEL_THRESHOLD = 25
+MOTION_REGION_THRESHOLD = 0.02
+MOTION_MAX_SKIP_SECONDS = 2.0
+
+# Hot reload: watch the model file of the selected backend and swap in new
+# weights (validated and warmed up in the background) without a restart.
+# The "Reload Model" button reloads on demand either way.
+MODEL_WATCH = True
+MODEL_WATCH_INTERVAL = 2.0  # Seconds between checks of the file
+
+# ONNX Runtime threading. 0 lets ONNX Runtime use one thread per physical core.
+ORT_INTRA_OP_THREADS = 0
+ORT_INTER_OP_THREADS = 1
+
+# ======================== TRACKING ========================
+# Per-track state (sleep timers, alert cooldowns) is dropped for tracks not
+# seen for this many seconds, and never kept for more than TRACK_STATE_MAX_TRACKS
+TRACK_STATE_TTL_SECONDS = 120
+TRACK_STATE_MAX_TRACKS = 500
+
+# ======================== EPISODES ========================
+# One incident is logged per continuous behavior episode. An episode counts
+# once seen on EPISODE_MIN_FRAMES frames and ends when the behavior has not
+# been seen for EPISODE_END_GAP_SECONDS (short dropouts are tolerated).
+EPISODE_MIN_FRAMES = 2
+EPISODE_END_GAP_SECONDS = 2.0
+
+# ======================== CLIPS ========================
+# Evidence clips: annotated frames around each alert that opens an episode are
+# written to CLIP_DIR and their path stored on the incident (clip_path); the
+# path is cleared again if the clip cannot be written.
+# Memory is bounded by (PRE + POST + 1) * CLIP_FPS frames of CLIP_WIDTH pixels.
+CLIP_ENABLED = False
+CLIP_DIR = "clips"
+CLIP_FORMAT = "mp4"        # "mp4" clip or "jpg" thumbnail strip
+CLIP_PRE_SECONDS = 3.0
+CLIP_POST_SECONDS = 2.0
+CLIP_FPS = 10
+CLIP_WIDTH = 480
+CLIP_MAX_PENDING = 4       # Clips waiting for the encoder; more are skipped
+
+# ======================== USER INTERFACE ========================
+# Alerts kept in the live alert panel (older ones are in Backstage > Recent incidents)
+ALERT_LOG_CAPACITY = 500
+# Alerts for the same student and behavior within one bucket are shown once
+ALERT_DEDUP_BUCKET_SECONDS = 5
+
+# ======================== METRICS ========================
+# Per-stage latency histograms, FPS, queue depths and DB flush times (see
+# metrics.py). Disabled, the instrumentation costs next to nothing.
+METRICS_ENABLED = False
+METRICS_OVERLAY = True            # Show the status line over the video
+METRICS_JSONL_PATH = None         # e.g. "metrics.jsonl" to append a snapshot every interval
+METRICS_JSONL_INTERVAL = 10       # Seconds
+METRICS_PROMETHEUS_PORT = None    # e.g. 9108 to serve http://127.0.0.1:9108/metrics
@@ -3,51 +3,40 @@ Check the instances of different classes if there are imbalance classes
 '''
 
 import os
-from collections import defaultdict
 import pandas as pd
 
+from label_index import build_index
+
 def analyze_yolo_dataset(data_root):
     """
     Analyzes a YOLO dataset with structure:
     data/
       images/
       labels/
+
+    Labels are read through the cached label index (label_index.py), so
+    only files changed since the last run are parsed.
     """
-    # Initialize counters
-    class_instance_counts = defaultdict(int)
-    images_per_class = defaultdict(int)
-    total_images = 0
-
-    # Iterate through all label files
-    labels_dir = os.path.join(data_root, 'labels')
-    for label_file in os.listdir(labels_dir):
-        if label_file.endswith('.txt'):
-            total_images += 1
-            with open(os.path.join(labels_dir, label_file), 'r') as f:
-                classes_in_image = set()
-                for line in f:
-                    class_id = int(line.strip().split()[0])
-                    class_instance_counts[class_id] += 1
-                    classes_in_image.add(class_id)
-                
-                for class_id in classes_in_image:
-                    images_per_class[class_id] += 1
+    index = build_index(os.path.join(data_root, 'labels'))
+    instances = index.instances_per_class()
+    images_per_class = index.files_per_class()
 
     # Convert to pandas DataFrame for nice display
     stats = pd.DataFrame({
-        'Class ID': list(class_instance_counts.keys()),
-        'Total Instances': list(class_instance_counts.values()),
-        'Images Containing Class': [images_per_class[c] for c in class_instance_counts.keys()]
+        'Class ID': list(instances.keys()),
+        'Total Instances': list(instances.values()),
+        'Images Containing Class': [images_per_class[c] for c in instances.keys()]
     }).sort_values('Class ID')
 
     print(f"\nDataset Analysis for: {data_root}")
-    print(f"Total Images: {total_images}")
-    print(f"Classes Found: {len(class_instance_counts)}")
+    print(f"Total Images: {index.num_files}")
+    print(f"Classes Found: {len(instances)}")
     print("\nDetailed Statistics:")
     print(stats.to_string(index=False))
 
     return stats
 
 # Usage
-path = r"C:\Users\user\Desktop\Machine Learning\INT4097\Project\New_img\data"
-dataset_stats = analyze_yolo_dataset(path)  # Path to your data folder
\ No newline at end of file
+if __name__ == "__main__":
+    path = r"C:\Users\user\Desktop\Machine Learning\INT4097\Project\New_img\data"
+    dataset_stats = analyze_yolo_dataset(path)  # Path to your data folder
@@ -0,0 +1,180 @@
+'''
+Display stage for the live video canvas.
+
+CanvasFrameDisplay resizes each annotated frame once with cv2.resize straight
+to the canvas size and keeps a single canvas image item backed by one
+persistent ImageTk.PhotoImage, which is updated in place with paste(). A new
+PhotoImage is only created when the displayed size changes (window resize).
+
+AlertLogView renders an alert_log.AlertLog into a tk.Text, but only the rows
+that fit in the widget: the widget never holds more than one screen of lines,
+however long the session runs.
+'''
+
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+from metrics import metrics
+
+
+class CanvasFrameDisplay:
+    """
+    Shows BGR frames on a tk.Canvas, fitted to the canvas with aspect ratio kept.
+
+    Parameters:
+    -----------
+    canvas : tk.Canvas
+        Target canvas; its current size is read on every frame
+    """
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.photo = None
+        self.image_item = None
+        self.display_size = None
+        self.canvas_size = None
+        self.last_frame_id = None
+        self._rgb = None
+
+    def show(self, frame, frame_id=None):
+        """
+        Display `frame` unless it is the frame already on screen.
+
+        Returns:
+        --------
+        bool
+            True if the canvas was updated
+        """
+        if frame_id is not None and frame_id == self.last_frame_id:
+            return False
+
+        canvas_w, canvas_h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if canvas_w < 2 or canvas_h < 2:
+            # Canvas not laid out yet
+            return False
+
+        with metrics.timer("display"):
+            self._draw(frame, canvas_w, canvas_h)
+
+        self.last_frame_id = frame_id
+        return True
+
+    def _draw(self, frame, canvas_w, canvas_h):
+        """Fit `frame` to the canvas and paste it into the persistent PhotoImage."""
+        h, w = frame.shape[:2]
+        scale = min(canvas_w / w, canvas_h / h)
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        if size != (w, h):
+            # INTER_AREA is the right filter for shrinking, INTER_LINEAR for enlarging
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+            frame = cv2.resize(frame, size, interpolation=interpolation)
+
+        if self._rgb is None or self._rgb.shape != frame.shape:
+            self._rgb = np.empty_like(frame)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        img = Image.fromarray(self._rgb)
+
+        if self.photo is None or size != self.display_size:
+            self.photo = ImageTk.PhotoImage(image=img)
+            self.display_size = size
+            if self.image_item is None:
+                self.image_item = self.canvas.create_image(0, 0, anchor=tk.CENTER, image=self.photo)
+            else:
+                self.canvas.itemconfig(self.image_item, image=self.photo)
+        else:
+            self.photo.paste(img)
+
+        if (canvas_w, canvas_h) != self.canvas_size:
+            self.canvas.coords(self.image_item, canvas_w // 2, canvas_h // 2)
+            self.canvas_size = (canvas_w, canvas_h)
+
+
+class AlertLogView:
+    """
+    Virtualized, scrollable view of an AlertLog.
+
+    The scrollbar is driven by the model's length rather than by the Text
+    contents. While scrolled to the bottom the view follows new alerts;
+    scrolling up pins it to the rows being read.
+
+    Parameters:
+    -----------
+    parent : tk widget
+        Container the scrollbar and text are packed into
+    log : AlertLog
+        Model to render
+    **text_options
+        Passed to tk.Text (colors, font, size)
+    """
+    def __init__(self, parent, log, **text_options):
+        self.log = log
+        self.offset = 0      # Index of the first visible alert
+        self.follow = True   # Keep the newest alerts in view
+        self._shown = None
+        self._tags = set()
+
+        self.scrollbar = ttk.Scrollbar(parent, command=self._on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text = tk.Text(parent, wrap="none", state=tk.DISABLED, **text_options)
+        self.text.pack(fill=tk.BOTH, expand=True)
+        self._line_height = tkfont.Font(font=self.text.cget("font")).metrics("linespace")
+
+        self.text.bind("<MouseWheel>", lambda e: self._scroll_by(-1 if e.delta > 0 else 1))
+        self.text.bind("<Button-4>", lambda e: self._scroll_by(-1))
+        self.text.bind("<Button-5>", lambda e: self._scroll_by(1))
+        self.text.bind("<Configure>", lambda e: self.refresh())
+
+    def visible_rows(self):
+        return max(1, self.text.winfo_height() // max(1, self._line_height))
+
+    def refresh(self):
+        """Redraw the visible rows if the model, position or size changed."""
+        total = len(self.log)
+        rows = self.visible_rows()
+        max_offset = max(0, total - rows)
+        self.offset = max_offset if self.follow else min(self.offset, max_offset)
+
+        key = (self.log.version, self.offset, rows)
+        if key == self._shown:
+            return
+        self._shown = key
+
+        alerts = self.log.window(self.offset, rows)
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        for alert in alerts:
+            tag = "alert" + alert.color.lstrip("#")
+            if tag not in self._tags:
+                self.text.tag_config(tag, foreground=alert.color)
+                self._tags.add(tag)
+            self.text.insert(tk.END, alert.text + "\n", tag)
+        self.text.config(state=tk.DISABLED)
+
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + len(alerts)) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def clear(self):
+        self.log.clear()
+        self.follow = True
+        self.refresh()
+
+    def _scroll_by(self, rows):
+        self.offset = max(0, self.offset + rows)
+        self.follow = self.offset >= len(self.log) - self.visible_rows()
+        self.refresh()
+        return "break"
+
+    def _on_scroll(self, command, value, unit=None):
+        if command == "moveto":
+            self.offset = max(0, int(float(value) * len(self.log)))
+            self.follow = self.offset >= len(self.log) - self.visible_rows()
+            self.refresh()
+        else:
+            rows = int(value) * (self.visible_rows() if unit == "pages" else 1)
+            self._scroll_by(rows)
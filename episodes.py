@@ -0,0 +1,121 @@
+'''
+Behavior episodes: one incident per continuous stretch of a behavior.
+
+The alert rules fire every few seconds for as long as a student keeps showing
+a behavior, so logging every alert turned one 10-minute nap into ~120 rows of
+5 seconds each. EpisodeTracker instead follows each (student, behavior) pair
+through a small state machine with hysteresis:
+
+    observed    -> pending   (first sighting)
+    pending     -> confirmed (seen on `min_frames` frames without a gap)
+    any         -> closed    (not seen for more than `end_gap` seconds)
+
+A few missed or misclassified frames therefore neither end an episode nor
+start a new one. Confirmed episodes are returned once, when they close, with
+their start time, end time and true duration; pending ones that never
+confirm are discarded as noise.
+'''
+
+import threading
+
+
+class Episode:
+    """One continuous occurrence of a behavior for one student."""
+    __slots__ = ("student_id", "behavior", "start", "last_seen", "frames", "clip_path")
+
+    def __init__(self, student_id, behavior, start):
+        self.student_id = student_id
+        self.behavior = behavior
+        self.start = start
+        self.last_seen = start
+        self.frames = 1
+        self.clip_path = None
+
+    @property
+    def duration(self):
+        return self.last_seen - self.start
+
+
+class EpisodeTracker:
+    """
+    Open episodes keyed by (student_id, behavior).
+
+    Parameters:
+    -----------
+    min_frames : int
+        Sightings needed before an episode counts (start hysteresis)
+    end_gap : float
+        Seconds without a sighting after which an episode ends (end hysteresis)
+
+    The inference worker observes and sweeps while the Tk thread may close
+    or clear the tracker (stop / start buttons), so all access is locked.
+    """
+    def __init__(self, min_frames=2, end_gap=2.0):
+        self.min_frames = min_frames
+        self.end_gap = end_gap
+        self._open = {}
+        self._pending_close = []  # Ended episodes replaced by a new one, reported by the next sweep
+        self._lock = threading.Lock()
+
+    def observe(self, student_id, behavior, timestamp):
+        """Record a sighting and return the (possibly new) open episode."""
+        key = (student_id, behavior)
+        with self._lock:
+            episode = self._open.get(key)
+            if episode is None or timestamp - episode.last_seen > self.end_gap:
+                # The previous episode ended before this sighting; start a new one
+                if episode is not None and episode.frames >= self.min_frames:
+                    self._pending_close.append(episode)
+                episode = Episode(student_id, behavior, timestamp)
+                self._open[key] = episode
+            else:
+                episode.last_seen = timestamp
+                episode.frames += 1
+            return episode
+
+    def get(self, student_id, behavior):
+        with self._lock:
+            return self._open.get((student_id, behavior))
+
+    def is_confirmed(self, episode):
+        return episode.frames >= self.min_frames
+
+    def sweep(self, timestamp):
+        """
+        Close the episodes not seen for more than `end_gap` seconds.
+
+        Returns:
+        --------
+        list of Episode
+            Confirmed episodes that ended, oldest first
+        """
+        with self._lock:
+            closed = self._pending_close
+            self._pending_close = []
+            expired = [key for key, episode in self._open.items()
+                       if timestamp - episode.last_seen > self.end_gap]
+            for key in expired:
+                episode = self._open.pop(key)
+                if episode.frames >= self.min_frames:
+                    closed.append(episode)
+        closed.sort(key=lambda episode: episode.start)
+        return closed
+
+    def close_all(self):
+        """End every open episode (detection stopped); returns the confirmed ones."""
+        with self._lock:
+            closed = self._pending_close + [episode for episode in self._open.values()
+                                            if episode.frames >= self.min_frames]
+            self._open = {}
+            self._pending_close = []
+        closed.sort(key=lambda episode: episode.start)
+        return closed
+
+    def clear(self):
+        """Discard open episodes without reporting them."""
+        with self._lock:
+            self._open = {}
+            self._pending_close = []
+
+    def __len__(self):
+        return len(self._open)
@@ -0,0 +1,81 @@
+'''
+Running per-class / per-behavior incident aggregates.
+
+The Statistics and Backstage windows used to run a GROUP BY over the whole
+incidents table every time they were opened or refreshed. IncidentStats keeps
+the same numbers (count and total duration per behavior) in memory: it is
+seeded from the database once at startup and updated by BehaviorMonitor as
+incidents are produced, so the dashboards can read it at any rate.
+'''
+
+import threading
+
+from storage import StorageError
+
+
+class IncidentStats:
+    """
+    Thread-safe counters keyed by (class_name, behavior).
+
+    The inference worker records incidents while the Tk thread reads
+    snapshots, so every access goes through one lock. Each class also has a
+    version number that changes whenever its counters change, letting views
+    skip redraws when nothing happened.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}     # class_name -> {behavior: [count, duration]}
+        self._versions = {}   # class_name -> int
+
+    def seed(self, repository, class_names):
+        """
+        Load the current totals of every class with one grouped query.
+
+        Database errors are reported and leave the counters empty.
+        """
+        try:
+            rows = repository.behavior_totals()
+        except StorageError as e:
+            print(f"Error loading statistics: {e}")
+            return
+        counts = {class_name: {} for class_name in class_names}
+        for class_name, behavior, count, duration in rows:
+            counts.setdefault(class_name, {})[behavior] = [count, duration]
+        with self._lock:
+            for class_name, behaviors in counts.items():
+                self._counts[class_name] = behaviors
+                self._versions[class_name] = self._versions.get(class_name, 0) + 1
+
+    def record(self, class_name, behavior, duration=0):
+        """Add one incident. O(1)."""
+        with self._lock:
+            behaviors = self._counts.setdefault(class_name, {})
+            totals = behaviors.get(behavior)
+            if totals is None:
+                behaviors[behavior] = [1, int(duration)]
+            else:
+                totals[0] += 1
+                totals[1] += int(duration)
+            self._versions[class_name] = self._versions.get(class_name, 0) + 1
+
+    def reset(self, class_name):
+        with self._lock:
+            self._counts[class_name] = {}
+            self._versions[class_name] = self._versions.get(class_name, 0) + 1
+
+    def snapshot(self, class_name):
+        """
+        Current totals for a class, in the same shape as the old GROUP BY query.
+
+        Returns:
+        --------
+        list of tuple
+            (behavior, count, total_duration) sorted by behavior
+        """
+        with self._lock:
+            behaviors = self._counts.get(class_name, {})
+            return [(behavior, count, duration) for behavior, (count, duration) in sorted(behaviors.items())]
+
+    def version(self, class_name):
+        with self._lock:
+            return self._versions.get(class_name, 0)
@@ -0,0 +1,494 @@
+'''
+Unified incidents schema and time-range query layer.
+
+All classes share one `incidents` table with a `class_id` column and two
+composite indexes. Each row is one behavior episode: `timestamp` is when it
+started, `end_time` when it ended and `duration` the seconds in between
+(`end_time` is NULL for rows logged before episodes were introduced).
+`clip_path` points to the evidence clip written by clip_recorder.py, if any.
+
+    idx_class_time           (class_id, timestamp)
+    idx_class_behavior_time  (class_id, behavior, timestamp)
+
+Every query here filters on class_id (and behavior) by equality and on
+timestamp by a half-open range, so it can be answered from those indexes
+instead of a full scan. The table can optionally be RANGE-partitioned by
+month, which lets date filters prune whole partitions.
+
+The same queries are generated for MySQL (the production database) and for
+SQLite (the dependency-free backend in storage.py) via the `dialect` argument.
+
+Usage:
+    python incident_store.py migrate [--drop-old]   # copy incidents_<class> tables into incidents
+    python incident_store.py check-indexes          # EXPLAIN every query and verify index use
+    python incident_store.py check-histograms       # run the histogram query on sample rows (rolled back)
+    python incident_store.py add-partitions         # extend monthly partitions (partitioned tables)
+'''
+
+import argparse
+from datetime import date, datetime, timedelta
+
+INCIDENTS_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS incidents
+    (id BIGINT AUTO_INCREMENT,
+     class_id VARCHAR(10) NOT NULL,
+     student_id VARCHAR(10),
+     behavior VARCHAR(50) NOT NULL,
+     timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+     duration INT DEFAULT 0,
+     end_time DATETIME NULL,
+     clip_path VARCHAR(255) NULL,
+     PRIMARY KEY (id, timestamp),
+     INDEX idx_class_time (class_id, timestamp),
+     INDEX idx_class_behavior_time (class_id, behavior, timestamp))'''
+
+SQLITE_SCHEMA_SQL = [
+    '''CREATE TABLE IF NOT EXISTS incidents
+        (id INTEGER PRIMARY KEY,
+         class_id TEXT NOT NULL,
+         student_id TEXT,
+         behavior TEXT NOT NULL,
+         timestamp TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+         duration INTEGER DEFAULT 0,
+         end_time TEXT,
+         clip_path TEXT)''',
+    "CREATE INDEX IF NOT EXISTS idx_class_time ON incidents (class_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_class_behavior_time ON incidents (class_id, behavior, timestamp)",
+]
+
+# Time bucket expressions for histograms. DATE_FORMAT patterns are bound as
+# the first parameter (BUCKET_FORMATS): written into the SQL, their '%' would
+# have to be escaped, and the driver does not unescape '%%'
+BUCKETS = {
+    'minute': "DATE_FORMAT(timestamp, %s)",
+    'hour': "DATE_FORMAT(timestamp, %s)",
+    'day': "DATE(timestamp)",
+    'week': "DATE_SUB(DATE(timestamp), INTERVAL WEEKDAY(timestamp) DAY)",
+    'month': "DATE_FORMAT(timestamp, %s)",
+}
+BUCKET_FORMATS = {
+    'minute': '%Y-%m-%d %H:%i:00',
+    'hour': '%Y-%m-%d %H:00:00',
+    'month': '%Y-%m-01',
+}
+
+SQLITE_BUCKETS = {
+    'minute': "strftime('%Y-%m-%d %H:%M:00', timestamp)",
+    'hour': "strftime('%Y-%m-%d %H:00:00', timestamp)",
+    'day': "date(timestamp)",
+    'week': "date(timestamp, '-6 days', 'weekday 1')",
+    'month': "strftime('%Y-%m-01', timestamp)",
+}
+
+# SQLite stores timestamps as text in this format so they sort chronologically
+SQLITE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# ======================== SCHEMA ========================
+def _month_start(day, offset=0):
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _partition_clause(first_month, months):
+    """PARTITION BY RANGE clause with one partition per month plus a catch-all."""
+    parts = []
+    for i in range(months):
+        start = _month_start(first_month, i)
+        end = _month_start(first_month, i + 1)
+        parts.append(f"PARTITION p{start:%Y%m} VALUES LESS THAN (TO_DAYS('{end:%Y-%m-%d}'))")
+    parts.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return " PARTITION BY RANGE (TO_DAYS(timestamp)) (" + ", ".join(parts) + ")"
+
+
+def create_schema(cursor, partition_by_month=False, months_ahead=12):
+    """
+    Create the unified incidents table if it does not exist.
+
+    Parameters:
+    -----------
+    cursor : mysql.connector cursor
+    partition_by_month : bool
+        Create one RANGE partition per month, starting this month
+    months_ahead : int
+        Number of monthly partitions to create up front (use
+        add_month_partitions to extend later)
+    """
+    sql = INCIDENTS_TABLE_SQL
+    if partition_by_month:
+        sql += _partition_clause(date.today(), months_ahead)
+    cursor.execute(sql)
+
+
+# Columns added after the first release: name -> (MySQL type, SQLite type)
+ADDED_COLUMNS = {
+    'end_time': ("DATETIME NULL", "TEXT"),
+    'clip_path': ("VARCHAR(255) NULL", "TEXT"),
+}
+
+
+def add_missing_columns(conn, dialect="mysql"):
+    """
+    Add the ADDED_COLUMNS missing from an incidents table created by an older version.
+
+    Returns:
+    --------
+    list of str
+        Names of the columns that were added
+    """
+    cursor = conn.cursor()
+    if dialect == "sqlite":
+        cursor.execute("PRAGMA table_info(incidents)")
+        columns = {row[1] for row in cursor.fetchall()}
+    else:
+        cursor.execute(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'incidents'"
+        )
+        columns = {row[0] for row in cursor.fetchall()}
+    added = [name for name in ADDED_COLUMNS if name not in columns]
+    for name in added:
+        mysql_type, sqlite_type = ADDED_COLUMNS[name]
+        column_type = sqlite_type if dialect == "sqlite" else mysql_type
+        cursor.execute(f"ALTER TABLE incidents ADD COLUMN {name} {column_type}")
+    if added:
+        conn.commit()
+    cursor.close()
+    return added
+
+
+def add_month_partitions(conn, months_ahead=12):
+    """Split the catch-all partition so monthly partitions exist `months_ahead` months from now."""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'incidents' AND PARTITION_NAME IS NOT NULL"
+    )
+    existing = {row[0] for row in cursor.fetchall()}
+    if "pmax" not in existing:
+        cursor.close()
+        return 0
+
+    new_parts = []
+    for i in range(months_ahead + 1):
+        start = _month_start(date.today(), i)
+        name = f"p{start:%Y%m}"
+        if name not in existing:
+            end = _month_start(start, 1)
+            new_parts.append(f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{end:%Y-%m-%d}'))")
+    if new_parts:
+        new_parts.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+        cursor.execute("ALTER TABLE incidents REORGANIZE PARTITION pmax INTO (" + ", ".join(new_parts) + ")")
+        conn.commit()
+    cursor.close()
+    return len(new_parts) - 1 if new_parts else 0
+
+
+def migrate_per_class_tables(conn, class_names, drop_old=False):
+    """
+    Copy rows from the old incidents_<class> tables into `incidents`.
+
+    Each migrated table is renamed to incidents_<class>_migrated (or dropped
+    with `drop_old`), so running the migration again is a no-op.
+
+    Returns:
+    --------
+    dict
+        {class_name: rows_copied}
+    """
+    cursor = conn.cursor()
+    migrated = {}
+    for class_name in class_names:
+        table = f"incidents_{class_name}"
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,)
+        )
+        if cursor.fetchone()[0] == 0:
+            continue
+        cursor.execute(
+            f"INSERT INTO incidents (class_id, student_id, behavior, timestamp, duration) "
+            f"SELECT %s, student_id, behavior, COALESCE(timestamp, NOW()), duration FROM {table}",
+            (class_name,)
+        )
+        migrated[class_name] = cursor.rowcount
+        if drop_old:
+            cursor.execute(f"DROP TABLE {table}")
+        else:
+            cursor.execute(f"RENAME TABLE {table} TO {table}_migrated")
+        conn.commit()
+    cursor.close()
+    return migrated
+
+
+# ======================== QUERIES ========================
+def _time_param(value, dialect):
+    if dialect == "sqlite" and isinstance(value, datetime):
+        return value.strftime(SQLITE_TIME_FORMAT)
+    return value
+
+
+def _where(class_id=None, start=None, end=None, behavior=None, dialect="mysql"):
+    """WHERE clause on the indexed columns: equality on class/behavior, half-open time range."""
+    mark = "?" if dialect == "sqlite" else "%s"
+    clauses, params = [], []
+    if class_id is not None:
+        clauses.append(f"class_id = {mark}")
+        params.append(class_id)
+    if behavior is not None:
+        clauses.append(f"behavior = {mark}")
+        params.append(behavior)
+    if start is not None:
+        clauses.append(f"timestamp >= {mark}")
+        params.append(_time_param(start, dialect))
+    if end is not None:
+        clauses.append(f"timestamp < {mark}")
+        params.append(_time_param(end, dialect))
+    sql = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    return sql, params
+
+
+def behavior_totals_query(class_id=None, start=None, end=None, dialect="mysql"):
+    where, params = _where(class_id, start, end, dialect=dialect)
+    return ("SELECT class_id, behavior, COUNT(*), COALESCE(SUM(duration), 0) FROM incidents"
+            + where + " GROUP BY class_id, behavior"), params
+
+
+def histogram_query(class_id, bucket="hour", start=None, end=None, behavior=None, dialect="mysql"):
+    buckets = SQLITE_BUCKETS if dialect == "sqlite" else BUCKETS
+    if bucket not in buckets:
+        raise ValueError(f"Unknown time bucket: {bucket} (expected one of {', '.join(buckets)})")
+    where, params = _where(class_id, start, end, behavior, dialect)
+    sql = (f"SELECT {buckets[bucket]} AS bucket, behavior, COUNT(*), COALESCE(SUM(duration), 0) FROM incidents"
+           + where + " GROUP BY bucket, behavior ORDER BY bucket")
+    if dialect == "mysql" and bucket in BUCKET_FORMATS:
+        params = [BUCKET_FORMATS[bucket]] + params
+    return sql, params
+
+
+def recent_incidents_query(class_id, before=None, limit=100, dialect="mysql"):
+    mark = "?" if dialect == "sqlite" else "%s"
+    where, params = _where(class_id, end=before, dialect=dialect)
+    return ("SELECT student_id, behavior, timestamp, end_time, duration FROM incidents"
+            + where + f" ORDER BY timestamp DESC LIMIT {mark}"), params + [limit]
+
+
+def _fetch(conn, sql, params):
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def behavior_totals(conn, class_id=None, start=None, end=None, dialect="mysql"):
+    """
+    Incident count and total duration per behavior.
+
+    Parameters:
+    -----------
+    class_id : str, optional
+        Restrict to one class; None returns every class (no UNION needed)
+    start, end : datetime, optional
+        Half-open time range [start, end)
+    dialect : str
+        'mysql' or 'sqlite'
+
+    Returns:
+    --------
+    list of tuple
+        (class_id, behavior, count, total_duration)
+    """
+    rows = _fetch(conn, *behavior_totals_query(class_id, start, end, dialect))
+    return [(c, b, int(n), int(d)) for c, b, n, d in rows]
+
+
+def count_by_behavior(conn, class_id, start=None, end=None, dialect="mysql"):
+    """{behavior: count} for one class in [start, end)."""
+    return {b: n for _, b, n, _ in behavior_totals(conn, class_id, start, end, dialect)}
+
+
+def duration_by_behavior(conn, class_id, start=None, end=None, dialect="mysql"):
+    """{behavior: total duration in seconds} for one class in [start, end)."""
+    return {b: d for _, b, _, d in behavior_totals(conn, class_id, start, end, dialect)}
+
+
+def histogram(conn, class_id, bucket="hour", start=None, end=None, behavior=None, dialect="mysql"):
+    """
+    Incident counts and durations per time bucket.
+
+    Parameters:
+    -----------
+    bucket : str
+        One of 'minute', 'hour', 'day', 'week', 'month'
+    behavior : str, optional
+        Restrict to one behavior (uses idx_class_behavior_time)
+
+    Returns:
+    --------
+    list of tuple
+        (bucket_start, behavior, count, total_duration), ordered by bucket
+    """
+    rows = _fetch(conn, *histogram_query(class_id, bucket, start, end, behavior, dialect))
+    return [(str(k), b, int(n), int(d)) for k, b, n, d in rows]
+
+
+def recent_incidents(conn, class_id, before=None, limit=100, dialect="mysql"):
+    """
+    Newest incidents of one class, read backwards along idx_class_time.
+
+    Parameters:
+    -----------
+    before : datetime, optional
+        Only incidents that started before this time
+    limit : int
+        Maximum number of rows
+
+    Returns:
+    --------
+    list of tuple
+        (student_id, behavior, start, end_time, duration), newest first
+    """
+    rows = _fetch(conn, *recent_incidents_query(class_id, before, limit, dialect))
+    return [(s, b, _as_datetime(t), _as_datetime(e), int(d or 0)) for s, b, t, e, d in rows]
+
+
+def _as_datetime(value):
+    # SQLite returns the stored text; MySQL returns datetime objects
+    if isinstance(value, str):
+        return datetime.strptime(value, SQLITE_TIME_FORMAT)
+    return value
+
+
+# ======================== INDEX CHECKS ========================
+def explain(conn, sql, params=(), dialect="mysql"):
+    """
+    Query plan rows for a query.
+
+    MySQL returns EXPLAIN rows as dictionaries; SQLite returns the
+    EXPLAIN QUERY PLAN detail strings.
+    """
+    if dialect == "sqlite":
+        return [row[-1] for row in _fetch(conn, "EXPLAIN QUERY PLAN " + sql, params)]
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("EXPLAIN " + sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def check_index_usage(conn, class_id="6a", dialect="mysql"):
+    """
+    EXPLAIN each query of this module and verify it uses an incidents index.
+
+    A query passes when `incidents` is read through one of its secondary
+    indexes instead of a full table scan.
+
+    Returns:
+    --------
+    list of tuple
+        (query_name, passed, access_type, key)
+    """
+    end = datetime.now()
+    start = end - timedelta(days=7)
+    checks = {
+        'totals (class)': behavior_totals_query(class_id, dialect=dialect),
+        'totals (class, range)': behavior_totals_query(class_id, start, end, dialect),
+        'histogram (class, range)': histogram_query(class_id, "hour", start, end, dialect=dialect),
+        'histogram (class, behavior, range)': histogram_query(class_id, "day", start, end, "Sleeping", dialect),
+        'recent incidents (class, page)': recent_incidents_query(class_id, end, dialect=dialect),
+    }
+    expected_keys = {"idx_class_time", "idx_class_behavior_time"}
+    results = []
+    for name, (sql, params) in checks.items():
+        if dialect == "sqlite":
+            plan = [d for d in explain(conn, sql, params, dialect) if "incidents" in d]
+            detail = plan[0] if plan else ""
+            key = next((k for k in expected_keys if f"INDEX {k}" in detail), None)
+            access = "SEARCH" if detail.startswith("SEARCH") else "SCAN"
+            results.append((name, key is not None and access == "SEARCH", access, key))
+            continue
+        plan = [row for row in explain(conn, sql, params) if row.get("table") == "incidents"]
+        row = plan[0] if plan else {}
+        key = row.get("key")
+        access = row.get("type")
+        results.append((name, key in expected_keys and access != "ALL", access, key))
+    return results
+
+
+# Sample incidents for check_histogram_buckets: a month, week, day, hour and
+# minute apart, so every bucket size must put them in different buckets
+_CHECK_TIMES = (datetime(2020, 1, 31, 23, 59, 30), datetime(2020, 2, 3, 8, 15, 10))
+_EXPECTED_BUCKETS = {
+    'minute': lambda t: t.strftime('%Y-%m-%d %H:%M:00'),
+    'hour': lambda t: t.strftime('%Y-%m-%d %H:00:00'),
+    'day': lambda t: t.strftime('%Y-%m-%d'),
+    'week': lambda t: (t - timedelta(days=t.weekday())).strftime('%Y-%m-%d'),
+    'month': lambda t: t.strftime('%Y-%m-01'),
+}
+
+
+def check_histogram_buckets(conn, class_id="_check", dialect="mysql"):
+    """
+    Run the histogram query for every bucket size and verify the bucket values.
+
+    Two sample incidents are inserted for `class_id` and rolled back
+    afterwards, so the table is left unchanged.
+
+    Returns:
+    --------
+    list of tuple
+        (bucket, passed, buckets returned)
+    """
+    mark = "?" if dialect == "sqlite" else "%s"
+    results = []
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(f"INSERT INTO incidents (class_id, student_id, behavior, timestamp, duration) "
+                           f"VALUES ({mark}, {mark}, {mark}, {mark}, {mark})",
+                           [(class_id, "1", "Sleeping", _time_param(t, dialect), 5) for t in _CHECK_TIMES])
+        for bucket, expected in _EXPECTED_BUCKETS.items():
+            sql, params = histogram_query(class_id, bucket, dialect=dialect)
+            got = [str(row[0]) for row in _fetch(conn, sql, params)]
+            results.append((bucket, got == [expected(t) for t in _CHECK_TIMES], got))
+    finally:
+        cursor.close()
+        conn.rollback()
+    return results
+
+
+if __name__ == "__main__":
+    from storage import create_repository
+    import config
+
+    parser = argparse.ArgumentParser(description="Incidents schema maintenance")
+    parser.add_argument("--backend", default=None, help="Storage backend (default: config.STORAGE_BACKEND)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="Copy incidents_<class> tables into the unified table (MySQL)")
+    migrate.add_argument("--drop-old", action="store_true", help="Drop the old tables instead of renaming them")
+    sub.add_parser("check-indexes", help="EXPLAIN the query layer and verify index use")
+    sub.add_parser("check-histograms", help="Verify the histogram bucket values on sample rows (rolled back)")
+    partitions = sub.add_parser("add-partitions", help="Create monthly partitions ahead of time (MySQL)")
+    partitions.add_argument("--months", type=int, default=12)
+    args = parser.parse_args()
+
+    repository = create_repository(args.backend)
+    if repository is None:
+        raise SystemExit("Failed to connect to database")
+
+    failed = 0
+    with repository.connection() as conn:
+        if args.command == "migrate":
+            for class_name, rows in migrate_per_class_tables(conn, config.CLASS_NAMES, args.drop_old).items():
+                print(f"Migrated {rows} rows from incidents_{class_name}")
+        elif args.command == "check-indexes":
+            for name, passed, access, key in check_index_usage(conn, dialect=repository.dialect):
+                print(f"{'PASS' if passed else 'FAIL'}  {name.ljust(36)} type={access} key={key}")
+                failed += not passed
+        elif args.command == "check-histograms":
+            for bucket, passed, got in check_histogram_buckets(conn, dialect=repository.dialect):
+                print(f"{'PASS' if passed else 'FAIL'}  {bucket.ljust(8)} {got}")
+                failed += not passed
+        elif args.command == "add-partitions":
+            print(f"Added {add_month_partitions(conn, args.months)} monthly partitions")
+    repository.close()
+    raise SystemExit(1 if failed else 0)
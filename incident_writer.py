@@ -0,0 +1,213 @@
+'''
+Background incident writer.
+
+BehaviorMonitor._trigger_alert used to run one INSERT and one COMMIT per alert
+on the frame path. IncidentWriter takes the rows off the frame path: alerts are
+put on a bounded queue and a single thread writes them with executemany in one
+transaction, either when `batch_size` rows are waiting or every
+`flush_interval_ms` milliseconds, whichever comes first.
+
+Rows are written through an IncidentRepository (see storage.py), which hands
+the writer thread its own pooled connection.
+'''
+
+import queue
+import threading
+import time
+
+from metrics import metrics
+from storage import StorageError
+
+
+class IncidentWriter(threading.Thread):
+    """
+    Queue-backed, batching writer for the incidents table.
+
+    Parameters:
+    -----------
+    repository : IncidentRepository
+        Storage the incidents are written to
+    batch_size : int
+        Flush as soon as this many rows are pending
+    flush_interval_ms : int
+        Maximum time a row waits before it is flushed
+    max_queue_size : int
+        Queue bound; when full, enqueue() waits up to `put_timeout` seconds
+        and then drops the row (counted in `dropped`)
+    put_timeout : float or None
+        How long the caller may be blocked by backpressure (None waits for
+        space and never drops, for offline processing)
+    """
+    _FLUSH = object()
+    _DISCARD = object()
+    _DROP_CLIP = object()
+    # Failed clip paths remembered for rows of episodes that are still open.
+    # Only the newest are kept: open episodes are bounded by students x behaviors
+    MAX_FAILED_CLIPS = 1024
+    _STOP = object()
+
+    def __init__(self, repository, batch_size=200, flush_interval_ms=500,
+                 max_queue_size=10000, put_timeout=0.05):
+        super().__init__(name="IncidentWriter", daemon=True)
+        self.repository = repository
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.put_timeout = put_timeout
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.discarded = 0
+        self._failed_clips = {}  # Path -> None, oldest first; writer thread only
+        metrics.gauge("writer_queue_depth", self.queue.qsize)
+        metrics.gauge("incidents_written", lambda: self.written)
+        metrics.gauge("incidents_dropped", lambda: self.dropped)
+
+    # ------------------------------------------------------------------ producer side
+    def enqueue(self, class_name, student_id, behavior, timestamp, duration=0, end_time=None, clip_path=None):
+        """
+        Queue one incident row. Never touches the database.
+
+        `timestamp` is the start of the episode and `end_time` its end;
+        `clip_path` is its evidence clip, if one was recorded.
+
+        Returns:
+        --------
+        bool
+            False if the row was dropped because the queue stayed full
+        """
+        try:
+            self.queue.put((class_name, student_id, behavior, timestamp, duration, end_time, clip_path),
+                           timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout=5.0):
+        """
+        Block until every row queued before this call has been written.
+
+        Returns:
+        --------
+        bool
+            True only if all those rows are in the database; False on timeout
+            or if the write failed and rows are still waiting for a retry
+        """
+        if not self.is_alive():
+            return False
+        done = threading.Event()
+        result = []
+        self.queue.put((self._FLUSH, done, result))
+        return done.wait(timeout) and result[0]
+
+    def discard(self, class_name, timeout=5.0):
+        """
+        Drop the rows of one class that are queued or waiting for a retry.
+
+        Used when the class is reset, so rows produced before the reset are
+        not inserted after its incidents were deleted.
+        """
+        if not self.is_alive():
+            return False
+        done = threading.Event()
+        self.queue.put((self._DISCARD, done, class_name))
+        return done.wait(timeout)
+
+    def drop_clip(self, clip_path):
+        """
+        Forget an evidence clip that could not be written (ClipRecorder's
+        on_failed callback).
+
+        The path is removed from the rows already in the database, from the
+        rows still queued, and from rows of its episode queued later on (the
+        newest MAX_FAILED_CLIPS failed paths are remembered for that).
+        """
+        if self.is_alive():
+            self.queue.put((self._DROP_CLIP, clip_path))
+
+    def close(self, timeout=5.0):
+        """Write all pending rows and stop the thread."""
+        if self.is_alive():
+            self.queue.put((self._STOP, None))
+            self.join(timeout)
+
+    # ------------------------------------------------------------------ writer thread
+    def run(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is not None and item[0] is self._STOP:
+                self._write(pending)
+                break
+
+            if item is not None and item[0] is self._DISCARD:
+                _, done, class_name = item
+                kept = [row for row in pending if row[0] != class_name]
+                self.discarded += len(pending) - len(kept)
+                pending = kept
+                if not pending:
+                    deadline = None
+                done.set()
+                continue
+
+            if item is not None and item[0] is self._DROP_CLIP:
+                self._failed_clips[item[1]] = None
+                if len(self._failed_clips) > self.MAX_FAILED_CLIPS:
+                    del self._failed_clips[next(iter(self._failed_clips))]
+                pending = [self._without_failed_clip(row) for row in pending]
+                try:
+                    self.repository.clear_clip_path(item[1])
+                except StorageError as e:
+                    print(f"Error clearing clip path {item[1]}: {e}")
+                continue
+
+            if item is not None and item[0] is not self._FLUSH:
+                pending.append(self._without_failed_clip(item))
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(pending) < self.batch_size:
+                    continue
+
+            # Batch full, flush interval elapsed, or explicit flush requested
+            pending = self._write(pending)
+            deadline = time.monotonic() + self.flush_interval if pending else None
+            if item is not None and item[0] is self._FLUSH:
+                item[2].append(not pending)  # Failed rows are kept for retry: not flushed
+                item[1].set()
+
+    def _without_failed_clip(self, row):
+        if row[6] is not None and row[6] in self._failed_clips:
+            return row[:6] + (None,)
+        return row
+
+    def _write(self, rows):
+        """
+        Insert `rows` in a single transaction.
+
+        Returns the rows that still need writing: an empty list on success, or
+        the same rows on failure so they are retried on the next flush (up to
+        the queue bound, beyond which the oldest are dropped).
+        """
+        if not rows:
+            return rows
+
+        try:
+            with metrics.timer("db_flush"):
+                self.repository.insert_incidents(rows)
+            self.written += len(rows)
+            return []
+        except StorageError as e:
+            print(f"Error saving incidents to database: {e}")
+            self.failed_flushes += 1
+            limit = self.queue.maxsize
+            if len(rows) > limit:
+                self.dropped += len(rows) - limit
+                rows = rows[-limit:]
+            return rows
@@ -0,0 +1,325 @@
+'''
+Interchangeable inference backends for BehaviorMonitor.
+
+Every engine takes a BGR frame and returns the same Detections arrays:
+
+    boxes     : float32 (N, 4) xyxy in frame pixels
+    confs     : float32 (N,)
+    class_ids : int     (N,)
+    track_ids : int     (N,) or None when the backend does not track
+
+Backends:
+- UltralyticsEngine  : the PyTorch model through YOLO(...).track / predict
+- OnnxRuntimeEngine  : the ONNX export from train_model.py on CPU, with tuned threads
+- OpenVinoEngine     : the same ONNX / IR model through OpenVINO, if installed
+
+Use create_engine() to build the backend named in config.py.
+'''
+
+import ast
+import os
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+import config
+
+Detections = namedtuple("Detections", ["boxes", "confs", "class_ids", "track_ids"])
+
+
+def empty_detections():
+    return Detections(
+        np.zeros((0, 4), dtype=np.float32),
+        np.zeros(0, dtype=np.float32),
+        np.zeros(0, dtype=int),
+        None
+    )
+
+
+class InferenceEngine:
+    """
+    Base class for inference backends.
+
+    Subclasses set `self.names` ({class_id: name}) and implement infer().
+    """
+    names = {}
+    provides_track_ids = False
+
+    def infer(self, frame):
+        raise NotImplementedError
+
+    def infer_batch(self, frames):
+        """Run several frames; backends that support it override this with one forward pass."""
+        return [self.infer(frame) for frame in frames]
+
+
+# ======================== ULTRALYTICS (PyTorch) ========================
+class UltralyticsEngine(InferenceEngine):
+    """
+    PyTorch model through the Ultralytics API.
+
+    With a `tracker` configured, infer() calls model.track(persist=True) and
+    returns track IDs; infer_batch() always runs plain detection.
+    """
+    def __init__(self, model_path, device="cpu", imgsz=640, conf=0.5, iou=0.45, tracker="botsort.yaml"):
+        from ultralytics import YOLO
+
+        self.model = YOLO(model_path)
+        self.names = dict(self.model.names)
+        self.device = device
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.tracker = tracker
+        self.provides_track_ids = bool(tracker)
+
+    @staticmethod
+    def _to_detections(result):
+        boxes = result.boxes
+        return Detections(
+            boxes.xyxy.cpu().numpy().astype(np.float32),
+            boxes.conf.cpu().numpy().astype(np.float32),
+            boxes.cls.cpu().numpy().astype(int),
+            boxes.id.int().cpu().numpy() if boxes.id is not None else None
+        )
+
+    def infer(self, frame):
+        kwargs = dict(conf=self.conf, iou=self.iou, imgsz=self.imgsz, device=self.device, verbose=False)
+        if self.tracker:
+            results = self.model.track(frame, persist=True, tracker=self.tracker, **kwargs)
+        else:
+            results = self.model.predict(frame, **kwargs)
+        return self._to_detections(results[0])
+
+    def infer_batch(self, frames):
+        if not frames:
+            return []
+        results = self.model.predict(list(frames), conf=self.conf, iou=self.iou, imgsz=self.imgsz,
+                                     device=self.device, verbose=False)
+        return [self._to_detections(r) for r in results]
+
+
+# ======================== EXPORTED MODELS (ONNX / OpenVINO) ========================
+def letterbox(frame, imgsz, stride=32, pad_value=114, square=False):
+    """
+    Resize keeping aspect ratio and pad to a multiple of `stride`, like Ultralytics.
+
+    With `square`, pad to imgsz x imgsz instead, so frames of any shape can
+    share one batch.
+
+    Returns:
+    --------
+    tuple
+        (padded_image, gain, (pad_x, pad_y))
+    """
+    h, w = frame.shape[:2]
+    gain = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * gain)), int(round(h * gain))
+    if square:
+        out_w = out_h = int(np.ceil(imgsz / stride) * stride)
+    else:
+        out_w = int(np.ceil(new_w / stride) * stride)
+        out_h = int(np.ceil(new_h / stride) * stride)
+    pad_x, pad_y = (out_w - new_w) / 2, (out_h - new_h) / 2
+
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                               value=(pad_value, pad_value, pad_value))
+    return frame, gain, (left, top)
+
+
+class ExportedYoloEngine(InferenceEngine):
+    """
+    Shared pre/post-processing for YOLO models exported by Ultralytics.
+
+    The raw output has shape (batch, 4 + num_classes, num_anchors) with
+    cx, cy, w, h followed by per-class scores; NMS is applied per class.
+    """
+    def __init__(self, imgsz=640, conf=0.5, iou=0.45, max_det=300):
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+
+    def _run(self, blob):
+        """Forward pass on a (B, 3, H, W) float32 blob; returns the raw output array."""
+        raise NotImplementedError
+
+    def _preprocess(self, frames, square=False):
+        images, meta = [], []
+        for frame in frames:
+            image, gain, pad = letterbox(frame, self.imgsz, square=square)
+            images.append(image)
+            meta.append((gain, pad, frame.shape[:2]))
+        # BGR HWC uint8 -> RGB CHW float32 in [0, 1]
+        blob = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+        blob = np.ascontiguousarray(blob, dtype=np.float32) / 255.0
+        return blob, meta
+
+    def _postprocess(self, pred, gain, pad, shape):
+        pred = pred.T  # (num_anchors, 4 + num_classes)
+        scores = pred[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confs = scores[np.arange(len(scores)), class_ids]
+        keep = confs >= self.conf
+        if not keep.any():
+            return empty_detections()
+
+        xywh = pred[keep, :4].copy()
+        confs, class_ids = confs[keep], class_ids[keep]
+        xywh[:, 0] -= xywh[:, 2] / 2  # cx, cy -> top-left x, y
+        xywh[:, 1] -= xywh[:, 3] / 2
+
+        idx = cv2.dnn.NMSBoxesBatched(xywh.tolist(), confs.tolist(), class_ids.tolist(),
+                                      self.conf, self.iou)
+        idx = np.asarray(idx, dtype=int).reshape(-1)[:self.max_det]
+
+        boxes = xywh[idx]
+        boxes[:, 2] += boxes[:, 0]
+        boxes[:, 3] += boxes[:, 1]
+        boxes[:, [0, 2]] -= pad[0]
+        boxes[:, [1, 3]] -= pad[1]
+        boxes /= gain
+        h, w = shape
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+        return Detections(boxes.astype(np.float32), confs[idx].astype(np.float32),
+                          class_ids[idx].astype(int), None)
+
+    def infer(self, frame):
+        return self.infer_batch([frame])[0]
+
+    def infer_batch(self, frames):
+        if not frames:
+            return []
+        # Mixed frame sizes (e.g. seat-region crops) are padded to a common
+        # square input so they still go through one forward pass
+        square = len({frame.shape for frame in frames}) > 1
+        blob, meta = self._preprocess(frames, square)
+        output = self._run(blob)
+        return [self._postprocess(output[i], *meta[i]) for i in range(len(frames))]
+
+
+def _parse_names(names):
+    """Ultralytics stores class names in export metadata as a dict literal string."""
+    if isinstance(names, str):
+        names = ast.literal_eval(names)
+    return {int(k): v for k, v in names.items()}
+
+
+class OnnxRuntimeEngine(ExportedYoloEngine):
+    """
+    ONNX Runtime on CPU with explicit intra/inter-op thread counts.
+
+    Parameters:
+    -----------
+    onnx_path : str
+        Model exported with best_model.export(format="onnx", dynamic=True)
+    intra_op_threads : int
+        Threads used inside an operator (0 = ONNX Runtime default, one per physical core)
+    inter_op_threads : int
+        Threads used to run independent operators in parallel
+    """
+    def __init__(self, onnx_path, imgsz=640, conf=0.5, iou=0.45,
+                 intra_op_threads=0, inter_op_threads=1, names=None):
+        super().__init__(imgsz, conf, iou)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        self.session = ort.InferenceSession(onnx_path, sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if names is None and "names" in metadata:
+            names = metadata["names"]
+        self.names = _parse_names(names or {})
+
+    def _run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoEngine(ExportedYoloEngine):
+    """
+    OpenVINO runtime on CPU, compiled with the latency performance hint.
+
+    Reads either an OpenVINO IR (.xml) or the ONNX export directly.
+    """
+    def __init__(self, model_path, imgsz=640, conf=0.5, iou=0.45, names=None):
+        super().__init__(imgsz, conf, iou)
+        import openvino as ov
+
+        core = ov.Core()
+        model = core.read_model(model_path)
+        self.compiled = core.compile_model(model, "CPU", {"PERFORMANCE_HINT": "LATENCY"})
+        self.output = self.compiled.output(0)
+
+        if names is None:
+            names = self._read_names(model, model_path)
+        self.names = _parse_names(names or {})
+
+    @staticmethod
+    def _read_names(model, model_path):
+        # Ultralytics IR exports carry names in rt_info and in metadata.yaml next to the .xml
+        try:
+            return model.get_rt_info(["model_info", "names"]).astype(str)
+        except Exception:
+            pass
+        metadata_path = os.path.join(os.path.dirname(model_path), "metadata.yaml")
+        if os.path.exists(metadata_path):
+            import yaml
+            with open(metadata_path, 'r') as f:
+                return yaml.safe_load(f).get("names")
+        return None
+
+    def _run(self, blob):
+        return self.compiled([blob])[self.output]
+
+
+# ======================== FACTORY ========================
+def create_engine(backend=None):
+    """
+    Build the inference backend selected in config.py (or by `backend`).
+
+    OpenVINO is optional: if it is not installed the ONNX Runtime backend is
+    used instead. With INFERENCE_REGIONS set, the backend is wrapped in a
+    tiling.TiledEngine.
+    """
+    engine = _create_backend((backend or config.INFERENCE_BACKEND).lower())
+    if config.INFERENCE_REGIONS:
+        from tiling import TiledEngine
+        engine = TiledEngine(engine, config.INFERENCE_REGIONS, config.TILE_SIZE, config.TILE_OVERLAP,
+                             config.TILE_INCLUDE_FULL_FRAME, config.IOU_THRESHOLD)
+    return engine
+
+
+def _create_backend(backend):
+
+    if backend == "openvino":
+        try:
+            return OpenVinoEngine(config.OPENVINO_MODEL_PATH, config.IMGSZ,
+                                  config.CONF_THRESHOLD, config.IOU_THRESHOLD)
+        except ImportError:
+            print("OpenVINO is not installed, falling back to ONNX Runtime")
+            backend = "onnxruntime"
+
+    if backend == "onnxruntime":
+        return OnnxRuntimeEngine(config.ONNX_MODEL_PATH, config.IMGSZ,
+                                 config.CONF_THRESHOLD, config.IOU_THRESHOLD,
+                                 config.ORT_INTRA_OP_THREADS, config.ORT_INTER_OP_THREADS)
+
+    if backend == "ultralytics":
+        # "iou" runs plain detection; BehaviorMonitor's IoU tracker assigns the IDs
+        tracker = None if config.TRACKER == "iou" else config.TRACKER
+        return UltralyticsEngine(config.MODEL_PATH, config.DEVICE, config.IMGSZ,
+                                 config.CONF_THRESHOLD, config.IOU_THRESHOLD, tracker)
+
+    raise ValueError(f"Unknown inference backend: {backend}")
@@ -0,0 +1,262 @@
+'''
+Cached, parallel index of YOLO label files.
+
+The dataset scripts (count_classes.py, check_box_height.py) used to walk a
+labels/ directory and parse every .txt line by line on each run. LabelIndex
+parses the files once, in parallel worker processes, into a columnar table
+
+    file_ids, class_ids, xc, yc, w, h      (one row per box)
+    files, mtimes, sizes                   (one row per label file)
+
+and caches it next to the directory (train/labels -> train/labels.index.npz,
+like Ultralytics' labels.cache). Later runs stat the directory and reparse
+only the files whose modification time or size changed; new files are
+added and deleted ones dropped. Queries are then NumPy operations over the
+columns.
+
+Lines that do not have exactly 5 values are skipped. Files without boxes
+(background images) are still listed, so they count as images.
+
+Usage:
+    python label_index.py path/to/train/labels [--rebuild] [--parquet boxes.parquet]
+'''
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CACHE_VERSION = 1
+# Below this many files to parse, process start-up costs more than it saves
+PARALLEL_MIN_FILES = 256
+BOX_COLUMNS = ("xc", "yc", "w", "h")
+
+
+# ======================== PARSING ========================
+def parse_label_file(path):
+    """
+    Boxes of one YOLO label file.
+
+    Returns:
+    --------
+    numpy.ndarray
+        (n, 5) float32 rows of class, xc, yc, w, h
+    """
+    with open(path, 'r') as f:
+        rows = [parts for parts in (line.split() for line in f) if len(parts) == 5]
+    if not rows:
+        return np.zeros((0, 5), dtype=np.float32)
+    return np.array(rows, dtype=np.float32)
+
+
+def _parse_chunk(paths):
+    """Parse several files in one worker call; returns (rows, boxes per file)."""
+    parsed = [parse_label_file(path) for path in paths]
+    counts = np.array([len(rows) for rows in parsed], dtype=np.int64)
+    rows = np.concatenate(parsed) if parsed else np.zeros((0, 5), dtype=np.float32)
+    return rows, counts
+
+
+def parse_files(paths, workers=None, chunk_size=256):
+    """
+    Parse label files, in a process pool when there are many.
+
+    Returns:
+    --------
+    tuple
+        (rows, counts): (n, 5) float32 boxes of all files in order, and the
+        number of boxes of each file
+    """
+    if not paths:
+        return np.zeros((0, 5), dtype=np.float32), np.zeros(0, dtype=np.int64)
+    if workers == 1 or len(paths) < PARALLEL_MIN_FILES:
+        return _parse_chunk(paths)
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_parse_chunk, chunks))
+    return np.concatenate([r for r, _ in results]), np.concatenate([c for _, c in results])
+
+
+def scan_directory(labels_dir):
+    """(names, mtimes_ns, sizes) of the .txt files in a directory, sorted by name."""
+    entries = sorted((entry.name, entry.stat()) for entry in os.scandir(labels_dir)
+                     if entry.name.endswith('.txt') and entry.is_file())
+    names = np.array([name for name, _ in entries], dtype=str)
+    mtimes = np.array([stat.st_mtime_ns for _, stat in entries], dtype=np.int64)
+    sizes = np.array([stat.st_size for _, stat in entries], dtype=np.int64)
+    return names, mtimes, sizes
+
+
+# ======================== INDEX ========================
+class LabelIndex:
+    """
+    Columnar table of the boxes in a labels directory.
+
+    Attributes:
+    -----------
+    files : numpy.ndarray of str
+        Label file names (sorted)
+    mtimes, sizes : numpy.ndarray of int64
+        Stat values the files were parsed with
+    file_ids : numpy.ndarray of int32
+        Index into `files` for each box
+    class_ids : numpy.ndarray of int32
+    xc, yc, w, h : numpy.ndarray of float32
+        Normalized box centre and size
+    """
+    def __init__(self, files, mtimes, sizes, file_ids, class_ids, boxes):
+        self.files = files
+        self.mtimes = mtimes
+        self.sizes = sizes
+        self.file_ids = file_ids.astype(np.int32)
+        self.class_ids = class_ids.astype(np.int32)
+        boxes = boxes.astype(np.float32).reshape(-1, 4)
+        self.xc, self.yc, self.w, self.h = (np.ascontiguousarray(boxes[:, i]) for i in range(4))
+        self.reparsed = 0  # Files parsed when this index was built (the rest came from the cache)
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    @property
+    def num_files(self):
+        return len(self.files)
+
+    @property
+    def boxes(self):
+        """(n, 4) xc, yc, w, h."""
+        return np.stack([self.xc, self.yc, self.w, self.h], axis=1)
+
+    def class_mask(self, class_id):
+        return self.class_ids == class_id
+
+    def boxes_per_file(self):
+        """Number of boxes in each file (0 for background images)."""
+        return np.bincount(self.file_ids, minlength=self.num_files)
+
+    def instances_per_class(self):
+        """{class_id: number of boxes}."""
+        counts = np.bincount(self.class_ids)
+        return {int(c): int(counts[c]) for c in np.flatnonzero(counts)}
+
+    def files_per_class(self):
+        """{class_id: number of files with at least one box of that class}."""
+        if not len(self):
+            return {}
+        num_classes = int(self.class_ids.max()) + 1
+        pairs = np.unique(self.file_ids.astype(np.int64) * num_classes + self.class_ids)
+        counts = np.bincount(pairs % num_classes, minlength=num_classes)
+        return {int(c): int(counts[c]) for c in np.flatnonzero(counts)}
+
+    # ------------------------------------------------------------------ persistence
+    def save(self, path):
+        # Write then rename, so an interrupted run never leaves a broken cache
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, version=CACHE_VERSION, files=self.files, mtimes=self.mtimes, sizes=self.sizes,
+                 file_ids=self.file_ids, class_ids=self.class_ids, boxes=self.boxes)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Cached index, or None if missing, unreadable or from another version."""
+        try:
+            with np.load(path) as data:
+                if int(data['version']) != CACHE_VERSION:
+                    return None
+                return cls(data['files'], data['mtimes'], data['sizes'],
+                           data['file_ids'], data['class_ids'], data['boxes'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def to_dataframe(self):
+        """pandas DataFrame with columns file, class, xc, yc, w, h."""
+        import pandas as pd
+        return pd.DataFrame({'file': self.files[self.file_ids], 'class': self.class_ids,
+                             'xc': self.xc, 'yc': self.yc, 'w': self.w, 'h': self.h})
+
+    def to_parquet(self, path):
+        """Export the box table as Parquet (requires pyarrow or fastparquet)."""
+        self.to_dataframe().to_parquet(path, index=False)
+
+
+def default_cache_path(labels_dir):
+    return os.path.normpath(labels_dir) + ".index.npz"
+
+
+def build_index(labels_dir, cache_path=None, use_cache=True, workers=None):
+    """
+    Index a labels directory, reusing the on-disk cache where possible.
+
+    Parameters:
+    -----------
+    labels_dir : str
+        Directory of YOLO .txt label files
+    cache_path : str, optional
+        Cache file (default: <labels_dir>.index.npz)
+    use_cache : bool
+        False reparses every file (the cache is still rewritten)
+    workers : int, optional
+        Worker processes (default: one per CPU; 1 parses in this process)
+
+    Returns:
+    --------
+    LabelIndex
+    """
+    cache_path = cache_path or default_cache_path(labels_dir)
+    names, mtimes, sizes = scan_directory(labels_dir)
+    cached = LabelIndex.load(cache_path) if use_cache else None
+
+    # Files whose name, mtime and size all match the cache keep their rows
+    reuse = np.zeros(len(names), dtype=bool)
+    cached_pos = np.zeros(len(names), dtype=np.int64)
+    if cached is not None and cached.num_files:
+        pos = np.searchsorted(cached.files, names).clip(0, cached.num_files - 1)
+        reuse = ((cached.files[pos] == names) & (cached.mtimes[pos] == mtimes)
+                 & (cached.sizes[pos] == sizes))
+        cached_pos = pos
+
+    if cached is not None and reuse.all() and len(names) == cached.num_files:
+        return cached
+
+    changed = np.flatnonzero(~reuse)
+    rows, counts = parse_files([os.path.join(labels_dir, names[i]) for i in changed], workers)
+
+    file_ids = [np.repeat(changed, counts)]
+    parts = [rows]
+    if cached is not None and reuse.any():
+        # Map cached file ids to their new position and keep the reused files' rows
+        new_id = np.full(cached.num_files, -1, dtype=np.int64)
+        new_id[cached_pos[reuse]] = np.flatnonzero(reuse)
+        remapped = new_id[cached.file_ids]
+        keep = remapped >= 0
+        file_ids.append(remapped[keep])
+        parts.append(np.column_stack([cached.class_ids[keep], cached.boxes[keep]]))
+
+    file_ids = np.concatenate(file_ids)
+    rows = np.concatenate(parts)
+    order = np.argsort(file_ids, kind="stable")  # Keep rows grouped in file order
+    index = LabelIndex(names, mtimes, sizes, file_ids[order], rows[order, 0], rows[order, 1:])
+    index.reparsed = len(changed)
+    try:
+        index.save(cache_path)
+    except OSError as e:
+        print(f"Cannot write label index cache {cache_path}: {e}")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or update the label index of a YOLO labels directory")
+    parser.add_argument("labels_dir")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the cache and reparse every file")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--parquet", default=None, help="Also export the box table to this Parquet file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_index(args.labels_dir, use_cache=not args.rebuild, workers=args.workers)
+    print(f"{index.num_files} files, {len(index)} boxes ({index.reparsed} files parsed) "
+          f"in {time.perf_counter() - start:.2f}s")
+    if args.parquet:
+        index.to_parquet(args.parquet)
+        print(f"Box table saved to {args.parquet}")
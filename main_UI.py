@@ -4,10 +4,10 @@ This is the main file of our application.
 To run this application, please follow these steps:
 
 1. Python Version: 3.11.5
-2. Install MySQL: Download MySQL
-3. Register SQL account locally # For line 41 and 42
+2. Install MySQL: Download MySQL (or set STORAGE_BACKEND = "sqlite" in config.py)
+3. Register SQL account locally # DB_USER and DB_PASSWORD in config.py
 4. Install Dependencies: pip install -r requirements.txt
-5. Modify the model.pt path in line 112
+5. Modify the model.pt path (and inference backend) in config.py
 6. Run the Program
 
 7. If the program doesn't create database automatically, 
@@ -20,362 +20,45 @@ Video 2: https://www.youtube.com/watch?v=ILIo-1Fy1-Y
 '''
 
 
-from ultralytics import YOLO
+import time
+STARTUP_T0 = time.perf_counter()  # Taken before the imports below, for the startup measurement
+
 import cv2
 import tkinter as tk
 from tkinter import ttk, messagebox
 import numpy as np
-import time
-import mysql.connector
-from PIL import Image, ImageTk
-from datetime import datetime
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-
-# ======================== DATABASE SETUP ========================
-def setup_database():
-    try:
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",   # Please change it to your user's name
-            password="34870901", # # Please change it to your password
-            database="classroom_db"
-        )
-        
-        cursor = conn.cursor()
-        cursor.execute("CREATE DATABASE IF NOT EXISTS classroom_db")
-        cursor.execute("USE classroom_db")
-        
-        # Create separate tables for each class
-        for class_name in ['6a', '6b']:
-            cursor.execute(f'''CREATE TABLE IF NOT EXISTS incidents_{class_name}
-                            (id INT AUTO_INCREMENT PRIMARY KEY,
-                             student_id VARCHAR(10),
-                             behavior VARCHAR(50),
-                             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                             duration INT DEFAULT 0)''')
-        
-        conn.commit()
-        return conn
-    except mysql.connector.Error as e:
-        print(f"Database error: {e}")
-        return None
-
-# Mock student IDs
-STUDENT_IDS = [f"STU-{i:03d}" for i in range(1, 31)]
-
-# ======================== CORE LOGIC ========================
-class BehaviorMonitor:
-    """
-    A real-time behavior monitoring system using YOLO object detection.
-    
-    Primary Objectives:
-    1. Detect and track student behaviors (eating, sleeping, phone use, etc.)
-    2. Generate alerts for specific behaviors with configurable thresholds
-    3. Maintain persistent tracking of students across video frames
-    4. Log incidents to a database for analysis
-    
-    Key Features:
-    - Behavior detection using YOLO model
-    - Persistent ID tracking across frames
-    - Configurable alert thresholds
-    - Visual annotation of detected behaviors
-    - Database logging of incidents
-    """
-    def __init__(self, class_name):
-        """
-        Initialize the behavior monitoring system.
-        
-        Parameters:
-        -----------
-        class_name : str
-            Identifier for the class/group being monitored (used for database tables)
-            
-        Initializes:
-        ------------
-        - YOLO model with pretrained weights
-        - Behavior mapping between class IDs and names
-        - Tracking and timing dictionaries
-        - Database connection parameters
-        """
-        self.class_name = class_name.lower()
-        self.sleep_trackers = {}
-        self.current_behaviors = {}
-        self.detection_active = False
-        self.last_alert_time = {}
-        self.last_detection_time = 0
-        self.detection_interval = 1
-        self.frame_count = 0
-        self.track_id_map = {}  # For persistent ID tracking
-        
-        self.model_path = r"C:\Users\user\Desktop\Machine Learning\INT4097\Project\Code\model.pt"
-        self.model = YOLO(self.model_path)
-        print("Model loaded successfully. Classes:", self.model.names)
-        
-        self.behavior_map = {
-            0: "Eating",
-            1: "Looking_around",
-            2: "Sleeping",
-            3: "Watching_phone"
-        }
-        self.frame_count = 0
-        self.start_time = time.time()
-
-    def reset_statistics(self):
-        """
-        Reset all monitoring statistics and database records.
-        
-        Actions:
-        --------
-        1. Clears the incidents database table
-        2. Resets all tracking dictionaries
-        3. Maintains model state and configuration
-        
-        Raises:
-        -------
-        mysql.connector.Error
-            If database operation fails
-        """
-        try:
-            cursor = conn.cursor()
-            cursor.execute(f"DELETE FROM incidents_{self.class_name}")
-            conn.commit()
-            self.sleep_trackers = {}
-            self.current_behaviors = {}
-            self.last_alert_time = {}
-            print(f"Statistics reset for class {self.class_name}")
-        except mysql.connector.Error as e:
-            print(f"Error resetting statistics: {e}")
-
-    def start_detection(self):
-        self.detection_active = True
-        self.sleep_trackers = {}
-        self.current_behaviors = {}
-        self.last_alert_time = {}
-
-    def stop_detection(self):
-        self.detection_active = False
-
-
-    def _get_persisted_ids(self, count):
-        """
-        Generate or reuse persistent tracking IDs.
-        
-        Parameters:
-        -----------
-        count : int
-            Number of IDs needed
-            
-        Returns:
-        --------
-        numpy.ndarray
-            Array of persistent tracking IDs
-            
-        Implementation Notes:
-        --------------------
-        - Reuses existing IDs when possible to maintain continuity
-        - Creates new sequential IDs when needed
-        - Updates last-seen timestamp for each ID
-        """
-        # Generate persistent IDs using existing track IDs
-        existing_ids = list(self.track_id_map.keys())
-        new_ids = []
-        
-        for _ in range(count):
-            if existing_ids:
-                new_id = existing_ids.pop(0)
-            else:
-                new_id = max(existing_ids, default=0) + 1
-            new_ids.append(new_id)
-            self.track_id_map[new_id] = time.time()
-            
-        return np.array(new_ids) 
-
-    def process_frame(self, frame):
-        """
-        Process a single video frame for behavior detection.
-        
-        Parameters:
-        -----------
-        frame : numpy.ndarray
-            Input video frame in BGR format
-            
-        Returns:
-        --------
-        tuple
-            (annotated_frame, alerts)
-            - annotated_frame: Input frame with visual annotations
-            - alerts: List of alert messages generated
-            
-        Processing Pipeline:
-        -------------------
-        1. Skip processing if detection inactive
-        2. Run YOLO detection/tracking
-        3. Annotate detected behaviors
-        4. Trigger alerts based on behavior rules
-        5. Return annotated frame and alerts
-        """
-        
-        if not self.detection_active:
-            return frame, []            
-
-
-        alerts = []
-        
-        results = self.model.track(
-            frame,
-            persist=True,
-            conf=0.5,
-            tracker="botsort.yaml",  # or "bytetrack.yaml"
-            verbose=False,
-            imgsz=640,  # Match input size
-            device='cpu'  # or '0' for GPU
-        )
-        
-        for r in results:
-            boxes = r.boxes.xyxy.cpu().numpy()
-            confs = r.boxes.conf.cpu().numpy()
-            class_ids = r.boxes.cls.cpu().numpy().astype(int)
-            track_ids = r.boxes.id.int().cpu().numpy() if r.boxes.id is not None else self._get_persisted_ids(len(boxes))
-
-            for box, conf, cls_id, track_id in zip(boxes, confs, class_ids, track_ids):
-                if conf > 0.5:
-                    x1, y1, x2, y2 = map(int, box)
-                    behavior = self.behavior_map.get(cls_id, "unknown")
-                    student_id = f"STU-{track_id:03d}"
-                    
-                    self._draw_boxes(frame, x1, y1, x2, y2, behavior, student_id)
-                    
-                    if behavior == "Sleeping":
-                        alert = self._handle_sleep_detection(student_id)
-                        if alert:
-                            alerts.append(alert)
-                    else:
-                        if student_id in self.sleep_trackers:
-                            del self.sleep_trackers[student_id]
-                        alert = self._trigger_alert(student_id, behavior)
-                        if alert:
-                            alerts.append(alert)
-
-        return frame, alerts
-
-    def _handle_sleep_detection(self, student_id):
-        """
-        Special handling for sleeping behavior detection.
-        
-        Parameters:
-        -----------
-        student_id : str
-            Unique identifier for the student
-            
-        Returns:
-        --------
-        str or None
-            Alert message if sleep duration threshold exceeded
-            
-        Logic Flow:
-        ----------
-        1. Track first detection time
-        2. Calculate duration if already tracking
-        3. Trigger alert after 5+ seconds
-        4. Reset tracker after alert
-        """
-        current_time = time.time()
-        if student_id not in self.sleep_trackers:
-            self.sleep_trackers[student_id] = current_time
-            return None
-        
-        sleep_duration = current_time - self.sleep_trackers[student_id]
-        if sleep_duration >= 5:
-            del self.sleep_trackers[student_id]  # Reset after alert
-            return self._trigger_alert(student_id, "Sleeping", int(sleep_duration))
-        return None
-
-    def _draw_boxes(self, frame, x1, y1, x2, y2, behavior, student_id):
-        colors = {
-            "Sleeping": (50, 50, 255),    # Red in BGR
-            "Eating": (0, 255, 0),        # Green in BGR
-            "Looking_around": (0, 255, 255), # Yellow in BGR
-            "Watching_phone": (0, 165, 255)  # Orange in BGR
-        }
-        color = colors.get(behavior, (0, 255, 0))
-        
-        # Create overlay and draw everything on it
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (x1, y1), (x2, y2), color, 2)
-        label = f"{student_id}: {behavior.replace('_', ' ').title()}"
-        cv2.putText(overlay, label, (x1, y1-10), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-        
-        # Blend overlay with original frame
-        cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
-
-    def _trigger_alert(self, student_id, behavior, duration=0):
-        """
-        Generate and log behavior alerts.
-        
-        Parameters:
-        -----------
-        student_id : str
-            Unique student identifier
-        behavior : str
-            Detected behavior class
-        duration : int, optional
-            Duration for timed behaviors (e.g., sleeping)
-            
-        Returns:
-        --------
-        tuple or None
-            (alert_message, color_code) if alert should be raised
-            None if alert was recently triggered
-            
-        Database Operations:
-        -------------------
-        - Inserts new incident record
-        - Uses class-specific table
-        - Includes timestamp, behavior and duration
-        """
-        current_time = time.time()
-        colors = {
-            "Sleeping": "#ff0000",    # Red
-            "Eating": "#00ff00",      # Green
-            "Looking_around": "#ffff00", # Yellow
-            "Watching_phone": "#ffa500"  # Orange
-        }
-        color = colors.get(behavior, "#ffffff")
-        alert_key = (student_id, behavior)
-        if alert_key in self.last_alert_time and current_time - self.last_alert_time[alert_key] < 5:
-            return None
-        
-        try:
-            cursor = conn.cursor()
-            cursor.execute(
-                f"INSERT INTO incidents_{self.class_name} (student_id, behavior, duration) VALUES (%s, %s, %s)",
-                (student_id, behavior, duration)
-            )
-            conn.commit()
-            
-            self.last_alert_time[alert_key] = current_time
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            if behavior == "Sleeping":
-                return (f"{timestamp} - {student_id}: {behavior} ({duration}s)", color)
-            return (f"{timestamp} - {student_id}: {behavior}", color)
-        except mysql.connector.Error as e:
-            print(f"Error saving to database: {e}")
-            return None
+# matplotlib is only imported when the Statistics window is opened
+from behavior_monitor import BehaviorMonitor
+from model_loader import ModelLoader, ModelReloader
+from storage import StorageError, create_repository
+from pipeline import MonitoringPipeline
+from incident_writer import IncidentWriter
+from clip_recorder import ClipRecorder
+from display import AlertLogView, CanvasFrameDisplay
+from alert_log import AlertLog
+from incident_stats import IncidentStats
+from metrics import metrics, start_exporters, stop_exporters
+import config
 
 # ======================== START PAGE ========================
 class StartPage:
-    def __init__(self, root):
+    """
+    Class selection window.
+
+    The model is loaded and warmed up by `loader` while this page is shown;
+    picking a class waits for it only if it is not ready yet.
+    """
+    def __init__(self, root, loader=None):
         self.root = root
+        self.loader = loader
         self.root.title("Classroom Monitor - Select Class")
         self.root.geometry("400x300")
         self.root.configure(bg="#2c3e50")
         
-        global conn
-        conn = setup_database()
-        if not conn:
+        # Pooled storage shared by the writer thread and the Tk windows
+        global repository
+        repository = create_repository()
+        if not repository:
             messagebox.showerror("Error", "Failed to connect to database")
             return
 
@@ -387,13 +70,39 @@ class StartPage:
         
         btn_style = {"font": ("Roboto", 14), "width": 15, "pady": 10, "bg": "#3498db", "fg": "white"}
         
-        tk.Button(self.root, text="Class 6A", command=lambda: self.start_monitor("6a"), **btn_style).pack(pady=20)
-        tk.Button(self.root, text="Class 6B", command=lambda: self.start_monitor("6b"), **btn_style).pack(pady=20)
+        self.class_buttons = [
+            tk.Button(self.root, text="Class 6A", command=lambda: self.start_monitor("6a"), **btn_style),
+            tk.Button(self.root, text="Class 6B", command=lambda: self.start_monitor("6b"), **btn_style)
+        ]
+        for button in self.class_buttons:
+            button.pack(pady=(20, 0))
+        self.status_var = tk.StringVar(value="")
+        tk.Label(self.root, textvariable=self.status_var, bg="#2c3e50", fg="#bdc3c7").pack(pady=10)
+
+    def start_monitor(self, class_name, selected_at=None):
+        if selected_at is None:
+            selected_at = time.perf_counter()
+        engine = None
+        if self.loader is not None:
+            if not self.loader.ready():
+                # Still loading in the background; check again shortly
+                self.status_var.set("Loading model...")
+                for button in self.class_buttons:
+                    button.config(state=tk.DISABLED)
+                self.root.after(100, lambda: self.start_monitor(class_name, selected_at))
+                return
+            try:
+                engine = self.loader.get()
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to load model: {e}")
+                for button in self.class_buttons:
+                    button.config(state=tk.NORMAL)
+                self.status_var.set("")
+                return
 
-    def start_monitor(self, class_name):
         self.root.destroy()
         main_root = tk.Tk()
-        app = ClassroomMonitorUI(main_root, class_name)
+        app = ClassroomMonitorUI(main_root, class_name, engine, selected_at)
         main_root.protocol("WM_DELETE_WINDOW", app.on_closing)
         main_root.mainloop()
 
@@ -415,7 +124,7 @@ class ClassroomMonitorUI:
     - Statistical visualization
     - Database integration
     """
-    def __init__(self, root, class_name):
+    def __init__(self, root, class_name, engine=None, selected_at=None):
         """
         Initialize the monitoring interface.
         
@@ -425,11 +134,17 @@ class ClassroomMonitorUI:
             The main Tkinter window object
         class_name : str
             Name of the class being monitored (e.g., "6a")
+        engine : InferenceEngine, optional
+            Engine already loaded and warmed up by the ModelLoader; created
+            here if omitted
+        selected_at : float, optional
+            time.perf_counter() when the class was picked, to report how long
+            the first live frame took
             
         Initializes:
         ------------
         - Behavior monitoring backend
-        - Video capture device
+        - Video capture device and capture/inference threads
         - UI layout and styling
         - Alert tracking system
         """
@@ -439,11 +154,28 @@ class ClassroomMonitorUI:
         self.root.geometry("1280x800")
         self.root.configure(bg="#2c3e50")
         
-        self.monitor = BehaviorMonitor(class_name)
+        # Incidents are written in batches by a background thread
+        self.incident_writer = IncidentWriter(repository)
+        self.incident_writer.start()
+        # Dashboard totals are kept in memory; the database is only read once here
+        self.stats = IncidentStats()
+        self.stats.seed(repository, config.CLASS_NAMES)
+        # Evidence clips around alerts, encoded off the frame path
+        self.clip_recorder = None
+        if config.CLIP_ENABLED:
+            self.clip_recorder = ClipRecorder(config.CLIP_DIR, config.CLIP_PRE_SECONDS, config.CLIP_POST_SECONDS,
+                                              config.CLIP_FPS, config.CLIP_WIDTH, config.CLIP_FORMAT,
+                                              config.CLIP_MAX_PENDING, self.incident_writer.drop_clip)
+            self.clip_recorder.start()
+        self.monitor = BehaviorMonitor(class_name, self.incident_writer, engine, repository, self.stats,
+                                       self.clip_recorder)
+        self.selected_at = selected_at
         self.cap = cv2.VideoCapture(0)
         self.is_monitoring = False
         self.last_alert_update = 0
-        self.displayed_alerts = set()
+        # Newest alerts only, de-duplicated per student/behavior/time bucket;
+        # the full history is in the database (Backstage)
+        self.alerts = AlertLog(config.ALERT_LOG_CAPACITY, config.ALERT_DEDUP_BUCKET_SECONDS)
         
         self.colors = {
             "primary": "#3498db",
@@ -455,7 +187,17 @@ class ClassroomMonitorUI:
         }
         
         self.setup_ui()
+        # Camera reads and inference run on worker threads; the Tk loop only displays results
+        self.pipeline = MonitoringPipeline(self.monitor, self.cap)
+        self.pipeline.start()
+        # New weights are loaded in the background and swapped in between frames
+        self.reloader = ModelReloader(self.monitor, poll_interval=config.MODEL_WATCH_INTERVAL,
+                                      watch=config.MODEL_WATCH)
+        self.reloader.start()
+        self.metric_exporters = start_exporters()
         self.update_frame()
+        if metrics.enabled and config.METRICS_OVERLAY:
+            self.update_metrics_overlay()
 
     def setup_ui(self):
         """
@@ -483,6 +225,12 @@ class ClassroomMonitorUI:
         
         self.video_canvas = tk.Canvas(self.video_frame, bg=self.colors["dark"])
         self.video_canvas.pack(fill=tk.BOTH, expand=True)
+        self.display = CanvasFrameDisplay(self.video_canvas)
+        # Pipeline metrics status line, drawn over the top-left corner of the video
+        self.metrics_var = tk.StringVar(value="")
+        if metrics.enabled and config.METRICS_OVERLAY:
+            tk.Label(self.video_frame, textvariable=self.metrics_var, font=("Consolas", 9),
+                     bg="black", fg="#2ecc71").place(x=5, y=5)
         
         self.alert_frame = tk.Frame(self.root, bg=self.colors["dark"])
         self.alert_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
@@ -495,24 +243,16 @@ class ClassroomMonitorUI:
         self.alert_container = tk.Frame(self.alert_frame, bg=self.colors["dark"])
         self.alert_container.pack(fill=tk.BOTH, expand=True)
         
-        self.scrollbar = ttk.Scrollbar(self.alert_container)
-        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        self.alert_log = tk.Text(
+        # Only the visible rows are rendered; colors come from each alert
+        self.alert_view = AlertLogView(
             self.alert_container,
+            self.alerts,
             height=25,
             width=50,
             bg="#34495e",
             fg="white",
             font=("Consolas", 10)
         )
-        self.alert_log.tag_config('sleep', foreground="#ff0000")
-        self.alert_log.tag_config('eat', foreground="#00ff00")
-        self.alert_log.tag_config('look', foreground="#ffff00")
-        self.alert_log.tag_config('phone', foreground="#ffa500")
-
-        self.alert_log.pack(fill=tk.BOTH, expand=True)
-        self.scrollbar.config(command=self.alert_log.yview)
         
         self.control_frame = tk.Frame(self.root, bg=self.colors["dark"])
         self.control_frame.grid(row=1, column=0, columnspan=2, pady=10, sticky="ew")
@@ -547,11 +287,11 @@ class ClassroomMonitorUI:
         self.btn_stats = tk.Button(self.control_frame, text="📊 Statistics", command=self.show_statistics,
                                  bg=self.colors["primary"], fg="white", **btn_style)
         self.btn_stats.pack(side=tk.RIGHT, padx=20)
-
         
-
-        self.scrollbar.config(command=self.alert_log.yview)
-        self.alert_log.config(yscrollcommand=self.scrollbar.set)
+        self.btn_reload = tk.Button(self.control_frame, text="🔄 Reload Model",
+                                  command=lambda: self.reloader.request_reload(),
+                                  bg=self.colors["dark"], fg="white", **btn_style)
+        self.btn_reload.pack(side=tk.RIGHT, padx=20)
 
     def start_monitoring(self):
         """
@@ -565,8 +305,7 @@ class ClassroomMonitorUI:
         4. Update UI state
         """
         self.monitor.reset_statistics()
-        # Change this line for Text widget clearing
-        self.alert_log.delete('1.0', 'end')  # Changed from delete(0, tk.END)
+        self.alert_view.clear()
         self.monitor.start_detection()
         self.is_monitoring = True
         self.btn_start.config(state=tk.DISABLED)
@@ -586,9 +325,7 @@ class ClassroomMonitorUI:
         4. Update UI state
         """
         self.monitor.stop_detection()
-        self.alert_log.delete('1.0', 'end')
-        self.displayed_alerts = set()  # Reset tracked alert
-
+        self.alert_view.clear()
 
         self.is_monitoring = False
         self.btn_start.config(state=tk.NORMAL)
@@ -598,46 +335,41 @@ class ClassroomMonitorUI:
 
     def update_frame(self):
         """
-        Continuous frame update loop for live video processing.
+        Continuous UI refresh loop for the live video feed.
         
         Workflow:
         ---------
-        1. Capture frame from video source
-        2. Process frame for behavior detection
-        3. Update alert log with new detections
-        4. Display annotated video feed
-        5. Schedule next update (30ms interval)
+        1. Drain alerts produced by the inference worker
+        2. Add them to the alert ring buffer and redraw the visible rows
+        3. Display the newest annotated frame (if a new one arrived)
+        4. Schedule next update (15ms interval)
+        
+        Capture and inference run in MonitoringPipeline threads, so this
+        callback never blocks on the camera, the model or the database.
         """
-        ret, frame = self.cap.read()
-        if ret:
-            processed_frame, alerts = self.monitor.process_frame(frame)
-            
-            # Process alerts in batches
-            if alerts:
-                for alert_data in alerts:
-                    if alert_data:
-                        alert_text, alert_color = alert_data
-                        if alert_text not in self.displayed_alerts:
-                            tag_name = alert_text.split(":")[1].strip().lower().replace(' ', '_')
-                            self.alert_log.insert("end", alert_text + "\n", tag_name)
-                            self.displayed_alerts.add(alert_text)
-                self.alert_log.see("end")
-            
-            # Convert and display frame
-            img = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(img).resize((800, 600), Image.LANCZOS)
-            
-            # Update display
-            self.video_canvas.delete("all")
-            self.imgtk = ImageTk.PhotoImage(image=img)
-            self.video_canvas.create_image(
-                self.video_canvas.winfo_width()//2,
-                self.video_canvas.winfo_height()//2,
-                anchor=tk.CENTER,
-                image=self.imgtk
-            )
-        
-        self.root.after(30, self.update_frame)
+        # Process alerts in batches
+        alerts = self.pipeline.drain_alerts()
+        if alerts:
+            self.alerts.extend(alerts)
+        self.alert_view.refresh()
+
+        latest = self.pipeline.latest_frame()
+        if latest is not None:
+            frame_id, processed_frame = latest
+            # Resized to the canvas and pasted into the persistent PhotoImage
+            shown = self.display.show(processed_frame, frame_id)
+            if shown and self.selected_at is not None:
+                elapsed = time.perf_counter() - self.selected_at
+                print(f"Startup: first live frame {elapsed:.2f}s after the class was selected")
+                metrics.observe("startup_first_frame", elapsed)
+                self.selected_at = None
+        
+        self.root.after(15, self.update_frame)
+
+    def update_metrics_overlay(self):
+        """Refresh the metrics status line once per second."""
+        self.metrics_var.set(metrics.status_line())
+        self.root.after(1000, self.update_metrics_overlay)
 
     
 
@@ -648,53 +380,102 @@ class ClassroomMonitorUI:
         Features:
         --------
         - Class selection dropdown
-        - Tabular behavior statistics
-        - Manual refresh capability
+        - Tabular behavior statistics from the in-memory IncidentStats
+        - Recent incidents from the database (the full alert history), 100
+          more per "Show more"
+        - Manual refresh capability, plus live refresh while open
         """
         backstage = tk.Toplevel(self.root)
         backstage.title("📋 Backstage Monitor")
-        backstage.geometry("600x400")
+        backstage.geometry("640x720")
         backstage.configure(bg=self.colors["dark"])
         
         tk.Label(backstage, text="Backstage Statistics", font=("Roboto", 16, "bold"),
                 bg=self.colors["primary"], fg="white").pack(fill=tk.X, pady=(0,10))
         
-        class_var = tk.StringVar(value="6a")
+        class_var = tk.StringVar(value=config.CLASS_NAMES[0])
         tk.Label(backstage, text="Select Class:", bg=self.colors["dark"], fg="white").pack(pady=5)
-        class_selector = ttk.Combobox(backstage, textvariable=class_var, values=["6a", "6b"], state="readonly")
+        class_selector = ttk.Combobox(backstage, textvariable=class_var, values=config.CLASS_NAMES, state="readonly")
         class_selector.pack(pady=5)
         
-        stats_text = tk.Text(backstage, height=15, width=70, bg="#34495e", fg="white", font=("Consolas", 10))
+        stats_text = tk.Text(backstage, height=10, width=70, bg="#34495e", fg="white", font=("Consolas", 10))
         stats_text.pack(pady=10)
         
-        def update_stats():
+        tk.Label(backstage, text="Recent Incidents", bg=self.colors["dark"], fg="white").pack()
+        history_frame = tk.Frame(backstage, bg=self.colors["dark"])
+        history_frame.pack(pady=5)
+        history_scrollbar = ttk.Scrollbar(history_frame)
+        history_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        history_text = tk.Text(history_frame, height=14, width=70, bg="#34495e", fg="white",
+                               font=("Consolas", 10), yscrollcommand=history_scrollbar.set)
+        history_text.pack(side=tk.LEFT)
+        history_scrollbar.config(command=history_text.yview)
+        
+        shown = {"key": None, "limit": 100}
+
+        def update_history(selected_class):
+            # Indexed query, newest first, limited to the rows requested so far
             try:
-                cursor = conn.cursor()
-                selected_class = class_var.get()
-                cursor.execute(f"SELECT behavior, COUNT(*), SUM(duration) FROM incidents_{selected_class} GROUP BY behavior")
-                results = cursor.fetchall()
-                
-                stats_text.delete(1.0, tk.END)
-                stats_text.insert(tk.END, f"Statistics for Class {selected_class.upper()}\n\n")
-                stats_text.insert(tk.END, "Behavior".ljust(20) + "Count".ljust(10) + "Total Duration\n")
-                stats_text.insert(tk.END, "-"*50 + "\n")
-                
-                for behavior, count, duration in results:
-                    duration_str = f"{duration}s" if behavior == "Sleeping" else "-"
-                    stats_text.insert(tk.END, f"{behavior.ljust(20)}{str(count).ljust(10)}{duration_str}\n")
-            except mysql.connector.Error as e:
-                stats_text.delete(1.0, tk.END)
-                stats_text.insert(tk.END, f"Error: {e}")
-        
-        tk.Button(backstage, text="Refresh Stats", command=update_stats,
-                 bg=self.colors["primary"], fg="white").pack(pady=10)
+                rows = repository.recent_incidents(selected_class, limit=shown["limit"])
+            except StorageError as e:
+                print(f"Error loading incidents: {e}")
+                return
+            history_text.delete(1.0, tk.END)
+            history_text.insert(tk.END, "Start".ljust(21) + "Student".ljust(10) + "Behavior".ljust(18) + "Duration\n")
+            history_text.insert(tk.END, "-"*58 + "\n")
+            for student_id, behavior, start, _, duration in rows:
+                history_text.insert(tk.END, f"{start:%Y-%m-%d %H:%M:%S}  {str(student_id).ljust(10)}"
+                                            f"{behavior.ljust(18)}{duration}s\n")
+
+        def update_stats(force=True):
+            selected_class = class_var.get()
+            key = (selected_class, self.stats.version(selected_class))
+            if not force and key == shown["key"]:
+                return
+            shown["key"] = key
+            results = self.stats.snapshot(selected_class)
+            
+            stats_text.delete(1.0, tk.END)
+            stats_text.insert(tk.END, f"Statistics for Class {selected_class.upper()}\n\n")
+            stats_text.insert(tk.END, "Behavior".ljust(20) + "Count".ljust(10) + "Total Duration\n")
+            stats_text.insert(tk.END, "-"*50 + "\n")
+            
+            for behavior, count, duration in results:
+                duration_str = f"{duration}s" if behavior == "Sleeping" else "-"
+                stats_text.insert(tk.END, f"{behavior.ljust(20)}{str(count).ljust(10)}{duration_str}\n")
+            update_history(selected_class)
+
+        def show_more():
+            shown["limit"] += 100
+            update_history(class_var.get())
+
+        def auto_refresh():
+            if backstage.winfo_exists():
+                update_stats(force=False)
+                backstage.after(1000, auto_refresh)
+        
+        class_selector.bind("<<ComboboxSelected>>", lambda _: update_stats())
+        buttons = tk.Frame(backstage, bg=self.colors["dark"])
+        buttons.pack(pady=10)
+        tk.Button(buttons, text="Refresh Stats", command=update_stats,
+                 bg=self.colors["primary"], fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Show more", command=show_more,
+                 bg=self.colors["primary"], fg="white").pack(side=tk.LEFT, padx=5)
         update_stats()
+        backstage.after(1000, auto_refresh)
 
     def on_closing(self):
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
+            self.reloader.stop()
+            self.pipeline.stop()
+            self.monitor.stop_detection()  # Log the episodes still in progress
+            self.incident_writer.close()  # Flush queued incidents before exit
+            if self.clip_recorder is not None:
+                self.clip_recorder.close()
+            stop_exporters(self.metric_exporters)
             self.cap.release()
-            if conn:
-                conn.close()
+            if repository:
+                repository.close()
             self.root.destroy()
 
     def show_statistics(self):
@@ -706,26 +487,40 @@ class ClassroomMonitorUI:
         - Interactive matplotlib chart
         - Comparison of behavior frequencies
         - Sleep duration visualization
+        - Live refresh from the in-memory IncidentStats (no database queries)
         """
-        try:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT behavior, COUNT(*), SUM(duration) FROM incidents_{self.class_name} GROUP BY behavior")
-            results = cursor.fetchall()
-            
-            stats_window = tk.Toplevel(self.root)
-            stats_window.title(f"📈 Detection Statistics - Class {self.class_name.upper()}")
-            stats_window.geometry("800x600")
-            stats_window.configure(bg=self.colors["dark"])
+        # Imported here so the start page does not wait for matplotlib
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        stats_window = tk.Toplevel(self.root)
+        stats_window.title(f"📈 Detection Statistics - Class {self.class_name.upper()}")
+        stats_window.geometry("800x600")
+        stats_window.configure(bg=self.colors["dark"])
+
+        # Create figure for matplotlib
+        fig = Figure(figsize=(8, 6), dpi=100)
+        ax = fig.add_subplot(111)
+
+        # Create canvas and add to window
+        canvas = FigureCanvasTkAgg(fig, master=stats_window)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        shown = {"version": None}
+
+        def draw_chart():
+            shown["version"] = self.stats.version(self.class_name)
+            results = self.stats.snapshot(self.class_name)
+            ax.clear()
 
             if not results:
-                tk.Label(stats_window, text="No detection data available", 
-                        bg=self.colors["dark"], fg="white").pack(pady=20)
+                ax.text(0.5, 0.5, "No detection data available", ha='center', va='center',
+                        transform=ax.transAxes)
+                ax.set_axis_off()
+                canvas.draw_idle()
                 return
+            ax.set_axis_on()
 
-            # Create figure for matplotlib
-            fig = Figure(figsize=(8, 6), dpi=100)
-            ax = fig.add_subplot(111)
-            
             # Extract data for plotting
             behaviors = [row[0].replace('_', ' ').title() for row in results]
             counts = [row[1] for row in results]
@@ -754,24 +549,32 @@ class ClassroomMonitorUI:
                             xytext=(0, 3),  # 3 points vertical offset
                             textcoords="offset points",
                             ha='center', va='bottom')
+            canvas.draw_idle()
 
-            # Create canvas and add to window
-            canvas = FigureCanvasTkAgg(fig, master=stats_window)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        def auto_refresh():
+            if not stats_window.winfo_exists():
+                return
+            # Only redraw when new incidents arrived
+            if self.stats.version(self.class_name) != shown["version"]:
+                draw_chart()
+            stats_window.after(1000, auto_refresh)
 
-            # Add close button
-            btn_frame = tk.Frame(stats_window, bg=self.colors["dark"])
-            btn_frame.pack(pady=10)
-            
-            tk.Button(btn_frame, text="Close", command=stats_window.destroy,
-                    bg=self.colors["accent"], fg="white").pack(side=tk.LEFT, padx=10)
+        draw_chart()
+        stats_window.after(1000, auto_refresh)
 
-        except mysql.connector.Error as e:
-            messagebox.showerror("Error", f"Database error: {e}")
+        # Add close button
+        btn_frame = tk.Frame(stats_window, bg=self.colors["dark"])
+        btn_frame.pack(pady=10)
+        
+        tk.Button(btn_frame, text="Close", command=stats_window.destroy,
+                bg=self.colors["accent"], fg="white").pack(side=tk.LEFT, padx=10)
 
 # ======================== RUN ========================
 if __name__ == "__main__":
+    # Load and warm up the model while the user picks a class
+    loader = ModelLoader()
+    loader.start()
     root = tk.Tk()
-    app = StartPage(root)
+    app = StartPage(root, loader)
+    root.after_idle(lambda: print(f"Startup: start page shown after {time.perf_counter() - STARTUP_T0:.2f}s"))
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,341 @@
+'''
+Low-overhead instrumentation for the monitoring pipeline.
+
+Per-stage latencies (camera read, inference, box rules, overlay, display,
+database flush) go into fixed log-spaced histograms, so recording is a
+bisect and an increment and p50/p95/p99 can be read at any time. Frame rates
+come from rolling timestamp windows, and gauges (queue depths, dropped
+frames, writer counters) are callables evaluated only when a snapshot is
+taken.
+
+Instrumented code uses the shared `metrics` registry:
+
+    with metrics.timer("inference"):
+        det = engine.infer(frame)
+    metrics.mark("frames")
+
+When METRICS_ENABLED is False in config.py, timer() returns a shared no-op
+context manager and mark()/count() return immediately, so the cost is one
+attribute check per call.
+
+Snapshots can be shown in the UI status overlay, scraped as Prometheus text
+(serve_prometheus) or appended to a file as JSON lines (JsonLinesExporter).
+'''
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+# Histogram upper bounds in seconds: 50 us to ~30 s, 25% apart
+BUCKET_BOUNDS = [5e-5 * 1.25 ** i for i in range(60)]
+
+
+class LatencyHistogram:
+    """Thread-safe fixed-bucket latency histogram (seconds)."""
+    def __init__(self, bounds=BUCKET_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        index = bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100), interpolated inside the bucket."""
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+            maximum = self.max
+        if count == 0:
+            return 0.0
+        rank = q / 100.0 * count
+        cumulative = 0
+        for index, n in enumerate(counts):
+            if n and cumulative + n >= rank:
+                low = self.bounds[index - 1] if index > 0 else 0.0
+                high = self.bounds[index] if index < len(self.bounds) else maximum
+                value = low + (high - low) * (rank - cumulative) / n
+                return min(value, maximum)
+            cumulative += n
+        return maximum
+
+    def summary(self):
+        """Count and latency statistics in milliseconds."""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p95_ms': round(self.percentile(95) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3)
+        }
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    Registry of stage histograms, counters, rate meters and gauges.
+
+    Parameters:
+    -----------
+    enabled : bool
+        When False every recording call is a no-op
+    rate_window : int
+        Events kept per rate meter to compute its current rate
+    """
+    def __init__(self, enabled=False, rate_window=120):
+        self.enabled = enabled
+        self.rate_window = rate_window
+        self.stages = {}
+        self.counters = {}
+        self.rates = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, stage):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, LatencyHistogram())
+        return histogram
+
+    def timer(self, stage):
+        """Context manager timing one execution of `stage`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self._histogram(stage))
+
+    def observe(self, stage, seconds):
+        """Record a latency measured elsewhere."""
+        if self.enabled:
+            self._histogram(stage).record(seconds)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def mark(self, name):
+        """Record one event of a rate meter (e.g. a processed frame)."""
+        if not self.enabled:
+            return
+        window = self.rates.get(name)
+        if window is None:
+            with self._lock:
+                window = self.rates.setdefault(name, deque(maxlen=self.rate_window))
+        window.append(time.perf_counter())
+
+    def gauge(self, name, fn):
+        """Register a callable read at snapshot time (queue depth, dropped frames...)."""
+        self.gauges[name] = fn
+
+    def rate(self, name):
+        """Events per second over the meter's window (0 if idle for over 2 s)."""
+        window = self.rates.get(name)
+        if not window or len(window) < 2:
+            return 0.0
+        first, last = window[0], window[-1]
+        if time.perf_counter() - last > 2.0 or last <= first:
+            return 0.0
+        return (len(window) - 1) / (last - first)
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.rates = {}
+
+    def _gauge_values(self):
+        values = {}
+        for name, fn in list(self.gauges.items()):
+            try:
+                values[name] = fn()
+            except Exception:
+                continue  # A gauge whose owner is gone must not break exports
+        return values
+
+    def snapshot(self):
+        """All current values as a JSON-serialisable dict."""
+        return {
+            'time': time.time(),
+            'stages': {stage: h.summary() for stage, h in sorted(self.stages.items())},
+            'rates': {name: round(self.rate(name), 2) for name in sorted(self.rates)},
+            'counters': dict(self.counters),
+            'gauges': self._gauge_values()
+        }
+
+    def status_line(self):
+        """One-line summary for the UI status overlay."""
+        parts = [f"FPS {self.rate('frames'):.1f}"]
+        for stage in ("inference", "frame", "display", "db_flush"):
+            histogram = self.stages.get(stage)
+            if histogram is not None and histogram.count:
+                parts.append(f"{stage} p95 {histogram.percentile(95) * 1000:.1f}ms")
+        gauges = self._gauge_values()
+        if "dropped_frames" in gauges:
+            parts.append(f"dropped {gauges['dropped_frames']}")
+        if "motion_skip_ratio" in gauges:
+            parts.append(f"skipped {gauges['motion_skip_ratio']:.0%}")
+        return " | ".join(parts)
+
+    def prometheus_text(self, prefix="classroom"):
+        """Current values in the Prometheus text exposition format."""
+        lines = [f"# TYPE {prefix}_stage_latency_seconds histogram"]
+        for stage, h in sorted(self.stages.items()):
+            with h._lock:
+                counts = list(h.counts)
+                count, total = h.count, h.total
+            cumulative = 0
+            for bound, n in zip(h.bounds, counts):
+                cumulative += n
+                lines.append(f'{prefix}_stage_latency_seconds_bucket{{stage="{stage}",le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_stage_latency_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{prefix}_stage_latency_seconds_count{{stage="{stage}"}} {count}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name in sorted(self.rates):
+            lines.append(f"# TYPE {prefix}_{name}_per_second gauge")
+            lines.append(f"{prefix}_{name}_per_second {self.rate(name):.3f}")
+        for name, value in sorted(self._gauge_values().items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry used by the pipeline modules
+metrics = Metrics(enabled=config.METRICS_ENABLED)
+
+
+# ======================== EXPORTERS ========================
+class JsonLinesExporter(threading.Thread):
+    """
+    Appends a metrics snapshot to `path` every `interval` seconds.
+
+    One JSON object per line, so the file can be tailed or loaded with
+    pandas.read_json(path, lines=True).
+    """
+    def __init__(self, registry, path, interval=10.0):
+        super().__init__(name="MetricsExporter", daemon=True)
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.write()
+
+    def write(self):
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(self.registry.snapshot()) + "\n")
+        except OSError as e:
+            print(f"Error writing metrics: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+        self.write()
+
+
+def serve_prometheus(registry, port, host="127.0.0.1"):
+    """
+    Serve registry.prometheus_text() at http://host:port/metrics from a daemon thread.
+
+    Returns:
+    --------
+    ThreadingHTTPServer
+        Call shutdown() to stop it
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep scrapes out of the console
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    return server
+
+
+def start_exporters(registry=metrics):
+    """
+    Start the exporters configured in config.py (if metrics are enabled).
+
+    Returns:
+    --------
+    list
+        Started exporters / servers, to be passed to stop_exporters()
+    """
+    exporters = []
+    if not registry.enabled:
+        return exporters
+    if config.METRICS_JSONL_PATH:
+        exporter = JsonLinesExporter(registry, config.METRICS_JSONL_PATH, config.METRICS_JSONL_INTERVAL)
+        exporter.start()
+        exporters.append(exporter)
+    if config.METRICS_PROMETHEUS_PORT:
+        try:
+            exporters.append(serve_prometheus(registry, config.METRICS_PROMETHEUS_PORT))
+        except OSError as e:
+            print(f"Cannot serve metrics on port {config.METRICS_PROMETHEUS_PORT}: {e}")
+    return exporters
+
+
+def stop_exporters(exporters):
+    for exporter in exporters:
+        if isinstance(exporter, JsonLinesExporter):
+            exporter.stop()
+        else:
+            exporter.shutdown()
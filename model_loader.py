@@ -0,0 +1,194 @@
+'''
+Background model loading and warm-up.
+
+Building the inference engine (importing torch / ultralytics or creating an
+ONNX Runtime session) and its first inference, which pays one-time costs
+such as layer fusion, memory allocation and tracker setup, take seconds.
+ModelLoader does both on a daemon thread as soon as the application starts,
+so the model is ready by the time the user has picked a class.
+
+ModelReloader reuses it to hot-swap the model of a running BehaviorMonitor
+when the weights file changes (e.g. a new best.pt from train_model.py) or a
+reload is requested, without stopping the monitor.
+'''
+
+import os
+import threading
+import time
+
+import numpy as np
+
+import config
+from inference_backends import create_engine
+
+
+class ModelLoader(threading.Thread):
+    """
+    Creates and warms up the configured inference engine in the background.
+
+    Parameters:
+    -----------
+    backend : str, optional
+        Inference backend; defaults to config.INFERENCE_BACKEND
+    warmup_runs : int
+        Inferences on a blank frame before the engine is handed out
+    warmup_shape : tuple
+        Shape of the blank frame (a typical webcam frame)
+
+    After the thread finishes, `load_seconds` and `warmup_seconds` hold the
+    time spent building and warming up the engine.
+    """
+    def __init__(self, backend=None, warmup_runs=1, warmup_shape=(480, 640, 3)):
+        super().__init__(name="ModelLoader", daemon=True)
+        self.backend = backend
+        self.warmup_runs = warmup_runs
+        self.warmup_shape = warmup_shape
+        self.engine = None
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self._ready = threading.Event()
+
+    def run(self):
+        try:
+            start = time.perf_counter()
+            engine = create_engine(self.backend)
+            self.load_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            frame = np.zeros(self.warmup_shape, dtype=np.uint8)
+            for _ in range(self.warmup_runs):
+                engine.infer(frame)
+            self.warmup_seconds = time.perf_counter() - start
+
+            self.engine = engine
+            print(f"Model ready in {self.load_seconds + self.warmup_seconds:.2f}s "
+                  f"(load {self.load_seconds:.2f}s, warm-up {self.warmup_seconds:.2f}s)")
+        except Exception as e:
+            self.error = e
+            print(f"Error loading model: {e}")
+        finally:
+            self._ready.set()
+
+    def ready(self):
+        """True once loading finished (successfully or not)."""
+        return self._ready.is_set()
+
+    def get(self, timeout=None):
+        """
+        The warmed-up engine, waiting up to `timeout` seconds for it.
+
+        Returns None on timeout and re-raises the loading error if it failed.
+        """
+        if not self._ready.wait(timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.engine
+
+
+def model_file(backend=None):
+    """Weights file used by a backend (the file ModelReloader watches)."""
+    backend = (backend or config.INFERENCE_BACKEND).lower()
+    if backend == "openvino":
+        return config.OPENVINO_MODEL_PATH
+    if backend == "onnxruntime":
+        return config.ONNX_MODEL_PATH
+    return config.MODEL_PATH
+
+
+class ModelReloader(threading.Thread):
+    """
+    Hot model reload for a running BehaviorMonitor.
+
+    Parameters:
+    -----------
+    monitor : BehaviorMonitor
+        Monitor whose engine is replaced
+    backend : str, optional
+        Inference backend; defaults to config.INFERENCE_BACKEND
+    poll_interval : float
+        Seconds between checks of the weights file
+    watch : bool
+        Reload when the file's modification time changes; otherwise only
+        on request_reload()
+
+    A reload builds and warms up the new engine with ModelLoader on this
+    thread while the old engine keeps serving frames. The new engine is
+    rejected if loading or warm-up fails or its class names no longer match
+    behavior_map; otherwise it is handed to monitor.swap_engine, which
+    switches between two frames and rolls back if it fails on its first
+    frame. `last_result` describes the outcome of the latest reload.
+    """
+    def __init__(self, monitor, backend=None, poll_interval=2.0, watch=True):
+        super().__init__(name="ModelReloader", daemon=True)
+        self.monitor = monitor
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.watch = watch
+        self.path = model_file(backend)
+        self.reloads = 0
+        self.rejected = 0
+        self.last_result = None
+        self._requested = threading.Event()
+        self._stop_event = threading.Event()
+        self._signature = self._file_signature()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None  # Missing while being replaced
+        return stat.st_mtime_ns, stat.st_size
+
+    def request_reload(self):
+        """Reload the model now (e.g. from a UI button)."""
+        self._requested.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._requested.set()
+
+    def run(self):
+        pending = None
+        while not self._stop_event.is_set():
+            requested = self._requested.wait(self.poll_interval)
+            self._requested.clear()
+            if self._stop_event.is_set():
+                break
+            if requested:
+                self._signature = self._file_signature()
+                self._reload()
+                continue
+            if not self.watch:
+                continue
+            signature = self._file_signature()
+            if signature is None or signature == self._signature:
+                pending = None
+            elif signature != pending:
+                pending = signature  # Still being written; wait for one unchanged poll
+            else:
+                self._signature, pending = signature, None
+                self._reload()
+
+    def _reload(self):
+        print(f"Reloading model from {self.path}...")
+        loader = ModelLoader(self.backend)
+        loader.run()  # Load and warm up on this thread
+        if loader.error is not None:
+            self._reject(f"failed to load: {loader.error}")
+            return
+        engine = loader.engine
+        mismatch = self.monitor.class_name_mismatch(engine.names)
+        if mismatch:
+            self._reject(f"class names do not match behavior_map: {mismatch}")
+            return
+        self.monitor.swap_engine(engine)
+        self.reloads += 1
+        self.last_result = f"Model reloaded in {loader.load_seconds + loader.warmup_seconds:.1f}s"
+        print(self.last_result)
+
+    def _reject(self, reason):
+        self.rejected += 1
+        self.last_result = f"Model reload rejected ({reason}); keeping the current model"
+        print(self.last_result)
@@ -0,0 +1,94 @@
+'''
+Motion gate in front of the detector.
+
+A classroom is mostly static, yet every keyframe used to run full detection.
+MotionGate compares a small, blurred grayscale copy of the frame with the one
+from the last inference, region by region. If no region changed by more
+than a threshold, BehaviorMonitor skips the detector and reuses the previous
+detections, so sleep timers and episodes keep running. The detector still
+runs at least every `max_skip_seconds`, so still behaviors such as sleeping
+are re-checked even when nothing moves.
+'''
+
+import cv2
+
+
+class MotionGate:
+    """
+    Decides whether a frame needs full inference.
+
+    Parameters:
+    -----------
+    width : int
+        Width of the downscaled comparison frame (height keeps the aspect)
+    grid : tuple
+        (rows, cols) regions; motion in any single region triggers inference
+    pixel_threshold : int
+        Gray-level difference for a pixel to count as changed
+    region_threshold : float
+        Fraction of changed pixels in a region that counts as motion
+    max_skip_seconds : float
+        Longest time without full inference (minimum inference rate)
+
+    Counters:
+    ---------
+    inferred, skipped : int
+        Frames let through / skipped; skip_ratio is skipped over both
+    """
+    def __init__(self, width=160, grid=(4, 4), pixel_threshold=25, region_threshold=0.02,
+                 max_skip_seconds=2.0):
+        self.width = width
+        self.grid = grid
+        self.pixel_threshold = pixel_threshold
+        self.region_threshold = region_threshold
+        self.max_skip_seconds = max_skip_seconds
+        self.inferred = 0
+        self.skipped = 0
+        self.last_motion = 0.0  # Largest changed fraction over the regions, last check
+        self.reset()
+
+    def reset(self):
+        self.reference = None
+        self.last_inference = None
+
+    def _prepare(self, frame):
+        rows, cols = self.grid
+        h, w = frame.shape[:2]
+        # Sizes divisible by the grid so regions can be reduced with one reshape
+        small_w = max(cols, self.width // cols * cols)
+        small_h = max(rows, int(round(h * small_w / w)) // rows * rows)
+        small = cv2.resize(frame, (small_w, small_h), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (3, 3), 0)  # Suppress sensor noise
+
+    def check(self, frame, timestamp):
+        """
+        True if `frame` should go through full inference.
+
+        The comparison reference is only replaced when inference runs, so
+        slow changes accumulate until they cross the threshold.
+        """
+        small = self._prepare(frame)
+        if (self.reference is None or self.reference.shape != small.shape
+                or timestamp - self.last_inference >= self.max_skip_seconds):
+            motion = True
+        else:
+            rows, cols = self.grid
+            changed = cv2.absdiff(small, self.reference) > self.pixel_threshold
+            h, w = changed.shape
+            fractions = changed.reshape(rows, h // rows, cols, w // cols).mean(axis=(1, 3))
+            self.last_motion = float(fractions.max())
+            motion = self.last_motion > self.region_threshold
+
+        if motion:
+            self.reference = small
+            self.last_inference = timestamp
+            self.inferred += 1
+        else:
+            self.skipped += 1
+        return motion
+
+    @property
+    def skip_ratio(self):
+        total = self.inferred + self.skipped
+        return self.skipped / total if total else 0.0
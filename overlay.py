@@ -0,0 +1,113 @@
+'''
+Single-pass overlay rendering for detected behaviors.
+
+The original _draw_boxes made a full-frame copy and a full-frame blend for
+every box. OverlayRenderer draws every detection of a frame onto one
+preallocated overlay buffer (plus a mask of the pixels it touched) and then
+blends only inside the box / label regions, once per pixel.
+'''
+
+import cv2
+import numpy as np
+
+# Box colors in BGR
+BOX_COLORS = {
+    "Sleeping": (50, 50, 255),       # Red
+    "Eating": (0, 255, 0),           # Green
+    "Looking_around": (0, 255, 255), # Yellow
+    "Watching_phone": (0, 165, 255)  # Orange
+}
+DEFAULT_BOX_COLOR = (0, 255, 0)
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.6
+THICKNESS = 2
+
+
+class OverlayRenderer:
+    """
+    Draws labelled boxes for all detections of a frame in one pass.
+
+    Parameters:
+    -----------
+    alpha : float
+        Weight of the drawn overlay in the blend (the old code used 0.7)
+    max_cached_labels : int
+        Bound on the label-metrics cache; it is cleared when exceeded so
+        ever-growing track IDs cannot leak memory
+    """
+    def __init__(self, alpha=0.7, max_cached_labels=4096):
+        self.alpha = alpha
+        self.max_cached_labels = max_cached_labels
+        self._overlay = None
+        self._mask = None
+        self._label_cache = {}
+
+    def _ensure_buffers(self, frame):
+        if self._overlay is None or self._overlay.shape != frame.shape:
+            self._overlay = np.empty_like(frame)
+            self._mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+
+    def _label(self, student_id, behavior):
+        """Cached (text, width, height, baseline) for a student/behavior label."""
+        key = (student_id, behavior)
+        cached = self._label_cache.get(key)
+        if cached is None:
+            if len(self._label_cache) >= self.max_cached_labels:
+                self._label_cache.clear()
+            text = f"{student_id}: {behavior.replace('_', ' ').title()}"
+            (width, height), baseline = cv2.getTextSize(text, FONT, FONT_SCALE, THICKNESS)
+            cached = (text, width, height, baseline)
+            self._label_cache[key] = cached
+        return cached
+
+    def render(self, frame, detections):
+        """
+        Draw all detections onto `frame` in place.
+
+        Parameters:
+        -----------
+        frame : numpy.ndarray
+            BGR frame, modified in place
+        detections : iterable of tuple
+            (x1, y1, x2, y2, behavior, student_id) in pixel coordinates
+
+        Returns:
+        --------
+        numpy.ndarray
+            The same frame, for convenience
+        """
+        if not detections:
+            return frame
+
+        self._ensure_buffers(frame)
+        overlay, mask = self._overlay, self._mask
+        h, w = frame.shape[:2]
+        rois = []
+
+        for x1, y1, x2, y2, behavior, student_id in detections:
+            color = BOX_COLORS.get(behavior, DEFAULT_BOX_COLOR)
+            text, text_w, text_h, baseline = self._label(student_id, behavior)
+
+            cv2.rectangle(overlay, (x1, y1), (x2, y2), color, THICKNESS)
+            cv2.rectangle(mask, (x1, y1), (x2, y2), 255, THICKNESS)
+            cv2.putText(overlay, text, (x1, y1 - 10), FONT, FONT_SCALE, color, THICKNESS)
+            cv2.putText(mask, text, (x1, y1 - 10), FONT, FONT_SCALE, 255, THICKNESS)
+
+            # Region touched by the box outline and its label
+            rx1 = max(0, min(x1, x2) - THICKNESS)
+            ry1 = max(0, min(y1 - 10 - text_h, y1) - THICKNESS)
+            rx2 = min(w, max(x2, x1 + text_w) + THICKNESS + 1)
+            ry2 = min(h, max(y2, y1 - 10 + baseline) + THICKNESS + 1)
+            if rx2 > rx1 and ry2 > ry1:
+                rois.append((slice(ry1, ry2), slice(rx1, rx2)))
+
+        for roi in rois:
+            roi_mask = mask[roi] != 0
+            if roi_mask.any():
+                blended = cv2.addWeighted(overlay[roi], self.alpha, frame[roi], 1 - self.alpha, 0)
+                frame[roi][roi_mask] = blended[roi_mask]
+                # Clear so overlapping ROIs never blend the same pixel twice
+                mask[roi] = 0
+
+        return frame
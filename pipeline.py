@@ -0,0 +1,185 @@
+'''
+Threaded capture / inference pipeline for the live classroom monitor.
+
+The Tk main loop should never wait on the camera or on the model. This module
+splits the work into three stages connected by small "latest frame" queues:
+
+    [ CaptureThread ] --frames--> [ InferenceWorker ] --annotated--> [ Tk UI ]
+                                          |
+                                          +--alerts--> [ Tk UI ]
+
+Frame queues are bounded and drop the oldest item when full, so a slow stage
+only causes stale frames to be skipped instead of building up latency. Alerts
+go through an ordinary FIFO queue because they must never be dropped.
+'''
+
+import queue
+import threading
+import time
+from collections import deque
+
+from metrics import metrics
+
+
+class LatestFrameQueue:
+    """
+    Bounded, thread-safe queue that always keeps the newest items.
+
+    When the queue is full, put() discards the oldest entry and counts it as
+    dropped, so the consumer always sees the most recent frame.
+    """
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Pop the oldest queued item, waiting up to `timeout` seconds. Returns None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._items) > 0, timeout):
+                return None
+            return self._items.popleft()
+
+    def get_latest(self):
+        """Return the newest item without waiting and discard anything older. Returns None if empty."""
+        with self._cond:
+            if not self._items:
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            self._items.clear()
+            return item
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class CaptureThread(threading.Thread):
+    """
+    Reads frames from a cv2.VideoCapture as fast as the device delivers them.
+
+    Parameters:
+    -----------
+    cap : cv2.VideoCapture
+        Opened capture device
+    out_queue : LatestFrameQueue
+        Receives (frame_id, capture_time, frame) tuples
+    stop_event : threading.Event
+        Set to ask the thread to exit
+    """
+    def __init__(self, cap, out_queue, stop_event):
+        super().__init__(name="CaptureThread", daemon=True)
+        self.cap = cap
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.frame_id = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            with metrics.timer("capture"):
+                ret, frame = self.cap.read()
+            if not ret:
+                # Camera not ready or temporarily unavailable; back off briefly
+                time.sleep(0.01)
+                continue
+            self.frame_id += 1
+            self.out_queue.put((self.frame_id, time.time(), frame))
+
+
+class InferenceWorker(threading.Thread):
+    """
+    Runs BehaviorMonitor.process_frame on the newest captured frame.
+
+    Annotated frames go to `out_queue` as (frame_id, frame) and alerts are
+    pushed one by one onto `alert_queue`.
+    """
+    def __init__(self, monitor, in_queue, out_queue, alert_queue, stop_event):
+        super().__init__(name="InferenceWorker", daemon=True)
+        self.monitor = monitor
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.alert_queue = alert_queue
+        self.stop_event = stop_event
+
+    def run(self):
+        while not self.stop_event.is_set():
+            item = self.in_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            frame_id, _, frame = item
+            try:
+                with metrics.timer("frame"):
+                    processed_frame, alerts = self.monitor.process_frame(frame)
+            except Exception as e:
+                # Keep the pipeline alive; one bad frame must not stop monitoring
+                print(f"Error processing frame {frame_id}: {e}")
+                continue
+            self.out_queue.put((frame_id, processed_frame))
+            for alert in alerts:
+                if alert:
+                    self.alert_queue.put(alert)
+
+
+class MonitoringPipeline:
+    """
+    Owns the capture and inference threads for one ClassroomMonitorUI.
+
+    The UI only calls latest_frame() and drain_alerts() from its Tk `after`
+    callback, both of which return immediately.
+    """
+    def __init__(self, monitor, cap, frame_queue_size=1):
+        self.monitor = monitor
+        self.cap = cap
+        self.stop_event = threading.Event()
+        self.capture_queue = LatestFrameQueue(maxsize=frame_queue_size)
+        self.display_queue = LatestFrameQueue(maxsize=frame_queue_size)
+        self.alert_queue = queue.Queue()
+        self.capture_thread = CaptureThread(cap, self.capture_queue, self.stop_event)
+        self.inference_worker = InferenceWorker(
+            monitor, self.capture_queue, self.display_queue, self.alert_queue, self.stop_event
+        )
+
+    def start(self):
+        metrics.gauge("capture_queue_depth", lambda: len(self.capture_queue))
+        metrics.gauge("display_queue_depth", lambda: len(self.display_queue))
+        metrics.gauge("alert_queue_depth", self.alert_queue.qsize)
+        metrics.gauge("dropped_frames", lambda: self.dropped_frames)
+        self.capture_thread.start()
+        self.inference_worker.start()
+
+    def stop(self, timeout=2.0):
+        """Signal both threads to exit and wait for them (so the camera can be released safely)."""
+        self.stop_event.set()
+        for thread in (self.capture_thread, self.inference_worker):
+            if thread.is_alive():
+                thread.join(timeout)
+
+    def latest_frame(self):
+        """Newest (frame_id, annotated_frame) tuple, or None if nothing new arrived."""
+        return self.display_queue.get_latest()
+
+    def drain_alerts(self, limit=100):
+        """Return up to `limit` pending alerts without blocking."""
+        alerts = []
+        while len(alerts) < limit:
+            try:
+                alerts.append(self.alert_queue.get_nowait())
+            except queue.Empty:
+                break
+        return alerts
+
+    @property
+    def dropped_frames(self):
+        return self.capture_queue.dropped + self.display_queue.dropped
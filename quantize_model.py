@@ -0,0 +1,283 @@
+'''
+INT8 post-training quantization of the exported ONNX model.
+
+train_model.py exports an FP32 ONNX model, while the monitor runs on CPU.
+This script:
+
+1. Builds a calibration set from the validation split (letterboxed exactly
+   like OnnxRuntimeEngine does at inference time)
+2. Statically quantizes the model with ONNX Runtime (QDQ format, per-channel
+   INT8 weights). The detection head (box decoding / DFL) is kept in FP32
+   by default because its outputs are coordinates, which lose the most
+   accuracy when quantized
+3. Validates FP32 and INT8 on the validation split (mAP50 and mAP50-95 with
+   Ultralytics) and times both with OnnxRuntimeEngine
+4. Writes a speed/accuracy report and only keeps the INT8 model if its
+   mAP50-95 drop is within --tolerance. A rejected model is renamed to
+   *.rejected.onnx and the script exits with status 1
+
+To deploy an accepted model, point ONNX_MODEL_PATH in config.py at it and
+set INFERENCE_BACKEND = "onnxruntime".
+
+Requires: pip install onnx onnxruntime
+
+Usage:
+    python quantize_model.py --data data.yaml
+    python quantize_model.py --data data.yaml --model best.onnx --output best.int8.onnx --tolerance 0.01
+'''
+
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import yaml
+
+import config
+from inference_backends import OnnxRuntimeEngine
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def _split_images(entry, root):
+    """Image paths of one split entry: a directory, or a .txt list (one path per line)."""
+    path = entry if os.path.isabs(entry) else os.path.normpath(os.path.join(root, entry))
+    if os.path.isfile(path):
+        # List file, as written by split_dataset.py --mode manifest
+        with open(path) as f:
+            lines = [line.strip() for line in f if line.strip()]
+        return [p if os.path.isabs(p) else os.path.normpath(os.path.join(root, p)) for p in lines]
+    if os.path.isdir(os.path.join(path, 'images')):
+        path = os.path.join(path, 'images')
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Validation images not found: {path}")
+    return glob.glob(os.path.join(path, '*'))
+
+
+def validation_images(data_yaml):
+    """
+    Image paths of the validation split listed in a YOLO data.yaml.
+
+    `val` may be a directory, a .txt file listing images (relative paths are
+    resolved against the dataset root) or a list of either.
+    """
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f)
+    root = data.get('path') or os.path.dirname(os.path.abspath(data_yaml))
+    if not os.path.isabs(root):
+        root = os.path.join(os.path.dirname(os.path.abspath(data_yaml)), root)
+    val = data.get('val', 'val/images')
+    paths = []
+    for entry in (val if isinstance(val, list) else [val]):
+        paths.extend(_split_images(entry, root))
+    return sorted(set(p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS)))
+
+
+def sample_images(paths, count, seed=0):
+    """Reproducible random subset of at most `count` paths."""
+    if len(paths) <= count:
+        return list(paths)
+    return sorted(random.Random(seed).sample(paths, count))
+
+
+# ======================== CALIBRATION ========================
+def make_calibration_reader(engine, image_paths):
+    """
+    CalibrationDataReader feeding letterboxed validation images one by one.
+
+    `engine` is an OnnxRuntimeEngine on the FP32 model; its preprocessing is
+    reused so calibration sees the same inputs as deployment.
+    """
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class ValidationReader(CalibrationDataReader):
+        def __init__(self):
+            self.paths = iter(image_paths)
+
+        def get_next(self):
+            for path in self.paths:
+                image = cv2.imread(path)
+                if image is None:
+                    print(f"Skipping unreadable image: {path}")
+                    continue
+                blob, _ = engine._preprocess([image], square=True)
+                return {engine.input_name: blob}
+            return None
+
+        def rewind(self):
+            self.paths = iter(image_paths)
+
+    return ValidationReader()
+
+
+def head_nodes(model_path):
+    """
+    Names of the nodes in the detection head (the last "/model.N/" block of
+    an Ultralytics export), to keep them in FP32.
+    """
+    import onnx
+
+    model = onnx.load(model_path, load_external_data=False)
+    pattern = re.compile(r"/model\.(\d+)/")
+    blocks = {}
+    for node in model.graph.node:
+        match = pattern.search(node.name)
+        if match:
+            blocks.setdefault(int(match.group(1)), []).append(node.name)
+    return blocks[max(blocks)] if blocks else []
+
+
+def quantize(fp32_path, int8_path, reader, method="MinMax", keep_head_fp32=True):
+    """
+    Statically quantize `fp32_path` to `int8_path` (QDQ, per-channel weights).
+
+    The Ultralytics metadata (class names, stride, imgsz) is copied over so
+    the INT8 model works with the same loaders as the FP32 one.
+    """
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Shape inference and graph cleanup recommended before static quantization
+        prepared = os.path.join(tmp, "prepared.onnx")
+        quant_pre_process(fp32_path, prepared)
+        excluded = head_nodes(prepared) if keep_head_fp32 else []
+        quantize_static(prepared, int8_path, reader,
+                        quant_format=QuantFormat.QDQ,
+                        per_channel=True,
+                        activation_type=QuantType.QUInt8,
+                        weight_type=QuantType.QInt8,
+                        calibrate_method=getattr(CalibrationMethod, method),
+                        nodes_to_exclude=excluded)
+
+    source = onnx.load(fp32_path, load_external_data=False)
+    target = onnx.load(int8_path)
+    existing = {prop.key for prop in target.metadata_props}
+    for prop in source.metadata_props:
+        if prop.key not in existing:
+            target.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(target, int8_path)
+    return len(excluded)
+
+
+# ======================== EVALUATION ========================
+def evaluate_accuracy(model_path, data_yaml, imgsz):
+    """mAP50 and mAP50-95 of an ONNX model on the validation split."""
+    from ultralytics import YOLO
+
+    results = YOLO(model_path, task="detect").val(data=data_yaml, imgsz=imgsz, batch=1, device="cpu",
+                                                  plots=False, verbose=False)
+    return {'map50': round(float(results.box.map50), 4), 'map50_95': round(float(results.box.map), 4)}
+
+
+def evaluate_speed(model_path, image_paths, imgsz, warmup=5):
+    """Per-image latency of OnnxRuntimeEngine.infer (ms) on the given images."""
+    engine = OnnxRuntimeEngine(model_path, imgsz=imgsz, conf=config.CONF_THRESHOLD, iou=config.IOU_THRESHOLD,
+                               intra_op_threads=config.ORT_INTRA_OP_THREADS,
+                               inter_op_threads=config.ORT_INTER_OP_THREADS)
+    images = [image for image in (cv2.imread(p) for p in image_paths) if image is not None]
+    if not images:
+        raise ValueError("No readable images to time")
+    for image in images[:warmup]:
+        engine.infer(image)
+    latencies = []
+    for image in images:
+        start = time.perf_counter()
+        engine.infer(image)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        'latency_p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'latency_p95_ms': round(float(np.percentile(latencies, 95)), 2),
+        'fps': round(1000 / float(np.mean(latencies)), 1)
+    }
+
+
+def describe(model_path, data_yaml, imgsz, timing_images):
+    summary = {'path': model_path, 'size_mb': round(os.path.getsize(model_path) / 2**20, 2)}
+    summary.update(evaluate_accuracy(model_path, data_yaml, imgsz))
+    summary.update(evaluate_speed(model_path, timing_images, imgsz))
+    return summary
+
+
+def print_report(report):
+    fp32, int8 = report['fp32'], report['int8']
+    print(f"\n{'':12}{'FP32':>12}{'INT8':>12}")
+    for key, label in (('size_mb', 'Size (MB)'), ('map50', 'mAP50'), ('map50_95', 'mAP50-95'),
+                       ('latency_p50_ms', 'p50 (ms)'), ('latency_p95_ms', 'p95 (ms)'), ('fps', 'FPS')):
+        print(f"{label:12}{fp32[key]:>12}{int8[key]:>12}")
+    print(f"\nSpeed-up: {report['speedup']}x, mAP50-95 drop: {report['map_drop']} "
+          f"(tolerance {report['tolerance']})")
+    print("ACCEPTED" if report['accepted'] else "REJECTED", "->", report['output'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 static quantization of the ONNX model with mAP validation")
+    parser.add_argument("--data", required=True, help="data.yaml of the dataset (its val split is used)")
+    parser.add_argument("--model", default=config.ONNX_MODEL_PATH, help="FP32 ONNX model")
+    parser.add_argument("--output", default=None, help="INT8 model path (default: <model>.int8.onnx)")
+    parser.add_argument("--imgsz", type=int, default=config.IMGSZ)
+    parser.add_argument("--calibration-images", type=int, default=200)
+    parser.add_argument("--method", default="MinMax", choices=["MinMax", "Entropy", "Percentile"],
+                        help="Activation range calibration method")
+    parser.add_argument("--quantize-head", action="store_true", help="Also quantize the detection head")
+    parser.add_argument("--timing-images", type=int, default=50)
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Largest accepted mAP50-95 drop (absolute)")
+    parser.add_argument("--report", default=None, help="Report JSON (default: <output>.report.json)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.model)[0] + ".int8.onnx"
+    candidate = os.path.splitext(output)[0] + ".candidate.onnx"
+    report_path = args.report or os.path.splitext(output)[0] + ".report.json"
+
+    images = validation_images(args.data)
+    calibration = sample_images(images, args.calibration_images)
+    timing = sample_images(images, args.timing_images, seed=1)
+    print(f"Calibrating on {len(calibration)} of {len(images)} validation images ({args.method})...")
+
+    fp32_engine = OnnxRuntimeEngine(args.model, imgsz=args.imgsz)
+    start = time.perf_counter()
+    excluded = quantize(args.model, candidate, make_calibration_reader(fp32_engine, calibration),
+                        args.method, keep_head_fp32=not args.quantize_head)
+    quantize_seconds = time.perf_counter() - start
+    print(f"Quantized in {quantize_seconds:.1f}s ({excluded} head nodes kept in FP32)")
+
+    print("Validating FP32 model...")
+    fp32 = describe(args.model, args.data, args.imgsz, timing)
+    print("Validating INT8 model...")
+    int8 = describe(candidate, args.data, args.imgsz, timing)
+
+    map_drop = round(fp32['map50_95'] - int8['map50_95'], 4)
+    accepted = map_drop <= args.tolerance
+    if not accepted:
+        output = os.path.splitext(output)[0] + ".rejected.onnx"
+    os.replace(candidate, output)
+    int8['path'] = output
+
+    report = {
+        'fp32': fp32,
+        'int8': int8,
+        'speedup': round(fp32['latency_p50_ms'] / int8['latency_p50_ms'], 2),
+        'map_drop': map_drop,
+        'tolerance': args.tolerance,
+        'accepted': accepted,
+        'output': output,
+        'calibration': {'images': len(calibration), 'method': args.method,
+                        'head_fp32': not args.quantize_head, 'seconds': round(quantize_seconds, 1)}
+    }
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"Report saved to {report_path}")
+    if not accepted:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+'''
+Soak test for BehaviorMonitor's per-track state.
+
+Replays hours of synthetic detections through BehaviorMonitor.process_detections
+(no model, no camera, no database). Every seat is periodically lost and
+re-acquired under a new track ID, the way BoT-SORT behaves over a school day.
+Memory is sampled with tracemalloc at regular (simulated) intervals; the run
+fails if it keeps growing after the warm-up or the track cap is exceeded.
+
+Usage:
+    python soak_track_state.py
+    python soak_track_state.py --hours 8 --fps 10 --seats 30
+'''
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import config
+from behavior_monitor import BehaviorMonitor
+from inference_backends import Detections
+
+
+class SyntheticEngine:
+    """Stands in for the detector; detections are passed to process_detections directly."""
+    names = {0: "Eating", 1: "Looking_around", 2: "Sleeping", 3: "Watching_phone"}
+    provides_track_ids = True
+
+
+def synthetic_frames(seats, fps, seconds, min_track_life, max_track_life, seed=0):
+    """
+    Yield (timestamp, Detections) for a classroom with one student per seat.
+
+    Each seat keeps a track ID for a random lifetime, then is lost for a few
+    frames and comes back with a new ID. Behaviors change every few seconds.
+    """
+    rng = random.Random(seed)
+    start = time.time()
+    next_id = 1
+    track_ids = []
+    expires = []
+    behaviors = []
+    for _ in range(seats):
+        track_ids.append(next_id)
+        next_id += 1
+        expires.append(rng.uniform(min_track_life, max_track_life))
+        behaviors.append(rng.randrange(4))
+    boxes = np.array([[40 * i, 100, 40 * i + 35, 200] for i in range(seats)], dtype=np.float32)
+
+    for frame_index in range(int(seconds * fps)):
+        t = frame_index / fps
+        visible = []
+        for seat in range(seats):
+            if t >= expires[seat]:
+                # Lost for about a second, then re-acquired under a new ID
+                if t < expires[seat] + 1.0:
+                    continue
+                track_ids[seat] = next_id
+                next_id += 1
+                expires[seat] = t + rng.uniform(min_track_life, max_track_life)
+            if rng.random() < 0.02:
+                behaviors[seat] = rng.randrange(4)
+            visible.append(seat)
+
+        det = Detections(boxes[visible],
+                         np.full(len(visible), 0.9, dtype=np.float32),
+                         np.array([behaviors[s] for s in visible], dtype=np.int64),
+                         np.array([track_ids[s] for s in visible], dtype=np.int64))
+        yield start + t, det
+
+
+def run_soak(hours, fps, seats, sample_minutes=10, warmup_minutes=30, tolerance_kb=256):
+    """
+    Run the soak and return (passed, samples).
+
+    Each sample is a dict with the simulated time, traced memory and the
+    track store counters.
+    """
+    monitor = BehaviorMonitor("soak", engine=SyntheticEngine())
+    monitor.start_detection()
+    store = monitor.track_states
+
+    seconds = hours * 3600
+    sample_every = int(sample_minutes * 60 * fps)
+    samples = []
+    tracemalloc.start()
+    wall_start = time.perf_counter()
+    frames = synthetic_frames(seats, fps, seconds, min_track_life=20, max_track_life=180)
+    for i, (t, det) in enumerate(frames, 1):
+        monitor.process_detections(None, det, t, annotate=False)
+        if i % sample_every == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            sample = {'minutes': round(i / fps / 60), 'traced_kb': current // 1024}
+            sample.update(store.stats())
+            samples.append(sample)
+            print(f"{sample['minutes']:>5} min  traced {sample['traced_kb']:>7} KB  "
+                  f"tracks {sample['tracks']:>4}  evicted {sample['evicted_ttl']:>6} (ttl) "
+                  f"{sample['evicted_cap']:>4} (cap)  store {sample['memory_bytes'] // 1024} KB")
+    tracemalloc.stop()
+    print(f"Simulated {hours}h in {time.perf_counter() - wall_start:.1f}s")
+
+    steady = [s for s in samples if s['minutes'] >= warmup_minutes]
+    passed = True
+    if steady:
+        growth = max(s['traced_kb'] for s in steady) - min(s['traced_kb'] for s in steady)
+        print(f"Memory range after warm-up: {growth} KB (tolerance {tolerance_kb} KB)")
+        if growth > tolerance_kb:
+            print("FAIL: memory keeps growing")
+            passed = False
+    if max((s['peak_tracks'] for s in samples), default=0) > config.TRACK_STATE_MAX_TRACKS:
+        print("FAIL: track cap exceeded")
+        passed = False
+    return passed, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test for the bounded track state store")
+    parser.add_argument("--hours", type=float, default=8, help="Simulated monitoring time")
+    parser.add_argument("--fps", type=int, default=10, help="Simulated frames per second")
+    parser.add_argument("--seats", type=int, default=30, help="Students in the room")
+    parser.add_argument("--tolerance-kb", type=int, default=256, help="Allowed memory range after warm-up")
+    args = parser.parse_args()
+
+    passed, _ = run_soak(args.hours, args.fps, args.seats, tolerance_kb=args.tolerance_kb)
+    print("PASS" if passed else "FAIL")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,169 @@
+'''
+Split a YOLO dataset into train/val/test.
+
+Modes (how the split is materialized):
+
+- copy      : copy images and labels into <output>/<split>/{images,labels},
+              on a thread pool
+- hardlink  : hard links instead of copies (no extra disk space; falls back
+              to copying across file systems)
+- symlink   : symbolic links to the original files
+- manifest  : no files at all; writes <output>/train.txt, val.txt, test.txt
+              (absolute image paths) and a data.yaml that Ultralytics can
+              train on directly. Labels are found next to the images as usual
+              (data/images/x.jpg -> data/labels/x.txt)
+
+The split is stratified by class: each image is grouped by the rarest class
+it contains (read from the cached label index, see label_index.py), and
+every group is split with the requested ratios, so rare classes such as
+Eating appear in every split.
+
+Assignments are saved in <output>/split_assignments.json. Running the
+script again keeps every image in its split, assigns only new images
+(towards the target ratios of their group), re-copies files whose source
+changed (size or modification time) and removes the files of images that
+no longer exist. Use --resplit to start over.
+'''
+
+import argparse
+import json
 import os
 import random
 import shutil
-from sklearn.model_selection import train_test_split
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from label_index import build_index
+
+SPLITS = ('train', 'val', 'test')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+ASSIGNMENTS_FILE = 'split_assignments.json'
+MODES = ('copy', 'hardlink', 'symlink', 'manifest')
+
+
+def stratification_keys(image_files, labels_dir):
+    """
+    Rarest class of each image (-1 for images without boxes or labels).
+
+    Class rarity is the number of boxes of that class in the whole dataset.
+    """
+    index = build_index(labels_dir)
+    keys = {}
+    if len(index):
+        frequency = np.bincount(index.class_ids)[index.class_ids]
+        # Rows sorted by file, then rarity, then class id: the first row of each file is its key
+        order = np.lexsort((index.class_ids, frequency, index.file_ids))
+        files, first = np.unique(index.file_ids[order], return_index=True)
+        rarest = index.class_ids[order][first]
+        keys = {str(index.files[f]): int(c) for f, c in zip(files, rarest)}
+    return {image: keys.get(os.path.splitext(image)[0] + '.txt', -1) for image in image_files}
+
+
+def assign_group(images, existing, ratios, rng):
+    """
+    Assign new images of one stratification group to splits.
+
+    Each new image goes to the split furthest below its target share of the
+    group (existing + new images), so incremental runs keep the ratios.
+
+    Parameters:
+    -----------
+    images : list of str
+        New images of the group
+    existing : dict
+        {split: number of images of this group already assigned}
+    ratios : tuple
+        (train, val, test) proportions
+    """
+    images = list(images)
+    rng.shuffle(images)
+    counts = dict(existing)
+    total = sum(counts.values()) + len(images)
+    targets = {split: ratio * total for split, ratio in zip(SPLITS, ratios)}
+    assignments = {}
+    for image in images:
+        split = max(SPLITS, key=lambda s: (targets[s] - counts[s], -SPLITS.index(s)))
+        counts[split] += 1
+        assignments[image] = split
+    return assignments
+
+
+def _up_to_date(src, dst, mode):
+    """Whether an existing `dst` still matches `src` (links always do; copies by size and mtime)."""
+    if mode == 'symlink' and os.path.islink(dst):
+        return True
+    try:
+        if os.path.samefile(src, dst):
+            return True
+        s, d = os.stat(src), os.stat(dst)
+    except OSError:
+        return False  # Dangling link
+    # copy2 keeps the modification time, so an edited source differs in one of them
+    return s.st_size == d.st_size and s.st_mtime_ns == d.st_mtime_ns
+
+
+def _materialize(src, dst, mode):
+    if os.path.lexists(dst):
+        if _up_to_date(src, dst, mode):
+            return
+        os.remove(dst)  # Stale copy, e.g. of a label edited since the last run
+    if mode == 'symlink':
+        os.symlink(os.path.abspath(src), dst)
+        return
+    if mode == 'hardlink':
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass  # Different file system (or no hard-link support): copy instead
+    shutil.copy2(src, dst)
+
 
-def split_yolo_dataset(data_dir, output_dir, train_ratio=0.7, val_ratio=0.2, test_ratio=0.1, seed=42):
+def _remove(path):
+    if os.path.lexists(path):
+        os.remove(path)
+
+
+def write_manifests(output_dir, images_dir, assignments, classes_file=None, labels_dir=None):
+    """
+    Write <split>.txt image lists and a data.yaml pointing at them.
+
+    Class names come from `classes_file`; without it, `nc` is taken from the
+    highest class id in `labels_dir` (Ultralytics requires names or nc).
+    """
+    for split in SPLITS:
+        paths = sorted(os.path.abspath(os.path.join(images_dir, image))
+                       for image, s in assignments.items() if s == split)
+        with open(os.path.join(output_dir, f"{split}.txt"), 'w') as f:
+            f.write("\n".join(paths) + ("\n" if paths else ""))
+
+    lines = [f"path: {os.path.abspath(output_dir)}"] + [f"{split}: {split}.txt" for split in SPLITS]
+    if classes_file and os.path.exists(classes_file):
+        with open(classes_file) as f:
+            names = [line.strip() for line in f if line.strip()]
+        lines.append(f"nc: {len(names)}")
+        lines.append("names: [" + ", ".join(repr(name) for name in names) + "]")
+    else:
+        index = build_index(labels_dir) if labels_dir else None
+        if index is not None and len(index):
+            num_classes = int(index.class_ids.max()) + 1
+            lines.append(f"nc: {num_classes}")
+            print(f"Warning: {classes_file} not found; data.yaml gets nc: {num_classes} from the labels "
+                  f"and unnamed classes")
+        else:
+            print(f"Warning: {classes_file} not found and no labels to count classes from; "
+                  f"add 'nc' or 'names' to data.yaml before training")
+    with open(os.path.join(output_dir, 'data.yaml'), 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def split_yolo_dataset(data_dir, output_dir, train_ratio=0.7, val_ratio=0.2, test_ratio=0.1, seed=42,
+                       mode='copy', stratify=True, incremental=True, workers=8):
     """
     Split YOLO dataset into train/val/test sets while maintaining directory structure
-    
+
     Args:
         data_dir (str): Path to original dataset (contains images/, labels/)
         output_dir (str): Path to save split dataset
@@ -14,76 +171,121 @@ def split_yolo_dataset(data_dir, output_dir, train_ratio=0.7, val_ratio=0.2, tes
         val_ratio (float): Proportion for validation set
         test_ratio (float): Proportion for test set
         seed (int): Random seed for reproducibility
+        mode (str): 'copy', 'hardlink', 'symlink' or 'manifest' (see module docstring)
+        stratify (bool): Keep the class balance of every split (by rarest class per image)
+        incremental (bool): Keep previous assignments and only place new images
+        workers (int): Threads copying / linking files
+
+    Returns:
+        dict: {image file name: split}
     """
     # Validate ratios
     assert abs((train_ratio + val_ratio + test_ratio) - 1.0) < 0.001, "Ratios must sum to 1"
-    
+    assert mode in MODES, f"mode must be one of {', '.join(MODES)}"
+    ratios = (train_ratio, val_ratio, test_ratio)
+
     # Create paths
     images_dir = os.path.join(data_dir, 'images')
     labels_dir = os.path.join(data_dir, 'labels')
-    
+    os.makedirs(output_dir, exist_ok=True)
+    assignments_path = os.path.join(output_dir, ASSIGNMENTS_FILE)
+
     # Get all image files with original extensions
-    image_files = [f for f in os.listdir(images_dir) 
-                 if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-    
-    # Split into train, val, test
-    train_val, test = train_test_split(image_files, test_size=test_ratio, random_state=seed)
-    train, val = train_test_split(train_val, test_size=val_ratio/(train_ratio+val_ratio), 
-                                random_state=seed)
-    
-    # Create output directory structure
-    splits = ['train', 'val', 'test']
-    for split in splits:
-        os.makedirs(os.path.join(output_dir, split, 'images'), exist_ok=True)
-        os.makedirs(os.path.join(output_dir, split, 'labels'), exist_ok=True)
-    
-    # Copy files to respective directories
-    def copy_files(filenames, split_name):
-        for filename in filenames:
-            # Get base name without extension
+    image_files = sorted(f for f in os.listdir(images_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+    # Previous assignments of images that still exist are kept (unless re-splitting)
+    previous, previous_mode = {}, mode
+    if os.path.exists(assignments_path):
+        with open(assignments_path) as f:
+            saved = json.load(f)
+        previous, previous_mode = saved.get('assignments', {}), saved.get('mode')
+        if previous_mode != mode:
+            print(f"Note: previous split used mode '{previous_mode}'; its files are left in place")
+    current = set(image_files)
+    assignments = {}
+    if incremental:
+        assignments = {image: split for image, split in previous.items() if image in current}
+    new_images = [image for image in image_files if image not in assignments]
+
+    # Assign new images per stratification group
+    keys = stratification_keys(image_files, labels_dir) if stratify else dict.fromkeys(image_files, -1)
+    groups = {}
+    for image in new_images:
+        groups.setdefault(keys[image], []).append(image)
+    rng = random.Random(seed)
+    placed = Counter((keys[image], split) for image, split in assignments.items())
+    for key in sorted(groups):
+        existing = {split: placed[key, split] for split in SPLITS}
+        assignments.update(assign_group(groups[key], existing, ratios, rng))
+    # Files of deleted images, and of images that moved on --resplit, are removed
+    stale = []
+    if previous_mode == mode:
+        stale = [(image, split) for image, split in previous.items() if assignments.get(image) != split]
+
+    if mode == 'manifest':
+        write_manifests(output_dir, images_dir, assignments, os.path.join(data_dir, 'classes.txt'), labels_dir)
+    else:
+        # Create output directory structure
+        for split in SPLITS:
+            os.makedirs(os.path.join(output_dir, split, 'images'), exist_ok=True)
+            os.makedirs(os.path.join(output_dir, split, 'labels'), exist_ok=True)
+
+        def place(item):
+            filename, split = item
             base_name = os.path.splitext(filename)[0]
-            
-            # Source paths
             src_image = os.path.join(images_dir, filename)
             src_label = os.path.join(labels_dir, f"{base_name}.txt")
-            
-            # Destination paths
-            dst_image = os.path.join(output_dir, split_name, 'images', filename)
-            dst_label = os.path.join(output_dir, split_name, 'labels', f"{base_name}.txt")
-            
-            # Copy image
-            if os.path.exists(src_image):
-                shutil.copy2(src_image, dst_image)
-            else:
-                print(f"Warning: Missing image {src_image}")
-            
-            # Copy label
+            _materialize(src_image, os.path.join(output_dir, split, 'images', filename), mode)
             if os.path.exists(src_label):
-                shutil.copy2(src_label, dst_label)
+                _materialize(src_label, os.path.join(output_dir, split, 'labels', f"{base_name}.txt"), mode)
             else:
                 print(f"Warning: Missing label {src_label}")
-    
-    copy_files(train, 'train')
-    copy_files(val, 'val')
-    copy_files(test, 'test')
-    
-    # Copy classes file if exists
-    classes_file = os.path.join(data_dir, 'classes.txt')
-    if os.path.exists(classes_file):
-        shutil.copy2(classes_file, output_dir)
-    
-    print(f"\nDataset split complete:")
-    print(f"- Training samples: {len(train)}")
-    print(f"- Validation samples: {len(val)}")
-    print(f"- Test samples: {len(test)}")
+
+        def unplace(item):
+            filename, split = item
+            base_name = os.path.splitext(filename)[0]
+            _remove(os.path.join(output_dir, split, 'images', filename))
+            _remove(os.path.join(output_dir, split, 'labels', f"{base_name}.txt"))
+
+        # Unchanged files already in place are skipped, so a re-run only touches new or edited files
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(unplace, stale))
+            list(pool.map(place, sorted(assignments.items())))
+
+        # Copy classes file if exists
+        classes_file = os.path.join(data_dir, 'classes.txt')
+        if os.path.exists(classes_file):
+            shutil.copy2(classes_file, output_dir)
+
+    with open(assignments_path, 'w') as f:
+        json.dump({'seed': seed, 'ratios': ratios, 'mode': mode, 'assignments': assignments}, f, indent=0)
+
+    counts = {split: sum(1 for s in assignments.values() if s == split) for split in SPLITS}
+    removed = len(previous.keys() - current)
+    print(f"\nDataset split complete ({mode}, {len(new_images)} newly assigned, {removed} removed):")
+    print(f"- Training samples: {counts['train']}")
+    print(f"- Validation samples: {counts['val']}")
+    print(f"- Test samples: {counts['test']}")
+    if stratify:
+        placed = Counter((keys[image], split) for image, split in assignments.items())
+        for key in sorted(set(keys.values())):
+            per_split = [placed[key, split] for split in SPLITS]
+            label = "no boxes" if key < 0 else f"class {key}"
+            print(f"  rarest {label.ljust(10)} train {per_split[0]:>6}  val {per_split[1]:>6}  test {per_split[2]:>6}")
+    return assignments
 
 # Example usage
 if __name__ == "__main__":
-    data_dir = r"C:\Users\user\Desktop\Machine Learning\INT4097\Project\New_img\data"
-    output_dir = r"C:\Users\user\Desktop\Machine Learning\INT4097\Project\New_img\split_data"
-    
-    train_ratio = 0.7
-    val_ratio = 0.2
-    test_ratio = 0.1
-    
-    split_yolo_dataset(data_dir, output_dir, train_ratio, val_ratio, test_ratio)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Split a YOLO dataset into train/val/test")
+    parser.add_argument("--data-dir", default=r"C:\Users\user\Desktop\Machine Learning\INT4097\Project\New_img\data")
+    parser.add_argument("--output-dir", default=r"C:\Users\user\Desktop\Machine Learning\INT4097\Project\New_img\split_data")
+    parser.add_argument("--ratios", type=float, nargs=3, default=[0.7, 0.2, 0.1], metavar=("TRAIN", "VAL", "TEST"))
+    parser.add_argument("--mode", default="copy", choices=MODES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-stratify", action="store_true")
+    parser.add_argument("--resplit", action="store_true", help="Ignore the previous assignments")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    split_yolo_dataset(args.data_dir, args.output_dir, *args.ratios, seed=args.seed, mode=args.mode,
+                       stratify=not args.no_stratify, incremental=not args.resplit, workers=args.workers)
@@ -0,0 +1,286 @@
+'''
+Storage layer for incidents.
+
+Everything that reads or writes incidents goes through an IncidentRepository:
+the IncidentWriter, BehaviorMonitor.reset_statistics and the dashboard
+statistics. Two implementations are provided:
+
+- MySQLIncidentRepository  : production backend on a mysql.connector connection
+                             pool, so the writer thread and the Tk windows never
+                             share a connection
+- SQLiteIncidentRepository : dependency-free backend in WAL mode, for machines
+                             without MySQL (benchmarks, demos, offline analysis)
+
+Both use the same schema and queries from incident_store.py, and report
+failures as StorageError whatever the driver.
+
+Select the backend with STORAGE_BACKEND in config.py and build it with
+create_repository().
+'''
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import config
+from incident_store import (SQLITE_SCHEMA_SQL, SQLITE_TIME_FORMAT, add_missing_columns,
+                            behavior_totals, create_schema, histogram, migrate_per_class_tables,
+                            recent_incidents)
+
+
+class StorageError(Exception):
+    """Any database failure, raised by every repository implementation."""
+
+
+class IncidentRepository:
+    """
+    Interface of the incidents storage.
+
+    Subclasses provide connection() and the driver's exception types; the
+    operations below are shared and only differ by SQL dialect.
+    """
+    dialect = None
+    driver_errors = ()
+
+    @contextmanager
+    def connection(self):
+        """Yield a DB-API connection for the current thread (rolled back on error)."""
+        raise NotImplementedError
+        yield
+
+    def close(self):
+        pass
+
+    def _run(self, work):
+        try:
+            with self.connection() as conn:
+                return work(conn)
+        except self.driver_errors as e:
+            raise StorageError(str(e)) from e
+
+    def _prepare_rows(self, rows):
+        return rows
+
+    def insert_incidents(self, rows):
+        """
+        Insert incidents in a single transaction.
+
+        Parameters:
+        -----------
+        rows : list of tuple
+            (class_id, student_id, behavior, timestamp, duration, end_time, clip_path)
+        """
+        mark = "?" if self.dialect == "sqlite" else "%s"
+        sql = ("INSERT INTO incidents (class_id, student_id, behavior, timestamp, duration, end_time, clip_path) "
+               f"VALUES ({mark}, {mark}, {mark}, {mark}, {mark}, {mark}, {mark})")
+        rows = self._prepare_rows(rows)
+
+        def work(conn):
+            cursor = conn.cursor()
+            cursor.executemany(sql, rows)
+            conn.commit()
+            cursor.close()
+        self._run(work)
+
+    def delete_class(self, class_id):
+        """Remove every incident of one class."""
+        mark = "?" if self.dialect == "sqlite" else "%s"
+
+        def work(conn):
+            cursor = conn.cursor()
+            cursor.execute(f"DELETE FROM incidents WHERE class_id = {mark}", (class_id,))
+            conn.commit()
+            cursor.close()
+        self._run(work)
+
+    def clear_clip_path(self, clip_path):
+        """Unset the clip path of the incidents pointing at a clip that was never written."""
+        mark = "?" if self.dialect == "sqlite" else "%s"
+
+        def work(conn):
+            cursor = conn.cursor()
+            cursor.execute(f"UPDATE incidents SET clip_path = NULL WHERE clip_path = {mark}", (clip_path,))
+            conn.commit()
+            cursor.close()
+        self._run(work)
+
+    def behavior_totals(self, class_id=None, start=None, end=None):
+        """(class_id, behavior, count, total_duration) rows; see incident_store.behavior_totals."""
+        return self._run(lambda conn: behavior_totals(conn, class_id, start, end, self.dialect))
+
+    def histogram(self, class_id, bucket="hour", start=None, end=None, behavior=None):
+        """(bucket_start, behavior, count, total_duration) rows; see incident_store.histogram."""
+        return self._run(lambda conn: histogram(conn, class_id, bucket, start, end, behavior, self.dialect))
+
+    def recent_incidents(self, class_id, before=None, limit=100):
+        """Newest incidents of a class, newest first; see incident_store.recent_incidents."""
+        return self._run(lambda conn: recent_incidents(conn, class_id, before, limit, self.dialect))
+
+
+# ======================== MYSQL ========================
+class MySQLIncidentRepository(IncidentRepository):
+    """
+    MySQL backend on a mysql.connector connection pool.
+
+    Each operation borrows a pooled connection and returns it when done, so
+    concurrent threads never share a connection. If the pool is exhausted,
+    callers wait up to `pool_timeout` seconds for a free connection.
+    """
+    dialect = "mysql"
+
+    def __init__(self, host, user, password, database, pool_size=5,
+                 partition_by_month=False, pool_timeout=5.0):
+        import mysql.connector
+        from mysql.connector import pooling
+
+        self.driver_errors = (mysql.connector.Error,)
+        self._pool_error = mysql.connector.errors.PoolError
+        self.pool_timeout = pool_timeout
+        try:
+            # Create the database and schema first; the pool connects to it directly
+            conn = mysql.connector.connect(host=host, user=user, password=password)
+            cursor = conn.cursor()
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database}")
+            cursor.execute(f"USE {database}")
+            create_schema(cursor, partition_by_month=partition_by_month)
+            conn.commit()
+            cursor.close()
+            add_missing_columns(conn, self.dialect)
+
+            # Move rows from the old per-class tables, if any are left
+            for class_name, rows in migrate_per_class_tables(conn, config.CLASS_NAMES).items():
+                print(f"Migrated {rows} incidents from incidents_{class_name}")
+            conn.close()
+
+            self.pool = pooling.MySQLConnectionPool(
+                pool_name="incidents",
+                pool_size=pool_size,
+                pool_reset_session=True,
+                host=host,
+                user=user,
+                password=password,
+                database=database
+            )
+        except mysql.connector.Error as e:
+            raise StorageError(str(e)) from e
+
+    def _get_connection(self):
+        deadline = time.monotonic() + self.pool_timeout
+        while True:
+            try:
+                return self.pool.get_connection()
+            except self._pool_error:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.01)
+
+    @contextmanager
+    def connection(self):
+        conn = self._get_connection()
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except self.driver_errors:
+                pass
+            raise
+        finally:
+            conn.close()  # Returns the connection to the pool
+
+
+# ======================== SQLITE ========================
+class SQLiteIncidentRepository(IncidentRepository):
+    """
+    SQLite backend in WAL mode.
+
+    File databases give every thread its own connection, so readers never wait
+    for the writer. ':memory:' databases use one shared connection guarded by
+    a lock, because each in-memory connection would otherwise be a separate
+    database.
+    """
+    dialect = "sqlite"
+    driver_errors = (sqlite3.Error,)
+
+    def __init__(self, path=":memory:", timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._connections = []
+        self._shared = self._connect() if path == ":memory:" else None
+        try:
+            with self.connection() as conn:
+                for sql in SQLITE_SCHEMA_SQL:
+                    conn.execute(sql)
+                conn.commit()
+                add_missing_columns(conn, self.dialect)
+        except sqlite3.Error as e:
+            raise StorageError(str(e)) from e
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        if self._shared is not None:
+            with self._lock:
+                try:
+                    yield self._shared
+                except Exception:
+                    self._shared.rollback()
+                    raise
+            return
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _prepare_rows(self, rows):
+        # Store timestamps as sortable text so range filters can use the indexes
+        def text(value):
+            return value.strftime(SQLITE_TIME_FORMAT) if isinstance(value, datetime) else value
+        return [(c, s, b, text(t), d, text(e), p) for c, s, b, t, d, e, p in rows]
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+
+# ======================== FACTORY ========================
+def create_repository(backend=None):
+    """
+    Build the storage backend selected in config.py (or by `backend`).
+
+    Returns:
+    --------
+    IncidentRepository or None
+        None if the database could not be reached (the error is printed)
+    """
+    backend = (backend or config.STORAGE_BACKEND).lower()
+    try:
+        if backend == "mysql":
+            return MySQLIncidentRepository(config.DB_HOST, config.DB_USER, config.DB_PASSWORD,
+                                           config.DB_NAME, config.DB_POOL_SIZE,
+                                           config.DB_PARTITION_BY_MONTH)
+        if backend == "sqlite":
+            return SQLiteIncidentRepository(config.SQLITE_PATH)
+    except StorageError as e:
+        print(f"Database error: {e}")
+        return None
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,188 @@
+'''
+Tiled / seat-region inference for wide classroom shots.
+
+At imgsz=640 a whole lecture-hall frame is downscaled so much that the back
+rows are a few pixels tall, and phones or food disappear. TiledEngine wraps
+any inference engine and runs it on regions of the frame instead:
+
+- "auto"      : an overlapping grid of TILE_SIZE tiles covering the frame
+- seat map    : a list of (x1, y1, x2, y2) regions, in pixels or as
+                fractions of the frame (values <= 1), e.g. one per row of desks
+
+All crops (plus, optionally, the whole frame for students close to the
+camera) go through a single infer_batch call, boxes are mapped back to frame
+coordinates, and duplicates from overlapping regions are merged with a
+NumPy NMS. CPU cost grows with the number of regions, so it is controlled by
+the seat map or TILE_SIZE / TILE_OVERLAP rather than a larger imgsz.
+'''
+
+import numpy as np
+
+from inference_backends import Detections, InferenceEngine, empty_detections
+
+
+def grid_tiles(width, height, tile_size=640, overlap=0.2):
+    """
+    Overlapping tiles covering a width x height frame.
+
+    Returns:
+    --------
+    list of tuple
+        (x1, y1, x2, y2) in pixels; the last row/column is aligned with the
+        frame edge so no tile hangs over it
+    """
+    step = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size + 1, step))
+        if positions[-1] + tile_size < length:
+            positions.append(length - tile_size)
+        return positions
+
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in starts(height) for x in starts(width)]
+
+
+def resolve_regions(regions, width, height):
+    """Convert fractional regions to pixels and clip every region to the frame."""
+    resolved = []
+    for x1, y1, x2, y2 in regions:
+        if max(x1, y1, x2, y2) <= 1:
+            x1, x2 = x1 * width, x2 * width
+            y1, y2 = y1 * height, y2 * height
+        x1, x2 = int(max(0, x1)), int(min(width, x2))
+        y1, y2 = int(max(0, y1)), int(min(height, y2))
+        if x2 > x1 and y2 > y1:
+            resolved.append((x1, y1, x2, y2))
+    return resolved
+
+
+def merge_detections(boxes, confs, class_ids, iou_threshold=0.45, ios_threshold=0.7):
+    """
+    Class-agnostic NMS over detections gathered from overlapping regions.
+
+    A box is suppressed by a higher-scoring one if their IoU exceeds
+    `iou_threshold`, or if the intersection covers more than `ios_threshold`
+    of the smaller box (a student cut by a tile edge overlaps the full
+    detection mostly by area, not by IoU). Class-agnostic because the same
+    student can be classified differently in two crops.
+
+    Returns:
+    --------
+    numpy.ndarray
+        Indices of the kept detections, highest confidence first
+    """
+    n = len(boxes)
+    if n == 0:
+        return np.zeros(0, dtype=int)
+    order = np.argsort(-confs, kind="stable")
+    b = boxes[order]
+
+    x1 = np.maximum(b[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(b[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(b[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(b[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    areas = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    iou = inter / np.maximum(areas[:, None] + areas[None, :] - inter, 1e-9)
+    ios = inter / np.maximum(np.minimum(areas[:, None], areas[None, :]), 1e-9)
+    # Only higher-scoring boxes (earlier rows) may suppress later ones
+    suppresses = np.triu((iou > iou_threshold) | (ios > ios_threshold), k=1)
+
+    removed = np.zeros(n, dtype=bool)
+    keep = []
+    for i in range(n):
+        if removed[i]:
+            continue
+        keep.append(i)
+        removed |= suppresses[i]
+    return order[keep]
+
+
+class TiledEngine(InferenceEngine):
+    """
+    Runs a base engine on frame regions in one batch and merges the results.
+
+    Parameters:
+    -----------
+    engine : InferenceEngine
+        Engine used for the crops (its infer_batch does the forward pass)
+    regions : str or list
+        "auto" for a tile grid, or seat-map regions (pixels or fractions)
+    tile_size : int
+        Tile side in pixels for "auto"
+    overlap : float
+        Fraction of a tile shared with its neighbours for "auto"
+    include_full_frame : bool
+        Also run the whole (downscaled) frame, for students large enough to
+        be split across tiles
+    iou_threshold, ios_threshold : float
+        Duplicate merging thresholds, see merge_detections
+
+    Track IDs are not produced; BehaviorMonitor's IoU tracker assigns them.
+    """
+    provides_track_ids = False
+
+    def __init__(self, engine, regions="auto", tile_size=640, overlap=0.2,
+                 include_full_frame=True, iou_threshold=0.45, ios_threshold=0.7):
+        self.engine = engine
+        self.names = engine.names
+        self.regions = regions
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.include_full_frame = include_full_frame
+        self.iou_threshold = iou_threshold
+        self.ios_threshold = ios_threshold
+        self._layout = {}  # (width, height) -> region list
+
+    def regions_for(self, width, height):
+        """Pixel regions for a frame size (computed once per size)."""
+        key = (width, height)
+        if key not in self._layout:
+            if self.regions == "auto":
+                self._layout[key] = grid_tiles(width, height, self.tile_size, self.overlap)
+            else:
+                self._layout[key] = resolve_regions(self.regions, width, height)
+        return self._layout[key]
+
+    def infer(self, frame):
+        return self.infer_batch([frame])[0]
+
+    def infer_batch(self, frames):
+        if not frames:
+            return []
+        # Crops of every frame share one forward pass
+        crops, origins, owners = [], [], []
+        for index, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            regions = self.regions_for(width, height)
+            if self.include_full_frame or not regions:
+                regions = [(0, 0, width, height)] + [r for r in regions if r != (0, 0, width, height)]
+            for x1, y1, x2, y2 in regions:
+                crops.append(frame[y1:y2, x1:x2])
+                origins.append((x1, y1))
+                owners.append(index)
+
+        results = self.engine.infer_batch(crops)
+
+        gathered = [([], [], []) for _ in frames]
+        for det, (x, y), owner in zip(results, origins, owners):
+            if len(det.boxes):
+                boxes, confs, class_ids = gathered[owner]
+                boxes.append(det.boxes + np.array([x, y, x, y], dtype=np.float32))
+                confs.append(det.confs)
+                class_ids.append(det.class_ids)
+
+        merged = []
+        for boxes, confs, class_ids in gathered:
+            if not boxes:
+                merged.append(empty_detections())
+                continue
+            boxes = np.concatenate(boxes)
+            confs = np.concatenate(confs)
+            class_ids = np.concatenate(class_ids)
+            keep = merge_detections(boxes, confs, class_ids, self.iou_threshold, self.ios_threshold)
+            merged.append(Detections(boxes[keep], confs[keep], class_ids[keep], None))
+        return merged
@@ -0,0 +1,99 @@
+'''
+Motion propagation of tracked boxes between detector keyframes.
+
+When BehaviorMonitor runs the detector only every N frames, the boxes of the
+last keyframe are carried forward with a constant-velocity filter (a
+steady-state Kalman / alpha-beta filter on box centres whose position snaps
+to each new detection). The overlay stays smooth and behavior timers keep
+running on the same track IDs. All tracks are updated with NumPy operations.
+'''
+
+import numpy as np
+
+from inference_backends import Detections, empty_detections
+
+
+class TrackPropagator:
+    """
+    Constant-velocity propagation of the last detected boxes.
+
+    Parameters:
+    -----------
+    beta : float
+        Velocity correction gain applied at each keyframe (0-1)
+    max_extrapolation : float
+        Seconds after the last keyframe beyond which boxes stop moving, so a
+        stalled detector cannot send boxes drifting off the students
+    """
+    def __init__(self, beta=0.5, max_extrapolation=1.0):
+        self.beta = beta
+        self.max_extrapolation = max_extrapolation
+        self.reset()
+
+    def reset(self):
+        self.track_ids = np.zeros(0, dtype=int)
+        self.centers = np.zeros((0, 2), dtype=np.float32)
+        self.sizes = np.zeros((0, 2), dtype=np.float32)
+        self.velocities = np.zeros((0, 2), dtype=np.float32)
+        self.confs = np.zeros(0, dtype=np.float32)
+        self.class_ids = np.zeros(0, dtype=int)
+        self.last_update = None
+
+    def update(self, track_ids, boxes, confs, class_ids, timestamp):
+        """
+        Correct the filter with the detections of a keyframe.
+
+        Tracks missing from the keyframe are dropped: the detector is the
+        source of truth for which students are visible.
+        """
+        track_ids = np.asarray(track_ids, dtype=int)
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        sizes = boxes[:, 2:] - boxes[:, :2]
+        velocities = np.zeros_like(centers)
+
+        if self.last_update is not None and len(self.track_ids) and len(track_ids):
+            dt = timestamp - self.last_update
+            if dt > 0:
+                index = {tid: i for i, tid in enumerate(self.track_ids.tolist())}
+                new_rows, old_rows = [], []
+                for row, tid in enumerate(track_ids.tolist()):
+                    if tid in index:
+                        new_rows.append(row)
+                        old_rows.append(index[tid])
+                if new_rows:
+                    predicted = self.centers[old_rows] + self.velocities[old_rows] * dt
+                    # Position snaps to the detection (drawn as-is on keyframes);
+                    # the prediction error only corrects the velocity estimate
+                    residual = centers[new_rows] - predicted
+                    velocities[new_rows] = self.velocities[old_rows] + self.beta * residual / dt
+
+        self.track_ids = track_ids
+        self.centers = centers
+        self.sizes = sizes
+        self.velocities = velocities
+        self.confs = np.asarray(confs, dtype=np.float32)
+        self.class_ids = np.asarray(class_ids, dtype=int)
+        self.last_update = timestamp
+
+    def predict(self, timestamp, frame_shape=None):
+        """
+        Boxes of all tracks extrapolated to `timestamp`.
+
+        Returns:
+        --------
+        Detections
+            Same layout as the inference engines, with the propagated track IDs
+        """
+        if self.last_update is None or not len(self.track_ids):
+            return empty_detections()
+
+        dt = min(max(0.0, timestamp - self.last_update), self.max_extrapolation)
+        centers = self.centers + self.velocities * dt
+        half = self.sizes / 2
+        boxes = np.concatenate([centers - half, centers + half], axis=1)
+        if frame_shape is not None:
+            h, w = frame_shape[:2]
+            boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+            boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+        return Detections(boxes, self.confs.copy(), self.class_ids.copy(), self.track_ids.copy())
@@ -0,0 +1,114 @@
+'''
+Bounded per-track state for BehaviorMonitor.
+
+BoT-SORT hands out a new track ID every time a student is lost and
+re-acquired, so per-student dictionaries keyed by track ID grow for the whole
+session. TrackStateStore keeps one compact TrackState per track in
+least-recently-seen order, evicts tracks that have not been seen for `ttl`
+seconds, and enforces a hard cap on the number of tracks. Lookups, updates
+and evictions are O(1) (amortised).
+'''
+
+import sys
+from collections import OrderedDict
+
+
+class TrackState:
+    """Per-track timers. __slots__ keeps each instance small (no per-object __dict__)."""
+    __slots__ = ("last_seen", "alert_times")
+
+    def __init__(self, last_seen):
+        self.last_seen = last_seen
+        self.alert_times = {}     # behavior -> time of the last alert (cooldown)
+
+
+class TrackStateStore:
+    """
+    LRU/TTL store of TrackState objects keyed by track (student) ID.
+
+    Parameters:
+    -----------
+    ttl : float
+        Seconds after which a track that has not been seen is evicted
+    max_tracks : int
+        Hard cap; the least recently seen track is evicted beyond it
+
+    Counters:
+    ---------
+    evicted_ttl, evicted_cap : int
+        Tracks evicted by age and by the cap
+    peak_tracks : int
+        Largest number of tracks held at once
+    """
+    def __init__(self, ttl=120.0, max_tracks=500):
+        self.ttl = ttl
+        self.max_tracks = max_tracks
+        self._states = OrderedDict()
+        self.evicted_ttl = 0
+        self.evicted_cap = 0
+        self.peak_tracks = 0
+
+    def touch(self, key, now):
+        """Return the state for `key`, creating it if needed, and mark it as seen at `now`."""
+        state = self._states.get(key)
+        if state is None:
+            state = TrackState(now)
+            self._states[key] = state
+            if len(self._states) > self.max_tracks:
+                self._states.popitem(last=False)
+                self.evicted_cap += 1
+            self.peak_tracks = max(self.peak_tracks, len(self._states))
+        else:
+            state.last_seen = now
+            self._states.move_to_end(key)
+        return state
+
+    def get(self, key):
+        """State for `key` without marking it as seen, or None."""
+        return self._states.get(key)
+
+    def evict_expired(self, now):
+        """
+        Drop tracks not seen for more than `ttl` seconds.
+
+        Tracks are kept in last-seen order, so this only looks at the oldest
+        entries and stops at the first one still alive.
+        """
+        cutoff = now - self.ttl
+        evicted = 0
+        while self._states:
+            key, state = next(iter(self._states.items()))
+            if state.last_seen >= cutoff:
+                break
+            self._states.popitem(last=False)
+            evicted += 1
+        self.evicted_ttl += evicted
+        return evicted
+
+    def clear(self):
+        self._states.clear()
+
+    def keys(self):
+        return self._states.keys()
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, key):
+        return key in self._states
+
+    def memory_bytes(self):
+        """Approximate memory held by the store (container, keys and states)."""
+        total = sys.getsizeof(self._states)
+        for key, state in self._states.items():
+            total += sys.getsizeof(key) + sys.getsizeof(state) + sys.getsizeof(state.alert_times)
+        return total
+
+    def stats(self):
+        return {
+            'tracks': len(self._states),
+            'peak_tracks': self.peak_tracks,
+            'evicted_ttl': self.evicted_ttl,
+            'evicted_cap': self.evicted_cap,
+            'memory_bytes': self.memory_bytes()
+        }